@@ -0,0 +1,69 @@
+import os
+
+# Runtime settings, read from the environment so each deployment (or the Procfile) can tune them.
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+def env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+def env_str(name: str, default: str) -> str:
+    return os.environ.get(name, default)
+
+# Inference executors (app/services/executor.py)
+MODEL_EXECUTOR_WORKERS = env_int("MODEL_EXECUTOR_WORKERS", 4)  # Threads for the NumPy/XGBoost/TensorFlow paths
+SPACY_EXECUTOR = env_str("SPACY_EXECUTOR", "process")  # "process" or "thread"
+SPACY_EXECUTOR_WORKERS = env_int("SPACY_EXECUTOR_WORKERS", 2)
+MAX_PENDING_REQUESTS = env_int("MAX_PENDING_REQUESTS", 32)  # Running + queued requests per executor before answering 503
+REQUEST_TIMEOUT_SECONDS = env_float("REQUEST_TIMEOUT_SECONDS", 30.0)
+
+# Read-only arrays shared between worker processes (app/utils/shared_arrays.py)
+SHARED_ARRAYS_DIR = env_str("SHARED_ARRAYS_DIR", "/dev/shm/ai_candidate_screening" if os.path.isdir("/dev/shm") else "")  # Each deployment (candidates file) publishes in its own subdirectory; empty keeps private copies
+PRELOAD_APP = env_int("PRELOAD_APP", 1)  # gunicorn.conf.py: publish the arrays in the master before forking workers
+
+# Neural network backend (app/services/neural_network/)
+NN_RUNTIME = env_str("NN_RUNTIME", "numpy")  # "numpy" (exported weights, no TensorFlow) or "keras"
+
+# XGBoost backend (app/services/XGboost/predictors.py)
+XGB_PREDICTOR = env_str("XGB_PREDICTOR", "booster")  # "booster" (inplace_predict) or "compiled" (needs treelite and tl2cgen)
+XGB_NTHREAD = env_int("XGB_NTHREAD", 1)  # Threads per prediction call; requests already run in parallel across executor threads and workers. 0 uses every core
+
+# Micro-batching of concurrent predict requests (app/services/batching.py)
+BATCH_MAX_SIZE = env_int("BATCH_MAX_SIZE", 16)  # Job descriptions per model call; 1 disables batching
+BATCH_MAX_WAIT_MS = env_float("BATCH_MAX_WAIT_MS", 5.0)  # How long the first request of a batch waits for others
+
+# Ranking (app/services/ranking.py)
+RANK_MAX_K = env_int("RANK_MAX_K", 1000)  # Largest k a request may ask for
+
+# Vector index over the spaCy candidate vectors (app/services/vector_index.py)
+VECTOR_INDEX = env_str("VECTOR_INDEX", "none")  # "none" (exact scan of the vectors in memory), "flat" or "ivf"
+IVF_NLIST = env_int("IVF_NLIST", 0)  # Number of IVF lists; 0 picks about sqrt(number of candidates)
+IVF_NPROBE = env_int("IVF_NPROBE", 8)  # Lists scored per query; higher is more exact and slower
+RERANK_MAX_SHORTLIST = env_int("RERANK_MAX_SHORTLIST", 10000)  # Largest shortlist a request may rerank
+
+# Result cache of the predict endpoints (app/services/result_cache.py)
+RESULT_CACHE_SIZE = env_int("RESULT_CACHE_SIZE", 1024)  # Responses kept in memory per worker; 0 disables the cache
+RESULT_CACHE_TTL_SECONDS = env_float("RESULT_CACHE_TTL_SECONDS", 3600.0)
+RESULT_CACHE_DB = env_str("RESULT_CACHE_DB", "")  # SQLite file shared by the workers as a second tier; empty disables it
+RESULT_CACHE_CHECK_SECONDS = env_float("RESULT_CACHE_CHECK_SECONDS", 1.0)  # How often the artifact files are checked for changes
+
+# Batch scoring endpoints (/api/predict-candidates/.../batch)
+BATCH_API_MAX_JOBS = env_int("BATCH_API_MAX_JOBS", 1000)  # Job descriptions accepted per request
+BATCH_API_CHUNK_SIZE = env_int("BATCH_API_CHUNK_SIZE", 32)  # Job descriptions scored per model call before their results are streamed
+
+# Observability (/metrics and per-request profiling in app/main.py)
+PROFILE_REQUESTS = env_int("PROFILE_REQUESTS", 0)  # 1 lets requests sent with an "X-Profile: 1" header be profiled; 0 installs nothing
+PROFILE_INTERVAL_MS = env_float("PROFILE_INTERVAL_MS", 1.0)  # Time between two stack samples of a profiled request
+PROFILE_MAX_STORED = env_int("PROFILE_MAX_STORED", 32)  # Reports kept per worker for /api/admin/profiles/{id}
+
+# Candidate ingestion API (/api/candidates, app/services/candidate_log.py)
+CANDIDATE_LOG_CHECK_SECONDS = env_float("CANDIDATE_LOG_CHECK_SECONDS", 1.0)  # How often a worker checks the log for operations other workers appended
+CANDIDATE_LOG_COMPACT_OPERATIONS = env_int("CANDIDATE_LOG_COMPACT_OPERATIONS", 10000)  # Log size (operations) that starts a background compaction; 0 compacts after every write
+CANDIDATE_BULK_MAX_ROWS = env_int("CANDIDATE_BULK_MAX_ROWS", 50000)  # Candidates accepted per NDJSON upload
+
+# Sharded scoring of large pools (app/services/sharding.py)
+SHARDS = env_int("SHARDS", 0)  # Local shard processes the predict endpoints fan out to, each scoring a range of the pool; 0 scores in the API worker. Started once by the gunicorn master with PRELOAD_APP, by every worker otherwise (workers x SHARDS processes)
+SHARD_ADDRESSES = env_str("SHARD_ADDRESSES", "")  # Comma separated host:port of shard servers (python -m app.services.sharding) to use instead of local processes
+SHARD_AUTHKEY = env_str("SHARD_AUTHKEY", "")  # Secret shared with the shard servers; local shards get a random one when empty
+SHARD_POOLS = env_int("SHARD_POOLS", 4)  # Pools a shard keeps its rows of, so API workers lagging each other by a log write don't make it reload in turn
@@ -1,11 +1,139 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import signal
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from app import config
 from app.routes.candidate_routes import candidate_router
+from app.routes.ingestion_routes import ingestion_router
+from app.services.model_registry import ModelRegistry
+from app.services.executor import InferenceExecutors
+from app.services.batching import InferenceBatchers
+from app.services.result_cache import ResultCache
+from app.services.sharding import ShardCoordinator
+from app.utils.memory import memory_usage
+from app.utils.metrics import STAGES, metric_family
+from app.utils.profiling import ProfileStore, SamplingProfiler
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="AI Candidate Screening")
+def reload_on_signal(registry: ModelRegistry):
+    """
+    Reload the artifacts after a SIGHUP. Errors are reported and the current artifacts are kept.
+    """
+    try:
+        registry.reload()
+    except Exception as e:
+        print(f"Reload failed, keeping current artifacts: {e}")
+
+def metrics_text(state) -> str:
+    """
+    The metrics of this worker in the Prometheus text format: stage latencies, micro-batching,
+    result cache counters and memory. Every gunicorn worker keeps its own, so each is scraped separately.
+    """
+    lines = metric_family(
+        "candidate_screening_stage_seconds", "histogram", "Time spent in each stage of a scoring backend",
+        [line for (backend, stage), histogram in STAGES.items() for line in histogram.to_prometheus("candidate_screening_stage_seconds", {"backend": backend, "stage": stage})],
+    )
+    batchers = [state.batchers.neural_network, state.batchers.xgboost]
+    lines += metric_family(
+        "candidate_screening_batch_size", "histogram", "Job descriptions per batched predict call",
+        [line for batcher in batchers for line in batcher.batch_sizes.to_prometheus("candidate_screening_batch_size", {"backend": batcher.name})],
+    )
+    lines += metric_family(
+        "candidate_screening_batch_wait_seconds", "histogram", "Time a request waited for its batch to start",
+        [line for batcher in batchers for line in batcher.wait_seconds.to_prometheus("candidate_screening_batch_wait_seconds", {"backend": batcher.name})],
+    )
+
+    cache = state.result_cache.stats()
+    lines += metric_family(
+        "candidate_screening_result_cache_events_total", "counter", "Result cache lookups and removals by outcome",
+        [f'candidate_screening_result_cache_events_total{{event="{event}"}} {count}' for event, count in cache.items() if event not in ("entries", "maxEntries", "disk")],
+    )
+    lines += metric_family("candidate_screening_result_cache_entries", "gauge", "Responses held in the memory tier of the result cache", [f"candidate_screening_result_cache_entries {cache['entries']}"])
+
+    # Empty where /proc/self/smaps_rollup isn't available
+    memory = memory_usage()
+    if memory:
+        lines += metric_family("process_resident_memory_bytes", "gauge", "Resident memory of this worker", [f"process_resident_memory_bytes {memory['Rss']}"])
+        lines += metric_family("candidate_screening_proportional_memory_bytes", "gauge", "Proportional set size of this worker, shared pages split between the processes mapping them", [f"candidate_screening_proportional_memory_bytes {memory['Pss']}"])
+        lines += metric_family("candidate_screening_private_memory_bytes", "gauge", "Memory only this worker maps", [f"candidate_screening_private_memory_bytes {memory['Private']}"])
+    return "\n".join(lines) + "\n"
+
+async def profile_request(request: Request, call_next):
+    """
+    Middleware profiling the requests sent with an "X-Profile: 1" header. The report is kept by
+    this worker and its id returned in the X-Profile-Id header; see GET /api/admin/profiles/{id}.
+    A streamed response is only profiled until its headers are sent.
+    """
+    if request.headers.get("x-profile") != "1":
+        return await call_next(request)
+    profiler = SamplingProfiler(config.PROFILE_INTERVAL_MS).start()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+    response.headers["X-Profile-Id"] = request.app.state.profiles.add({"method": request.method, "path": request.url.path, **profiler.report()})
+    return response
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models, preprocessors and candidates once per worker before serving requests
+    await run_in_threadpool(app.state.registry.load)
+    if app.state.shards is not None:
+        await run_in_threadpool(app.state.shards.start)
+
+    # `kill -HUP <worker pid>` swaps in new artifacts without restarting the worker
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, lambda: loop.run_in_executor(None, reload_on_signal, app.state.registry))
+        handles_signal = True
+    except (NotImplementedError, RuntimeError, ValueError):
+        # Not available on Windows or outside the main thread (e.g. under TestClient)
+        handles_signal = False
+
+    yield
+
+    if handles_signal:
+        loop.remove_signal_handler(signal.SIGHUP)
+    app.state.executors.shutdown(wait=False)
+    if app.state.shards is not None:
+        app.state.shards.shutdown()
+
+app = FastAPI(title="AI Candidate Screening", lifespan=lifespan)
+app.state.registry = ModelRegistry()
+app.state.executors = InferenceExecutors()
+app.state.batchers = InferenceBatchers(app.state.executors)
+app.state.result_cache = ResultCache(app.state.registry.artifact_stamp)
+# Scoring is fanned out to shard processes only when configured
+app.state.shards = ShardCoordinator.from_config() if config.SHARDS or config.SHARD_ADDRESSES else None
 
 # Include routes
 app.include_router(candidate_router)
+app.include_router(ingestion_router)
+
+@app.get("/")
+async def root():
+    return {"message": "Welcome to the AI Candidate Screening System"}
+
+# Endpoint exposing the metrics of this worker for Prometheus to scrape
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(metrics_text(app.state), media_type="text/plain; version=0.0.4")
+
+# Profiling is opt-in: when disabled, neither the middleware nor the endpoint exist, so requests pay nothing
+if config.PROFILE_REQUESTS:
+    app.state.profiles = ProfileStore(config.PROFILE_MAX_STORED)
+    app.middleware("http")(profile_request)
+
+    # Endpoint returning the sampled stacks of a profiled request of this worker
+    @app.get("/api/admin/profiles/{profile_id}")
+    async def profile_report(profile_id: str):
+        report = app.state.profiles.get(profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail=f"No profile {profile_id} in worker {os.getpid()}")
+        return report
 
 # Add CORS middleware
 app.add_middleware(
@@ -14,4 +142,4 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-)
\ No newline at end of file
+)
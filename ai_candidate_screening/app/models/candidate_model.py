@@ -1,5 +1,55 @@
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
 
 class Candidate(BaseModel):
     name: str
-    score: int
\ No newline at end of file
+    score: int
+
+class CandidateRecord(BaseModel):
+    """
+    A row of candidates.csv, as submitted to /api/candidates. Fields are named like the CSV
+    columns ("Job title", "Answer 1"...); only Name is required, and it identifies the candidate.
+    """
+
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True, coerce_numbers_to_str=True)
+
+    name: str = Field(..., alias="Name", min_length=1, max_length=200)
+    job_title: Optional[str] = Field(None, alias="Job title")
+    job_department: Optional[str] = Field(None, alias="Job department")
+    job_location: Optional[str] = Field(None, alias="Job location")
+    headline: Optional[str] = Field(None, alias="Headline")
+    creation_time: Optional[str] = Field(None, alias="Creation time")
+    stage: Optional[str] = Field(None, alias="Stage")
+    tags: Optional[str] = Field(None, alias="Tags")
+    source: Optional[str] = Field(None, alias="Source")
+    type: Optional[str] = Field(None, alias="Type")
+    summary: Optional[str] = Field(None, alias="Summary")
+    keywords: Optional[str] = Field(None, alias="Keywords")
+    educations: Optional[str] = Field(None, alias="Educations")
+    experiences: Optional[str] = Field(None, alias="Experiences")
+    skills: Optional[str] = Field(None, alias="Skills")
+    disqualified: Optional[str] = Field(None, alias="Disqualified")
+    disqualified_at: Optional[str] = Field(None, alias="Disqualified at")
+    disqualification_category: Optional[str] = Field(None, alias="Disqualification category")
+    disqualification_reason: Optional[str] = Field(None, alias="Disqualification reason")
+    disqualification_note: Optional[str] = Field(None, alias="Disqualification note")
+    question_1: Optional[str] = Field(None, alias="Question 1")
+    answer_1: Optional[str] = Field(None, alias="Answer 1")
+    question_2: Optional[str] = Field(None, alias="Question 2")
+    answer_2: Optional[str] = Field(None, alias="Answer 2")
+    question_3: Optional[str] = Field(None, alias="Question 3")
+    answer_3: Optional[str] = Field(None, alias="Answer 3")
+    question_4: Optional[str] = Field(None, alias="Question 4")
+    answer_4: Optional[str] = Field(None, alias="Answer 4")
+    question_5: Optional[str] = Field(None, alias="Question 5")
+    answer_5: Optional[str] = Field(None, alias="Answer 5")
+    question_6: Optional[str] = Field(None, alias="Question 6")
+    answer_6: Optional[str] = Field(None, alias="Answer 6")
+    question_7: Optional[str] = Field(None, alias="Question 7")
+    answer_7: Optional[str] = Field(None, alias="Answer 7")
+
+    def row(self) -> dict:
+        """
+        The candidate keyed by CSV column, with empty strings as missing values like pd.read_csv reads them.
+        """
+        return {column: value if value != "" else None for column, value in self.model_dump(by_alias=True).items()}
@@ -1,8 +1,23 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.services.neural_network.predict_model import predict_scores
-from app.services.XGboost.predict_model import predict_scores as predict_scores_XGboost
-from app.services.spacy_similarity import calculate_similarity
+import json
+import os
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from app import config
+from app.services.ranking import DEFAULT_K, rank_candidates
+from app.services.filter_index import FILTER_COLUMNS
+from app.services.reranking import rerank_candidates, score_rows
+from app.services.sharding import ShardCoordinator, ShardError, get_shards
+from app.services.spacy_similarity import calculate_similarity, calculate_similarity_in_worker, similarity_matrix, similarity_matrix_in_worker
+from app.services.model_registry import ArtifactSnapshot, ModelRegistry, get_registry, get_snapshot
+from app.services.executor import ExecutorSaturated, InferenceExecutor, InferenceExecutors, InferenceTimeout, get_executors
+from app.utils.memory import memory_usage, sibling_workers
+from app.utils.metrics import STAGES, stage_timer
+from app.utils.shared_arrays import shared_usage
+from app.services.result_cache import ResultCache, get_result_cache
+from app.services.batching import InferenceBatchers, MicroBatcher, get_batchers, predict_neural_network_batch, predict_xgboost_batch
 
 # Kill the current env: rm -rf venv
 # Create an env: python3 -m venv venv
@@ -14,41 +29,294 @@ from app.services.spacy_similarity import calculate_similarity
 router = APIRouter()
 
 # Define the request body schema
-class JobDescriptionRequest(BaseModel):
+class RankingOptions(BaseModel):
+    k: int = Field(DEFAULT_K, ge=1, le=config.RANK_MAX_K)  # Number of candidates to return
+    offset: int = Field(0, ge=0)  # Number of best candidates to skip, for pagination
+    minScore: Optional[float] = None  # Drop candidates scoring below this threshold
+
+    def ranking(self) -> dict:
+        return {"k": self.k, "offset": self.offset, "min_score": self.minScore}
+
+class CandidateFilters(BaseModel):
+    # A candidate passes a field when it holds any of its values (regardless of case); all the fields given must pass
+    model_config = ConfigDict(extra="forbid")
+
+    jobLocation: Optional[List[str]] = Field(None, min_length=1)
+    stage: Optional[List[str]] = Field(None, min_length=1)
+    tags: Optional[List[str]] = Field(None, min_length=1)
+    source: Optional[List[str]] = Field(None, min_length=1)
+    department: Optional[List[str]] = Field(None, min_length=1)
+    disqualified: Optional[bool] = None
+
+    def columns(self) -> dict:
+        """
+        The filters keyed by CSV column, as FilterIndex takes them.
+        """
+        filters = {FILTER_COLUMNS[field]: values for field, values in self.model_dump(exclude_none=True).items()}
+        if self.disqualified is not None:
+            filters[FILTER_COLUMNS["disqualified"]] = ["Yes" if self.disqualified else "No"]
+        return filters
+
+class JobDescriptionRequest(RankingOptions):
     jobDescription: str
+    # NN and XGBoost only: score just this many candidates retrieved from the vector index
+    shortlist: Optional[int] = Field(None, ge=1, le=config.RERANK_MAX_SHORTLIST)
+    # Only score the candidates passing these filters
+    filters: Optional[CandidateFilters] = None
+
+class JobDescriptionsRequest(RankingOptions):
+    jobDescriptions: List[str] = Field(..., min_length=1, max_length=config.BATCH_API_MAX_JOBS)
+
+async def run_scoring(executor: InferenceExecutor, fn, *args, **kwargs):
+    """
+    Run a scoring function on an executor so it doesn't block the event loop.
+    A saturated executor answers 503 and a timed out request 504.
+    """
+    try:
+        return await executor.run(fn, *args, **kwargs)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ShardError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def run_batched(batcher: MicroBatcher, job_description: str, snapshot: ArtifactSnapshot):
+    """
+    Score the candidates as part of a micro-batch, with the same error mapping as run_scoring.
+    """
+    try:
+        return await batcher.submit(job_description, snapshot)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except InferenceTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+def error_status(error: Exception) -> int:
+    if isinstance(error, ExecutorSaturated):
+        return 503
+    if isinstance(error, InferenceTimeout):
+        return 504
+    return 500
+
+async def stream_rankings(job_descriptions, score_chunk, rank, chunk_size=config.BATCH_API_CHUNK_SIZE):
+    """
+    Score job descriptions chunk by chunk and yield one NDJSON line per job description as soon as its chunk is done.
+
+    Args:
+        job_descriptions (list[str]): The job description texts.
+        score_chunk: Coroutine function returning the (jobs, candidates) score matrix of a chunk.
+        rank: Function returning the top candidates DataFrame of one row of scores.
+        chunk_size (int): Job descriptions per score_chunk call.
+
+    Yields:
+        str: {"index", "topCandidates"} lines, or {"index", "status", "error"} lines for a chunk that failed.
+    """
+    for start in range(0, len(job_descriptions), chunk_size):
+        chunk = job_descriptions[start:start + chunk_size]
+        try:
+            scores = await score_chunk(chunk)
+        except Exception as e:
+            # The response has already started, so a failed chunk is reported in-band and the next one still runs
+            for index in range(start, start + len(chunk)):
+                yield json.dumps({"index": index, "status": error_status(e), "error": str(e)}) + "\n"
+            continue
+        for index, row in enumerate(scores, start):
+            top_candidates = rank(row)
+            yield json.dumps({"index": index, "topCandidates": top_candidates[["Name", "Score"]].to_dict(orient="records")}) + "\n"
+
+async def cached_response(cache: ResultCache, backend: str, request: JobDescriptionRequest, snapshot: ArtifactSnapshot, compute):
+    """
+    Return the cached response of a request, or compute it with compute() and cache it.
+    """
+    options = {**request.ranking(), "shortlist": request.shortlist, "filters": request.filters.columns() if request.filters else None}
+    key = cache.key(backend, request.jobDescription, snapshot, **options)
+    if key is not None:
+        response = await cache.get(key)
+        if response is not None:
+            return response
+
+    response = await compute()
+    if key is not None:
+        await cache.set(key, response)
+    return response
+
+# Stages timed in the routes: "score" (waiting for an executor or a batch, then scoring), "rank"
+# and "serialize". The scoring functions time their own stages inside; those of the spaCy process
+# pool run in other processes, so only the "score" stage around them is seen on /metrics.
+
+def top_candidates_response(backend: str, top_candidates) -> dict:
+    """
+    The JSON body of the predict endpoints: Name and Score of the top candidates.
+    """
+    with stage_timer(backend, "serialize"):
+        return {"topCandidates": top_candidates[["Name", "Score"]].to_dict(orient="records")}
+
+def filtered_rows(backend: str, request: JobDescriptionRequest, snapshot: ArtifactSnapshot):
+    """
+    Rows of the candidates passing the request's filters, from the snapshot's bitmap index, or None when it has none.
+    """
+    if request.filters is None:
+        return None
+    with stage_timer(backend, "filter"):
+        return snapshot.filter_index.rows(request.filters.columns())
+
+def ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type="application/x-ndjson")
 
 # Endpoint to predict top candidates through Neural Network
 @router.post("/api/predict-candidates")
-async def predict_candidates(request: JobDescriptionRequest):
-    try:
-        # Call the prediction function
-        top_candidates = predict_scores(request.jobDescription)
+async def predict_candidates(request: JobDescriptionRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), batchers: InferenceBatchers = Depends(get_batchers), executors: InferenceExecutors = Depends(get_executors), cache: ResultCache = Depends(get_result_cache), shards: ShardCoordinator = Depends(get_shards)):
+    async def compute():
+        rows = filtered_rows("neural_network", request, snapshot)
+        if request.shortlist:
+            # Retrieve a shortlist from the vector index and only rerank that with the model
+            with stage_timer("neural_network", "score"):
+                top_candidates = await run_scoring(executors.model, rerank_candidates, request.jobDescription, snapshot, "neural_network", request.shortlist, **request.ranking(), rows=rows)
+        elif shards is not None:
+            # Every shard scores its range of the pool and the coordinator merges their top k
+            with stage_timer("neural_network", "score"):
+                top_candidates = await run_scoring(executors.model, shards.rank, snapshot, "neural_network", request.jobDescription, **request.ranking(), rows=rows)
+        elif rows is not None:
+            # Only the candidates passing the filters go through the features and the model
+            with stage_timer("neural_network", "score"):
+                top_candidates = await run_scoring(executors.model, score_rows, request.jobDescription, snapshot, "neural_network", rows, **request.ranking())
+        else:
+            # Score the candidates together with other concurrent requests
+            with stage_timer("neural_network", "score"):
+                scores = await run_batched(batchers.neural_network, request.jobDescription, snapshot)
+            with stage_timer("neural_network", "rank"):
+                top_candidates = rank_candidates(snapshot.candidate_data, scores, **request.ranking())
         # Convert DataFrame to a list of names
-        return {"topCandidates": top_candidates[["Name", "Score"]].to_dict(orient="records")}
+        return top_candidates_response("neural_network", top_candidates)
+
+    try:
+        return await cached_response(cache, "neural_network", request, snapshot, compute)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 # Endpoint to predict top candidates through XGboost
 @router.post("/api/predict-candidates/XGboost")
-async def predict_candidates_XGboost(request: JobDescriptionRequest):
-    try:
-        # Call the prediction function
-        top_candidates = predict_scores_XGboost(request.jobDescription)
+async def predict_candidates_XGboost(request: JobDescriptionRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), batchers: InferenceBatchers = Depends(get_batchers), executors: InferenceExecutors = Depends(get_executors), cache: ResultCache = Depends(get_result_cache), shards: ShardCoordinator = Depends(get_shards)):
+    async def compute():
+        rows = filtered_rows("xgboost", request, snapshot)
+        if request.shortlist:
+            # Retrieve a shortlist from the vector index and only rerank that with the model
+            with stage_timer("xgboost", "score"):
+                top_candidates = await run_scoring(executors.model, rerank_candidates, request.jobDescription, snapshot, "xgboost", request.shortlist, **request.ranking(), rows=rows)
+        elif shards is not None:
+            # Every shard scores its range of the pool and the coordinator merges their top k
+            with stage_timer("xgboost", "score"):
+                top_candidates = await run_scoring(executors.model, shards.rank, snapshot, "xgboost", request.jobDescription, **request.ranking(), rows=rows)
+        elif rows is not None:
+            # Only the candidates passing the filters go through the features and the model
+            with stage_timer("xgboost", "score"):
+                top_candidates = await run_scoring(executors.model, score_rows, request.jobDescription, snapshot, "xgboost", rows, **request.ranking())
+        else:
+            # Score the candidates together with other concurrent requests
+            with stage_timer("xgboost", "score"):
+                scores = await run_batched(batchers.xgboost, request.jobDescription, snapshot)
+            with stage_timer("xgboost", "rank"):
+                top_candidates = rank_candidates(snapshot.candidate_data, scores, **request.ranking())
         # Convert DataFrame to a list of names
-        return {"topCandidates": top_candidates[["Name", "Score"]].to_dict(orient="records")}
+        return top_candidates_response("xgboost", top_candidates)
+
+    try:
+        return await cached_response(cache, "xgboost", request, snapshot, compute)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Endpoint to predict top candidates through spacy similarity
 @router.post("/api/predict-candidates/spacy")
-async def predict_candidates_spacy(request: JobDescriptionRequest):
-    try:
+async def predict_candidates_spacy(request: JobDescriptionRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), executors: InferenceExecutors = Depends(get_executors), cache: ResultCache = Depends(get_result_cache), shards: ShardCoordinator = Depends(get_shards)):
+    async def compute():
+        rows = filtered_rows("spacy", request, snapshot)
         # Call the prediction function
-        top_candidates = calculate_similarity(request.jobDescription)
+        with stage_timer("spacy", "score"):
+            if shards is not None:
+                # The job description is embedded once, then every shard scores its range of the pool. The shard
+                # processes do the heavy work, and the coordinator can't be sent to a spaCy worker process
+                top_candidates = await run_scoring(executors.model, shards.rank, snapshot, "spacy", request.jobDescription, **request.ranking(), rows=rows)
+            elif executors.spacy.kind == "process":
+                # Worker processes load the snapshot's files themselves instead of receiving the pool
+                top_candidates = await run_scoring(executors.spacy, calculate_similarity_in_worker, request.jobDescription, snapshot.version, **snapshot.sources, **request.ranking(), rows=rows)
+            else:
+                top_candidates = await run_scoring(executors.spacy, calculate_similarity, request.jobDescription, candidate_data=snapshot.candidate_data, candidate_vectors=snapshot.candidate_vectors, vector_index=snapshot.vector_index, **request.ranking(), rows=rows)
         # Convert DataFrame to a list of names
-        return {"topCandidates": top_candidates[["Name", "Score"]].to_dict(orient="records")}
+        return top_candidates_response("spacy", top_candidates)
+
+    try:
+        return await cached_response(cache, "spacy", request, snapshot, compute)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Endpoints to predict top candidates for many job descriptions at once, streamed as NDJSON.
+# The candidate features are computed once per snapshot and each chunk of job descriptions
+# is scored as one (jobs x candidates) matrix.
+@router.post("/api/predict-candidates/batch")
+async def predict_candidates_batch(request: JobDescriptionsRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), executors: InferenceExecutors = Depends(get_executors)):
+    async def score_chunk(chunk):
+        return await executors.model.run(predict_neural_network_batch, chunk, snapshot)
+    return ndjson_response(stream_rankings(request.jobDescriptions, score_chunk, lambda scores: rank_candidates(snapshot.candidate_data, scores, **request.ranking())))
+
+@router.post("/api/predict-candidates/XGboost/batch")
+async def predict_candidates_XGboost_batch(request: JobDescriptionsRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), executors: InferenceExecutors = Depends(get_executors)):
+    async def score_chunk(chunk):
+        return await executors.model.run(predict_xgboost_batch, chunk, snapshot)
+    return ndjson_response(stream_rankings(request.jobDescriptions, score_chunk, lambda scores: rank_candidates(snapshot.candidate_data, scores, **request.ranking())))
+
+@router.post("/api/predict-candidates/spacy/batch")
+async def predict_candidates_spacy_batch(request: JobDescriptionsRequest, snapshot: ArtifactSnapshot = Depends(get_snapshot), executors: InferenceExecutors = Depends(get_executors)):
+    async def score_chunk(chunk):
+        if executors.spacy.kind == "process":
+            return await executors.spacy.run(similarity_matrix_in_worker, chunk, snapshot.version, **snapshot.sources)
+        return await executors.spacy.run(similarity_matrix, chunk, snapshot.candidate_vectors)
+    return ndjson_response(stream_rankings(request.jobDescriptions, score_chunk, lambda scores: rank_candidates(snapshot.candidate_data, scores, **request.ranking())))
+
+# Endpoint exposing the hit, miss and eviction counters of the result cache
+@router.get("/api/stats/cache")
+async def cache_stats(cache: ResultCache = Depends(get_result_cache)):
+    return cache.stats()
+
+# Endpoint listing the values the predict filters can take, with how many candidates hold each
+@router.get("/api/candidates/filters")
+async def filter_values(snapshot: ArtifactSnapshot = Depends(get_snapshot)):
+    values = snapshot.filter_index.values()
+    return {field: values[column] for field, column in FILTER_COLUMNS.items()}
+
+# Endpoint exposing the batch size and wait time histograms of the micro-batchers
+@router.get("/api/stats/batching")
+async def batching_stats(batchers: InferenceBatchers = Depends(get_batchers)):
+    return batchers.stats()
+
+# Endpoint exposing the stage latency histograms of this worker as JSON (Prometheus reads them from /metrics)
+@router.get("/api/stats/stages")
+async def stage_stats():
+    return STAGES.stats()
+
+# Endpoint reporting the private and shared memory of every worker, and the arrays they share
+@router.get("/api/admin/memory")
+async def memory_report(registry: ModelRegistry = Depends(get_registry)):
+    return {
+        "pid": os.getpid(),
+        "workers": {str(pid): memory_usage(pid) for pid in sibling_workers()},
+        "sharedArrays": shared_usage(registry.shared_dir) if registry.shared_dir else {},
+    }
+
+# Endpoint to reload models, preprocessors and candidates from disk without restarting the worker
+@router.post("/api/admin/reload")
+async def reload_artifacts(registry: ModelRegistry = Depends(get_registry)):
+    try:
+        # Load in a worker thread so requests keep being served with the current artifacts meanwhile
+        snapshot = await run_in_threadpool(registry.reload)
+        return {"version": snapshot.version, "loadedAt": snapshot.loaded_at}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 candidate_router = router
\ No newline at end of file
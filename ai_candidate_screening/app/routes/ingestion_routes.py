@@ -0,0 +1,95 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from app import config
+from app.models.candidate_model import CandidateRecord
+from app.services.candidate_log import CandidateExists, delete, upsert
+from app.services.model_registry import ArtifactSnapshot, ModelRegistry, get_registry
+
+# Candidates written here are appended to the candidate log (app/services/candidate_log.py)
+# before the response is sent, then this worker swaps in a snapshot with them applied; the other
+# workers pick them up within CANDIDATE_LOG_CHECK_SECONDS. Only the rows written are featurized
+# and embedded, and the log is folded into candidates.csv in the background once it is long.
+
+router = APIRouter()
+
+def parse_candidates(body: bytes, max_rows=config.CANDIDATE_BULK_MAX_ROWS) -> list:
+    """
+    Validate an NDJSON upload, one candidate per line. Blank lines are skipped.
+
+    Raises:
+        HTTPException: 413 past max_rows, or 422 listing the invalid lines (numbered from 1) when any is invalid.
+    """
+    lines = [(number, line) for number, line in enumerate(body.decode("utf-8").splitlines(), start=1) if line.strip()]
+    if len(lines) > max_rows:
+        raise HTTPException(status_code=413, detail=f"At most {max_rows} candidates per upload")
+    candidates, errors = [], []
+    for number, line in lines:
+        try:
+            candidates.append(CandidateRecord.model_validate(json.loads(line)))
+        except json.JSONDecodeError as e:
+            errors.append({"line": number, "errors": [{"loc": [], "msg": f"Invalid JSON: {e}"}]})
+        except ValidationError as e:
+            errors.append({"line": number, "errors": [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]})
+    # All or nothing: nothing is written when a line is invalid
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return candidates
+
+async def write_operations(registry: ModelRegistry, operations, append=None) -> ArtifactSnapshot:
+    """
+    Append operations to the candidate log (with `append` if given) and swap in a snapshot with them applied.
+    """
+    await run_in_threadpool(append or registry.log.append, operations)
+    snapshot = await run_in_threadpool(registry.apply_log)
+    registry.compact_in_background()
+    return snapshot
+
+def written(snapshot: ArtifactSnapshot, **counts) -> dict:
+    return {"version": snapshot.version, "candidates": len(snapshot.candidate_data), **counts}
+
+# Endpoint adding a candidate; 409 if one with the same Name exists
+@router.post("/api/candidates", status_code=201)
+async def add_candidate(candidate: CandidateRecord, registry: ModelRegistry = Depends(get_registry)):
+    # The Name is checked under the log's lock, against the log as every worker wrote it
+    def add(operations):
+        try:
+            registry.add_candidates([operation["candidate"] for operation in operations])
+        except CandidateExists:
+            raise HTTPException(status_code=409, detail=f"Candidate {candidate.name} already exists; use PUT to replace it")
+
+    return written(await write_operations(registry, [upsert(candidate.row())], add), upserted=1)
+
+# Endpoint adding or replacing the candidate with this Name
+@router.put("/api/candidates/{name}")
+async def put_candidate(name: str, candidate: CandidateRecord, registry: ModelRegistry = Depends(get_registry)):
+    if candidate.name != name:
+        raise HTTPException(status_code=422, detail=f"The Name in the body ({candidate.name}) doesn't match the URL ({name})")
+    return written(await write_operations(registry, [upsert(candidate.row())]), upserted=1)
+
+# Endpoint deleting the candidate with this Name
+@router.delete("/api/candidates/{name}")
+async def delete_candidate(name: str, registry: ModelRegistry = Depends(get_registry)):
+    # Up to date with what other workers wrote, so the check sees their candidates
+    await run_in_threadpool(registry.apply_log)
+    if not registry.has_candidate(name):
+        raise HTTPException(status_code=404, detail=f"No candidate {name}")
+    return written(await write_operations(registry, [delete(name)]), deleted=1)
+
+# Endpoint adding or replacing the candidates of an NDJSON body (application/x-ndjson), in one log write
+@router.post("/api/candidates/bulk")
+async def bulk_candidates(request: Request, registry: ModelRegistry = Depends(get_registry)):
+    candidates = parse_candidates(await request.body())
+    return written(await write_operations(registry, [upsert(candidate.row()) for candidate in candidates]), upserted=len(candidates))
+
+# Endpoint folding the candidate log into candidates.csv now rather than when it reaches CANDIDATE_LOG_COMPACT_OPERATIONS
+@router.post("/api/admin/compact")
+async def compact_candidates(registry: ModelRegistry = Depends(get_registry)):
+    try:
+        compacted = await run_in_threadpool(registry.compact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"compacted": compacted, "version": registry.snapshot.version}
+
+ingestion_router = router
@@ -5,15 +5,44 @@ import os
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../"))
 sys.path.append(project_root)
 
+import numpy as np
 import pandas as pd
 import joblib
-import xgboost as xgb
-from app.services.refine_training_data import calculate_experience_score, assign_education_score, calculate_skills_score
+from app.services.feature_store import SOURCE_COLUMNS, CandidateFeatures
+from app.utils.data_loader import load_candidate_frame
+from app.services.ranking import DEFAULT_K, rank_candidates
+from app.utils.metrics import stage_timer
+from app.services.XGboost.predictors import load_predictor
 
 # First access the directory: cd "/Users/philippebrennerroman/Desktop/ZipDev App"
 # Command to execute file: python3 ai_candidate_screening/app/services/xgboost_model/predict_model.py
 
-def predict_scores(job_description: str, candidates_file=os.path.join(os.path.dirname(__file__), "../../data/candidates.csv"), model_path=os.path.join(os.path.dirname(__file__), "model.xgb"), preprocessor_path=os.path.join(os.path.dirname(__file__), "preprocessors.pkl")):
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "model.xgb")
+PREPROCESSOR_PATH = os.path.join(os.path.dirname(__file__), "preprocessors.pkl")
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../../data/candidates.csv")
+
+def load_artifacts(model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, predictor=None, nthread=None):
+    """
+    Load the trained XGBoost model and its preprocessors from disk.
+
+    Args:
+        model_path (str): Path to the trained XGBoost model (.xgb).
+        preprocessor_path (str): Path to the preprocessors file (.pkl).
+        predictor (str, optional): "booster" or "compiled". Defaults to config.XGB_PREDICTOR.
+        nthread (int, optional): Threads per prediction call. Defaults to config.XGB_NTHREAD.
+
+    Returns:
+        dict: The loaded "model" (a predictor from app/services/XGboost/predictors.py), "scaler" and "encoder".
+    """
+    preprocessors = joblib.load(preprocessor_path)
+    # model.xgb is written with Booster.save_model, so it is read back natively rather than unpickled
+    return {
+        "model": load_predictor(model_path, predictor, nthread),
+        "scaler": preprocessors["scaler"],
+        "encoder": preprocessors["encoder"],
+    }
+
+def predict_scores(job_description: str, candidates_file=CANDIDATES_FILE, model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, artifacts=None, candidate_data=None, features=None, k=DEFAULT_K, offset=0, min_score=None):
     """
     Predict scores for candidates from candidates.csv based on a job description using an XGBoost model and return the top 30 candidates.
 
@@ -22,49 +51,69 @@ def predict_scores(job_description: str, candidates_file=os.path.join(os.path.di
         candidates_file (str): Path to the candidates CSV file.
         model_path (str): Path to the trained XGBoost model (.xgb).
         preprocessor_path (str): Path to the preprocessors file (.pkl).
+        artifacts (dict, optional): Preloaded artifacts from load_artifacts. Skips loading the model from disk.
+        candidate_data (pd.DataFrame, optional): Preloaded candidate pool. Skips reading candidates_file. It is not modified.
+        features (CandidateFeatures, optional): Precomputed job-independent features aligned with candidate_data.
+        k (int): Number of candidates to return.
+        offset (int): Number of best candidates to skip, for pagination.
+        min_score (float, optional): Drop candidates scoring below this threshold.
 
     Returns:
-        pd.DataFrame: Candidate ID and Name of top 30 candidates.
+        pd.DataFrame: Name and Score of the top k candidates.
     """
     # Load the trained model and preprocessors
-    model = joblib.load(model_path)
-    preprocessors = joblib.load(preprocessor_path)
-    scaler = preprocessors["scaler"]
-    encoder = preprocessors["encoder"]
+    if artifacts is None:
+        with stage_timer("xgboost", "load_model"):
+            artifacts = load_artifacts(model_path, preprocessor_path)
 
-    # Load candidate data from CSV
-    candidate_data = pd.read_csv(candidates_file)
+    # Load only the candidate columns the features and the ranking need
+    if candidate_data is None:
+        with stage_timer("xgboost", "load_candidates"):
+            candidate_data = load_candidate_frame(candidates_file, ["Name"] + SOURCE_COLUMNS)
 
-    # Ensure no NaN values in relevant columns and convert to string
-    candidate_data["Experiences"] = candidate_data["Experiences"].fillna("").astype(str)  # Replace NaN with empty strings and convert to string
-    candidate_data["Skills"] = candidate_data["Skills"].fillna("").astype(str)  # Replace NaN with empty strings and convert to string
-    candidate_data["Educations"] = candidate_data["Educations"].fillna("").astype(str)  # Replace NaN with empty strings and convert to string
+    # Experience and education scores don't depend on the job description, so they come precomputed
+    if features is None:
+        with stage_timer("xgboost", "candidate_features"):
+            features = CandidateFeatures.from_frame(candidate_data)
 
-    # Extract relevant columns and assign scores
-    candidate_data["Experience_Score"] = candidate_data["Experiences"].apply(calculate_experience_score)
-    candidate_data["Skills_Score"] = candidate_data.apply(
-        lambda row: calculate_skills_score(row["Skills"], row["Experiences"], job_description), axis=1
-    )
-    candidate_data["Education_Score"] = candidate_data["Educations"].apply(assign_education_score)
+    scores = predict_score_matrix([job_description], artifacts, features)[0]
 
-    # Preprocess features
-    X = candidate_data[["Experience_Score", "Skills_Score", "Education_Score"]]
-    X_scaled = scaler.transform(X)  # Normalize features
+    # Return Name and Score of the top k without sorting the whole pool
+    with stage_timer("xgboost", "rank"):
+        return rank_candidates(candidate_data, scores, k, offset, min_score)
 
-    # Create DMatrix for XGBoost prediction
-    dmatrix = xgb.DMatrix(X_scaled)
+def predict_score_matrix(job_descriptions, artifacts, features, rows=None) -> np.ndarray:
+    """
+    Score every candidate for every job description with a single model call.
 
-    # Predict scores using the XGBoost model
-    predictions = model.predict(dmatrix)
+    Args:
+        job_descriptions (list[str]): The job description texts.
+        artifacts (dict): Loaded artifacts from load_artifacts.
+        features (CandidateFeatures): Precomputed features of the candidate pool.
+        rows (np.ndarray, optional): Only score the candidates at these rows, e.g. a retrieval shortlist.
 
-    # Add predictions to the candidate data and scale to 0-100
-    candidate_data["Score"] = predictions * 100
+    Returns:
+        np.ndarray: Scores from 0 to 100 of shape (jobs, candidates).
+    """
+    model = artifacts["model"]
+    scaler = artifacts["scaler"]
+
+    # Only the skills score is computed per job description; the rows of all jobs are stacked
+    with stage_timer("xgboost", "skills_score"):
+        skills_scores = features.matcher.scores(job_descriptions, rows)
+    with stage_timer("xgboost", "features"):
+        X = features.feature_frame(skills_scores, rows=rows)
+
+    # Preprocess features
+    with stage_timer("xgboost", "scale"):
+        X_scaled = scaler.transform(X)  # Normalize features
 
-    # Sort candidates by score in descending order and get the top 30
-    top_candidates = candidate_data.sort_values(by="Score", ascending=False).head(30)
+    # Predict scores using the XGBoost model, straight from the float32 array without a DMatrix
+    with stage_timer("xgboost", "predict"):
+        predictions = model.predict(X_scaled)
 
-    # Return Candidate ID and Name for top 30
-    return top_candidates[["Name", "Score"]].reset_index(drop=True)
+    # Scale predictions to 0-100, one row per job description
+    return predictions.reshape(len(job_descriptions), len(features) if rows is None else len(rows)) * 100
 
 if __name__ == "__main__":
     job_description = "Looking for a Python developer with data analysis expertise and experience with machine learning."
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import numpy as np
+from app import config
+from app.utils.lazy import lazy_import
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "model.xgb")
+COMPILED_DIR = os.path.join(os.path.dirname(__file__), "compiled")
+
+# Serving-side predictors for the XGBoost model. Both take the scaled feature matrix and
+# return one score per row. The booster predictor calls inplace_predict on a contiguous
+# float32 array, which skips building a DMatrix per request; the compiled predictor runs the
+# trees as a shared library generated by treelite/tl2cgen, when those are installed.
+
+xgb = lazy_import("xgboost")
+treelite = lazy_import("treelite")
+tl2cgen = lazy_import("tl2cgen")
+
+def as_features(X) -> np.ndarray:
+    """
+    The feature matrix as the C-contiguous float32 array both predictors read without copying.
+    """
+    return np.ascontiguousarray(X, dtype=np.float32)
+
+class BoosterPredictor:
+    """
+    An xgb.Booster used through inplace_predict, which is safe to call from several threads.
+    """
+
+    def __init__(self, booster, nthread=config.XGB_NTHREAD):
+        self.booster = booster
+        self.nthread = nthread
+        if nthread > 0:
+            # Each gunicorn worker runs its own calls; letting every call use all cores oversubscribes the CPU
+            booster.set_param({"nthread": nthread})
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, nthread=config.XGB_NTHREAD) -> "BoosterPredictor":
+        return cls(xgb.get().Booster(model_file=model_path), nthread)
+
+    def predict(self, X) -> np.ndarray:
+        return self.booster.inplace_predict(as_features(X))
+
+class CompiledPredictor:
+    """
+    The trees compiled to native code with treelite and tl2cgen.
+    """
+
+    def __init__(self, predictor, libpath: str):
+        self.predictor = predictor
+        self.libpath = libpath
+
+    @classmethod
+    def load(cls, model_path=MODEL_PATH, nthread=config.XGB_NTHREAD, compiled_dir=COMPILED_DIR) -> "CompiledPredictor":
+        libpath = compile_model(model_path, compiled_dir)
+        # tl2cgen refuses more threads than cores, where XGBoost just oversubscribes
+        nthread = min(nthread, os.cpu_count() or 1) if nthread > 0 else None
+        return cls(tl2cgen.get().Predictor(libpath, nthread=nthread), libpath)
+
+    def predict(self, X) -> np.ndarray:
+        return self.predictor.predict(tl2cgen.get().DMatrix(as_features(X))).reshape(-1)
+
+def compile_model(model_path=MODEL_PATH, compiled_dir=COMPILED_DIR) -> str:
+    """
+    Compile the model to a shared library, unless a library compiled from the same model file exists.
+
+    Returns:
+        str: Path to the shared library, named after a digest of the model file.
+    """
+    with open(model_path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    libpath = os.path.join(compiled_dir, f"model-{digest}.so")
+    if not os.path.exists(libpath):
+        os.makedirs(compiled_dir, exist_ok=True)
+        model = treelite.get().frontend.load_xgboost_model(model_path)
+        # Build under a temporary name so a worker never loads a partial library
+        tmp_path = f"{libpath}.{os.getpid()}.tmp.so"
+        tl2cgen.get().export_lib(model, toolchain="gcc", libpath=tmp_path, params={"parallel_comp": os.cpu_count() or 1})
+        os.replace(tmp_path, libpath)
+        print(f"XGBoost model compiled to {libpath}")
+    return libpath
+
+def load_predictor(model_path=MODEL_PATH, predictor=None, nthread=None, compiled_dir=COMPILED_DIR):
+    """
+    Load the model with the given predictor.
+
+    Args:
+        model_path (str): Path to the trained XGBoost model (.xgb).
+        predictor (str, optional): "booster" or "compiled" (needs treelite and tl2cgen). Defaults to config.XGB_PREDICTOR.
+        nthread (int, optional): Threads per prediction call; 0 lets XGBoost use every core. Defaults to config.XGB_NTHREAD.
+        compiled_dir (str): Where compiled libraries are kept.
+
+    Returns:
+        BoosterPredictor | CompiledPredictor: An object whose predict(X) returns one score per row.
+    """
+    predictor = predictor or config.XGB_PREDICTOR
+    nthread = config.XGB_NTHREAD if nthread is None else nthread
+    if predictor == "booster":
+        return BoosterPredictor.load(model_path, nthread)
+    if predictor == "compiled":
+        return CompiledPredictor.load(model_path, nthread, compiled_dir)
+    raise ValueError(f"Unknown XGBoost predictor: {predictor}")
@@ -4,10 +4,28 @@ from sklearn.preprocessing import LabelEncoder, StandardScaler
 import xgboost as xgb
 import joblib
 import os
+import sys
+import argparse
+import tempfile
 
-# Command to run file: python3 ai_candidate_screening/app/services/XGboost/train_model.py 
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
-def train_xgboost_model(csv_path=None, model_save_dir=None):
+from app.services.training_data import DEFAULT_CHUNK_ROWS, ChunkedTrainingData
+
+# Command to run file: python3 ai_candidate_screening/app/services/XGboost/train_model.py [--data path] [--streaming]
+
+# Define parameters for the XGBoost model
+PARAMS = {
+    "objective": "reg:squarederror",  # Regression problem
+    "eval_metric": "rmse",           # Root Mean Squared Error
+    "max_depth": 6,                  # Maximum depth of trees
+    "eta": 0.1,                      # Learning rate
+    "subsample": 0.8,                # Subsampling ratio
+    "colsample_bytree": 0.8          # Fraction of features used per tree
+}
+
+def train_xgboost_model(csv_path=None, model_save_dir=None, num_boost_round=100):
     try:
         print("Starting training process...")
 
@@ -55,19 +73,9 @@ def train_xgboost_model(csv_path=None, model_save_dir=None):
         dtrain = xgb.DMatrix(X_train, label=y_train)
         dtest = xgb.DMatrix(X_test, label=y_test)
 
-        # Define parameters for the XGBoost model
-        params = {
-            "objective": "reg:squarederror",  # Regression problem
-            "eval_metric": "rmse",           # Root Mean Squared Error
-            "max_depth": 6,                  # Maximum depth of trees
-            "eta": 0.1,                      # Learning rate
-            "subsample": 0.8,                # Subsampling ratio
-            "colsample_bytree": 0.8          # Fraction of features used per tree
-        }
-
         print("Training model...")
         evals = [(dtrain, "train"), (dtest, "test")]
-        model = xgb.train(params, dtrain, num_boost_round=100, evals=evals, early_stopping_rounds=10)
+        model = xgb.train(PARAMS, dtrain, num_boost_round=num_boost_round, evals=evals, early_stopping_rounds=10)
         print("Model trained.")
 
         # Save the trained model
@@ -83,5 +91,80 @@ def train_xgboost_model(csv_path=None, model_save_dir=None):
     except Exception as e:
         print(f"An error occurred: {e}")
 
+class ChunkIterator(xgb.DataIter):
+    """
+    Feeds XGBoost one chunk of a split at a time. XGBoost calls next() until it returns False,
+    and reset() before every new pass over the data.
+    """
+
+    def __init__(self, data: ChunkedTrainingData, split: str, cache_prefix: str):
+        self.data = data
+        self.split = split
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._batches is None:
+            self._batches = self.data.batches(self.split)
+        batch = next(self._batches, None)
+        if batch is None:
+            return False
+        X, y = batch
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self._batches = None
+
+def train_xgboost_streaming(data_path, model_save_dir=None, chunk_rows=DEFAULT_CHUNK_ROWS, num_boost_round=100):
+    """
+    Train the model out of core: the data is read in chunks and kept by XGBoost as quantized
+    pages in an on-disk cache, so peak memory doesn't grow with the number of rows.
+
+    Args:
+        data_path (str): refined_training_data.csv, or a directory of refined Parquet files from training_pipeline.py.
+        model_save_dir (str, optional): Where model.xgb and preprocessors.pkl are written. Defaults to this directory.
+        chunk_rows (int): Rows read at a time.
+        num_boost_round (int): Boosting rounds, before early stopping.
+
+    Returns:
+        xgb.Booster: The trained model.
+    """
+    model_save_dir = model_save_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(model_save_dir, exist_ok=True)
+
+    print("Fitting preprocessors over the chunks...")
+    data = ChunkedTrainingData(data_path, chunk_rows).fit()
+    print(f"{data.rows} rows.")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        dtrain = xgb.ExtMemQuantileDMatrix(ChunkIterator(data, "train", os.path.join(cache_dir, "train")))
+        dtest = xgb.ExtMemQuantileDMatrix(ChunkIterator(data, "test", os.path.join(cache_dir, "test")), ref=dtrain)
+
+        print("Training model...")
+        evals = [(dtrain, "train"), (dtest, "test")]
+        model = xgb.train(PARAMS, dtrain, num_boost_round=num_boost_round, evals=evals, early_stopping_rounds=10)
+        print("Model trained.")
+        # The matrices remove their cache pages when freed, which has to happen before the directory goes
+        del dtrain, dtest, evals
+
+    model_path = os.path.join(model_save_dir, "model.xgb")
+    model.save_model(model_path)
+    print(f"Model saved to {model_path}")
+
+    preprocessor_path = os.path.join(model_save_dir, "preprocessors.pkl")
+    joblib.dump({"scaler": data.scaler, "encoder": data.encoder}, preprocessor_path)
+    print(f"Preprocessors saved to {preprocessor_path}")
+    return model
+
 if __name__ == "__main__":
-    train_xgboost_model()
+    parser = argparse.ArgumentParser(description="Train the XGBoost model on the refined training data.")
+    parser.add_argument("--data", help="refined_training_data.csv (the default) or a directory of refined Parquet files.")
+    parser.add_argument("--streaming", action="store_true", help="Read the data in chunks instead of loading it into memory.")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk when streaming.")
+    args = parser.parse_args()
+
+    if args.streaming:
+        train_xgboost_streaming(args.data or os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../data/refined_training_data.csv"), chunk_rows=args.chunk_rows)
+    else:
+        train_xgboost_model(args.data)
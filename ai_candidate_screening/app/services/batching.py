@@ -0,0 +1,117 @@
+import asyncio
+import time
+import numpy as np
+from fastapi import Request
+from app import config
+from app.utils.metrics import Histogram
+from app.services.executor import InferenceExecutor, InferenceExecutors
+from app.services.neural_network import predict_model as neural_network_model
+from app.services.XGboost import predict_model as xgboost_model
+
+# Concurrent requests to the same backend all score the same candidate pool. Instead of one
+# model call per request, the MicroBatcher collects the job descriptions that arrive within a
+# short window and scores them together as one stacked (jobs x candidates) feature matrix.
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+WAIT_SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25]
+
+class MicroBatcher:
+    """
+    Coalesces concurrent job descriptions into batched predict calls.
+
+    A batch is flushed once it holds max_batch_size job descriptions or its first one has
+    waited max_wait_ms, whichever comes first. Requests are only batched with requests that
+    use the same snapshot, so a reload never mixes artifacts inside a batch.
+    """
+
+    def __init__(self, name: str, predict_batch, executor: InferenceExecutor, max_batch_size=16, max_wait_ms=5.0):
+        self.name = name
+        # predict_batch(job_descriptions, snapshot) returns a (jobs, candidates) score matrix
+        self.predict_batch = predict_batch
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_sizes = Histogram(f"{name}_batch_size", BATCH_SIZE_BUCKETS, "Job descriptions per predict call")
+        self.wait_seconds = Histogram(f"{name}_batch_wait_seconds", WAIT_SECONDS_BUCKETS, "Time a request waited for its batch to start")
+        self._pending = []
+        self._timer = None
+        self._running = set()
+
+    async def submit(self, job_description: str, snapshot) -> np.ndarray:
+        """
+        Score every candidate for a job description as part of the next batch.
+
+        Returns:
+            np.ndarray: One score per candidate of the snapshot.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((job_description, snapshot, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[1].version, []).append(item)
+        for items in groups.values():
+            task = asyncio.ensure_future(self._run(items))
+            # Keep a reference until the task is done so it isn't garbage collected
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, items):
+        started = time.perf_counter()
+        self.batch_sizes.observe(len(items))
+        for _, _, _, enqueued in items:
+            self.wait_seconds.observe(started - enqueued)
+
+        job_descriptions = [item[0] for item in items]
+        try:
+            scores = await self.executor.run(self.predict_batch, job_descriptions, items[0][1])
+        except Exception as e:
+            for _, _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for row, (_, _, future, _) in zip(scores, items):
+            # A request whose client went away has already been cancelled
+            if not future.done():
+                future.set_result(row)
+
+    def stats(self) -> dict:
+        return {"batchSize": self.batch_sizes.to_dict(), "waitSeconds": self.wait_seconds.to_dict()}
+
+def predict_neural_network_batch(job_descriptions, snapshot):
+    return neural_network_model.predict_score_matrix(job_descriptions, snapshot.artifacts("neural_network"), snapshot.features)
+
+def predict_xgboost_batch(job_descriptions, snapshot):
+    return xgboost_model.predict_score_matrix(job_descriptions, snapshot.artifacts("xgboost"), snapshot.features)
+
+class InferenceBatchers:
+    """
+    One MicroBatcher per model backend, running its batches on the model executor.
+    """
+
+    def __init__(self, executors: InferenceExecutors, max_batch_size=config.BATCH_MAX_SIZE, max_wait_ms=config.BATCH_MAX_WAIT_MS):
+        self.neural_network = MicroBatcher("neural_network", predict_neural_network_batch, executors.model, max_batch_size, max_wait_ms)
+        self.xgboost = MicroBatcher("xgboost", predict_xgboost_batch, executors.model, max_batch_size, max_wait_ms)
+
+    def stats(self) -> dict:
+        return {batcher.name: batcher.stats() for batcher in (self.neural_network, self.xgboost)}
+
+def get_batchers(request: Request) -> InferenceBatchers:
+    """
+    FastAPI dependency returning the batchers attached to the application.
+    """
+    return request.app.state.batchers
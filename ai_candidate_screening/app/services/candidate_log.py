@@ -0,0 +1,292 @@
+import argparse
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+# Command to compact the log into candidates.csv (from ai_candidate_screening/): python -m app.services.candidate_log [--csv path]
+
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")
+
+# Candidates added, replaced or deleted through /api/candidates are appended to a write-ahead
+# log next to candidates.csv, one JSON operation per line, before they are applied. The pool a
+# snapshot serves is candidates.csv with the log replayed on top, in order (see Replay). Workers
+# keep the arrays derived from candidates.csv (features, spaCy vectors, filter index) and apply
+# the log to them as a delta, computing only the rows it wrote. Compaction rewrites
+# candidates.csv with the log applied and starts an empty log; the arrays are rebuilt then.
+# Replaying is idempotent, so processes read the log before the CSV: when a compaction lands
+# in between, they replay operations the CSV already holds and still serve the same pool.
+
+def default_log_path(csv_path: str) -> str:
+    """
+    Path of the log of a candidates file: candidates.csv -> candidates_log.ndjson.
+    """
+    return f"{os.path.splitext(csv_path)[0]}_log.ndjson"
+
+def upsert(candidate: dict) -> dict:
+    return {"op": "upsert", "candidate": candidate}
+
+def delete(name: str) -> dict:
+    return {"op": "delete", "name": name}
+
+class CandidateLog:
+    """
+    The append-only log of candidate operations, shared by every process through the file system.
+
+    Writers and compaction hold an exclusive lock on a sidecar .lock file, readers a shared one.
+    Compaction replaces the log file rather than truncating it, so a reader knows a log it has
+    read from by its (inode, size) position.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+
+    @contextmanager
+    def locked(self, exclusive=False):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def position(self) -> tuple:
+        """
+        (inode, size) of the log file, or (None, 0) when there is none yet.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return (None, 0)
+        return (stat.st_ino, stat.st_size)
+
+    def append(self, operations, check=None) -> tuple:
+        """
+        Durably append operations to the log, all or none of them.
+
+        Args:
+            operations (list[dict]): The operations.
+            check (callable, optional): Called with the operations already in the log before
+                writing, under the same lock, so no other write can slip in between. It raises
+                (e.g. CandidateExists) to refuse the write.
+
+        Returns:
+            tuple: The position of the log once they are written.
+        """
+        data = "".join(json.dumps(operation, ensure_ascii=False) + "\n" for operation in operations).encode("utf-8")
+        with self.locked(exclusive=True):
+            if check is not None:
+                check(self._read()[0])
+            with open(self.path, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            return self.position()
+
+    def _read(self, inode=None, size=None, start=0) -> tuple:
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                # Stop at a position read earlier, unless the log was compacted since
+                end = size if size is not None and stat.st_ino == inode else stat.st_size
+                f.seek(start)
+                data = f.read(max(end - start, 0))
+        except FileNotFoundError:
+            return [], (None, 0)
+        # A line without its newline was cut short by a crash while being written; it was never acknowledged
+        lines = data.split(b"\n")[:-1]
+        return [json.loads(line) for line in lines if line.strip()], (stat.st_ino, start + sum(len(line) + 1 for line in lines))
+
+    def read(self, until=None, since=None) -> tuple:
+        """
+        Read the log, up to the `until` position read earlier if given (all of it if the log was compacted since).
+
+        With a `since` position read earlier, only the operations written after it are read. When
+        the log was compacted since, those are unknown and None is returned instead of them.
+
+        Returns:
+            tuple: The operations, in order, and the position they were read up to.
+        """
+        inode, size = until if until else (None, None)
+        # Nothing was ever written: no need to create the lock file
+        if not os.path.exists(self.path):
+            return ([], (None, 0)) if since is None or since == (None, 0) else (None, (None, 0))
+        with self.locked():
+            if since is None:
+                return self._read(inode, size)
+            if since[0] is not None and os.stat(self.path).st_ino != since[0]:
+                return None, self.position()
+            return self._read(inode, size, start=since[1] if since[0] is not None else 0)
+
+    def compact(self, write_base) -> int:
+        """
+        Fold the log into the base pool: write_base(operations) rewrites it with every operation
+        applied, then the log starts over empty. Writers wait meanwhile.
+
+        Returns:
+            int: The number of operations folded in.
+        """
+        with self.locked(exclusive=True):
+            operations, _ = self._read()
+            if not operations:
+                return 0
+            write_base(operations)
+            temporary_path = f"{self.path}.{os.getpid()}.tmp"
+            open(temporary_path, "wb").close()
+            os.replace(temporary_path, self.path)
+            return len(operations)
+
+class CandidateExists(Exception):
+    """
+    Raised when adding a candidate whose Name is already in the pool.
+    """
+
+class Replay:
+    """
+    The effect of log operations on a base pool, keyed by Name.
+
+    An upsert replaces the row of a Name in place, appends a new row for a Name not in the pool,
+    and puts a deleted base row back in its place; a delete drops the row. The base is never
+    read again, so operations can be applied in several batches as the log grows, and layout()
+    tells which rows of the base the resulting pool keeps and where the written candidates go.
+
+    A base row is always put back at its base position, so replaying operations on a base they
+    were already applied to (e.g. the CSV compaction rewrote) gives the same pool again.
+    """
+
+    def __init__(self, names=(), positions=None, size=None):
+        # The first row of a name is the one operations act on
+        if positions is None:
+            positions = {}
+            for position, name in enumerate(names):
+                positions.setdefault(name, position)
+        self.base = positions
+        self.size = len(names) if size is None else size
+        self.replaced, self.deleted, self.appended = {}, set(), {}
+        self.operations = 0
+
+    def apply(self, operations):
+        """
+        Apply operations, in log order.
+        """
+        for operation in operations:
+            if operation["op"] == "upsert":
+                candidate = operation["candidate"]
+                name = candidate["Name"]
+                if name in self.base:
+                    self.replaced[name] = candidate
+                    self.deleted.discard(name)
+                else:
+                    # Assigning an existing key keeps its position, so updating a new candidate doesn't move it
+                    self.appended[name] = candidate
+            elif operation["op"] == "delete":
+                name = operation["name"]
+                if name in self.appended:
+                    del self.appended[name]
+                elif name in self.base:
+                    self.deleted.add(name)
+                    self.replaced.pop(name, None)
+            else:
+                raise ValueError(f"Unknown candidate log operation: {operation['op']}")
+        self.operations += len(operations)
+
+    def __contains__(self, name) -> bool:
+        return name in self.appended or (name in self.base and name not in self.deleted)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.replaced or self.deleted or self.appended)
+
+    def layout(self) -> tuple:
+        """
+        Rows of the resulting pool.
+
+        Returns:
+            tuple: (rows, candidates) where rows[i] is the base row that row i keeps, or -1 for a row
+            holding a written candidate; `candidates` are those rows' candidates, in order.
+        """
+        keep = np.ones(self.size, dtype=bool)
+        keep[[self.base[name] for name in self.deleted]] = False
+        rows = np.flatnonzero(keep)
+        replaced = sorted(self.replaced.items(), key=lambda item: self.base[item[0]])
+        rows[np.searchsorted(rows, [self.base[name] for name, _ in replaced])] = -1
+        rows = np.concatenate([rows, np.full(len(self.appended), -1, dtype=rows.dtype)])
+        return rows, [candidate for _, candidate in replaced] + list(self.appended.values())
+
+    def extend(self, columns) -> tuple:
+        """
+        Rows of the resulting pool in the base followed by the written candidates, e.g. to gather
+        arrays of the base concatenated with those of the written candidates.
+
+        Returns:
+            tuple: (rows, DataFrame of the written candidates with the given columns).
+        """
+        rows, candidates = self.layout()
+        written = pd.DataFrame([[candidate.get(column) for column in columns] for candidate in candidates], columns=list(columns))
+        rows = rows.copy()
+        rows[rows < 0] = self.size + np.arange(len(written))
+        return rows, written
+
+def apply_operations(candidate_data: pd.DataFrame, operations) -> pd.DataFrame:
+    """
+    Replay operations on a candidate pool, keyed by Name (see Replay).
+
+    Args:
+        candidate_data (pd.DataFrame): The base pool. It is not modified.
+        operations (list[dict]): "upsert" and "delete" operations, in log order.
+
+    Returns:
+        pd.DataFrame: The pool with the operations applied, with a fresh RangeIndex.
+    """
+    if not operations:
+        return candidate_data
+    replay = Replay(candidate_data["Name"].tolist())
+    replay.apply(operations)
+    rows, candidates = replay.layout()
+    written = rows < 0
+    columns = {}
+    for column in candidate_data.columns:
+        values = np.empty(len(rows), dtype=object)
+        values[~written] = candidate_data[column].to_numpy(dtype=object)[rows[~written]]
+        values[written] = [candidate.get(column) for candidate in candidates]
+        columns[column] = values
+    # Numeric columns that went through object arrays get their dtype back
+    return pd.DataFrame(columns, columns=candidate_data.columns).infer_objects()
+
+def write_csv(candidate_data: pd.DataFrame, csv_path: str):
+    """
+    Write a candidates CSV without readers ever seeing a partially written file.
+    """
+    temporary_path = f"{csv_path}.{os.getpid()}.tmp"
+    candidate_data.to_csv(temporary_path, index=False)
+    os.replace(temporary_path, csv_path)
+
+def compact_log(csv_path=CANDIDATES_FILE, log_path=None, store_dir=None) -> int:
+    """
+    Rewrite the candidates CSV with its log applied, and empty the log.
+
+    Returns:
+        int: The number of operations folded into the CSV.
+    """
+    from app.services.candidate_store import load_candidate_store
+
+    log = CandidateLog(log_path or default_log_path(csv_path))
+
+    def write_base(operations):
+        write_csv(apply_operations(load_candidate_store(csv_path, store_dir).frame(), operations), csv_path)
+
+    compacted = log.compact(write_base)
+    print(f"Compacted {compacted} candidate operations into {csv_path}.")
+    return compacted
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold the candidate log into the candidates CSV.")
+    parser.add_argument("--csv", default=CANDIDATES_FILE, help="Candidates CSV file.")
+    parser.add_argument("--log", help="Log file. Defaults to the CSV path without extension plus _log.ndjson.")
+    args = parser.parse_args()
+
+    compact_log(args.csv, args.log)
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from app.utils.storage import atomic_save_arrays, resolve_arrays_dir
+
+# Command to convert the CSV (from ai_candidate_screening/): python -m app.services.candidate_store [--csv path] [--out directory]
+
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")
+META_FILE = "meta.json"
+
+# The columns the scoring code reads. Every column is kept in the store, but loaders can
+# project to these so the free-text question/answer and disqualification columns are never decoded.
+SCORING_COLUMNS = ["Name", "Experiences", "Skills", "Educations", "Keywords", "Summary"]
+
+# The candidate store holds candidates.csv column by column as .npy files. Numeric columns
+# are plain arrays; text columns are one uint8 array of UTF-8 bytes plus int64 offsets, so
+# every file can be memory-mapped. gunicorn workers mapping the same files share their pages
+# through the page cache instead of each parsing the CSV into a private DataFrame.
+
+class StringColumn:
+    """
+    A column of strings encoded as UTF-8 bytes: row i is data[offsets[i]:offsets[i + 1]],
+    or missing when nulls[i] is set.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, nulls: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.nulls)
+
+    @classmethod
+    def encode(cls, values) -> "StringColumn":
+        values = pd.Series(values)
+        nulls = values.isna().to_numpy()
+        encoded = [b"" if null else str(value).encode("utf-8") for value, null in zip(values.tolist(), nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets, nulls)
+
+    def take(self, rows) -> np.ndarray:
+        """
+        Decode the strings at the given rows. Missing values come back as NaN.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        values = np.empty(len(rows), dtype=object)
+        for j, i in enumerate(rows.tolist()):
+            values[j] = np.nan if self.nulls[i] else bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+        return values
+
+    def to_numpy(self) -> np.ndarray:
+        # One copy of the bytes, then slicing Python bytes, is much faster than slicing the map row by row
+        data, offsets, nulls = self.data.tobytes(), self.offsets.tolist(), self.nulls.tolist()
+        values = np.empty(len(self), dtype=object)
+        for i in range(len(self)):
+            values[i] = np.nan if nulls[i] else data[offsets[i]:offsets[i + 1]].decode("utf-8")
+        return values
+
+class GatheredColumn:
+    """
+    Rows of several columns (StringColumn or numeric arrays) as one column, without copying
+    them: row i is row rows[i] of the columns concatenated. Rows are decoded on access only.
+    """
+
+    def __init__(self, parts: list, rows: np.ndarray):
+        self.parts = parts
+        self.rows = rows
+        self.bounds = np.cumsum([0] + [len(part) for part in parts])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def take(self, rows) -> np.ndarray:
+        rows = self.rows[np.asarray(rows, dtype=np.int64)]
+        which = np.searchsorted(self.bounds, rows, "right") - 1
+        values = np.empty(len(rows), dtype=object)
+        for i, part in enumerate(self.parts):
+            mask = which == i
+            if mask.any():
+                local = rows[mask] - self.bounds[i]
+                values[mask] = part.take(local) if isinstance(part, StringColumn) else np.asarray(part)[local]
+        return values
+
+    def to_numpy(self) -> np.ndarray:
+        return self.take(np.arange(len(self)))
+
+class CandidateStore:
+    """
+    Read-only columnar view of the candidate pool.
+
+    Columns are decoded on access only: store["Name"].take(rows) decodes just those rows,
+    and frame(columns) builds a DataFrame of the requested columns.
+    """
+
+    def __init__(self, columns: dict, source=None):
+        # Column name -> StringColumn or numeric np.ndarray, in the CSV's column order
+        self._columns = columns
+        self.source = source or {}
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()))) if self._columns else 0
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    @classmethod
+    def from_frame(cls, candidate_data: pd.DataFrame, source=None) -> "CandidateStore":
+        columns = {}
+        for name in candidate_data.columns:
+            values = candidate_data[name]
+            if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                columns[name] = values.to_numpy()
+            else:
+                columns[name] = StringColumn.encode(values)
+        return cls(columns, source)
+
+    @classmethod
+    def gather(cls, parts: list, rows: np.ndarray) -> "CandidateStore":
+        """
+        Rows of several stores with the same columns, indexed as if they were concatenated, e.g. a
+        base store and a small one of the candidates written since. Nothing is copied or decoded.
+        """
+        return cls({name: GatheredColumn([part[name] for part in parts], rows) for name in parts[0].columns}, parts[0].source)
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """
+        Decode the given columns (every column by default) into a DataFrame like pd.read_csv returns.
+        """
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({
+            name: self._columns[name].to_numpy() if isinstance(self._columns[name], (StringColumn, GatheredColumn)) else np.asarray(self._columns[name])
+            for name in columns
+        })
+
+    def save(self, store_dir: str):
+        arrays, header = {}, []
+        # Files are named by position since column names may contain spaces or slashes
+        for position, (name, column) in enumerate(self._columns.items()):
+            if isinstance(column, StringColumn):
+                arrays.update({f"{position}_data": column.data, f"{position}_offsets": column.offsets, f"{position}_nulls": column.nulls})
+                header.append({"name": name, "kind": "string"})
+            else:
+                arrays[f"{position}_values"] = column
+                header.append({"name": name, "kind": "numeric"})
+        atomic_save_arrays(store_dir, arrays, META_FILE, {"columns": header, "rows": len(self), "source": self.source})
+
+    @staticmethod
+    def read_meta(store_dir: str) -> dict:
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            return json.load(f)
+
+    @classmethod
+    def open(cls, store_dir: str, columns=None, mmap=True) -> "CandidateStore":
+        """
+        Open a saved store, mapping only the requested columns (every column by default).
+        """
+        # Every file is read from the version the store directory points to now, even if it is replaced meanwhile
+        store_dir = resolve_arrays_dir(store_dir)
+        meta = cls.read_meta(store_dir)
+        mmap_mode = "r" if mmap else None
+
+        def load(name):
+            return np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        loaded = {}
+        for position, column in enumerate(meta["columns"]):
+            if columns is not None and column["name"] not in columns:
+                continue
+            if column["kind"] == "string":
+                loaded[column["name"]] = StringColumn(load(f"{position}_data"), load(f"{position}_offsets"), load(f"{position}_nulls"))
+            else:
+                loaded[column["name"]] = load(f"{position}_values")
+        missing = [name for name in (columns or []) if name not in loaded]
+        if missing:
+            raise KeyError(f"Columns not in the candidate store: {missing}")
+        return cls(loaded, meta["source"])
+
+def default_store_dir(csv_path: str) -> str:
+    """
+    Directory of the store converted from a CSV file: candidates.csv -> candidates_store/.
+    """
+    return f"{os.path.splitext(csv_path)[0]}_store"
+
+def source_signature(csv_path: str) -> dict:
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def ingest_csv(csv_path=CANDIDATES_FILE, store_dir=None) -> CandidateStore:
+    """
+    Parse the CSV once and write it as a candidate store.
+    """
+    store_dir = store_dir or default_store_dir(csv_path)
+    signature = source_signature(csv_path)
+    CandidateStore.from_frame(pd.read_csv(csv_path), signature).save(store_dir)
+    print(f"Candidate store written to {store_dir}.")
+    return CandidateStore.open(store_dir)
+
+def load_candidate_store(csv_path=CANDIDATES_FILE, store_dir=None, columns=None) -> CandidateStore:
+    """
+    Open the candidate store of a CSV file, converting the CSV first when the store is missing
+    or older than the file (by size and modification time).
+
+    Args:
+        csv_path (str): Path to the candidates CSV file.
+        store_dir (str, optional): Directory of the store. Defaults to default_store_dir(csv_path).
+        columns (list[str], optional): Only map these columns.
+
+    Returns:
+        CandidateStore: The memory-mapped store.
+    """
+    store_dir = store_dir or default_store_dir(csv_path)
+    signature = source_signature(csv_path)
+    if not os.path.exists(os.path.join(store_dir, META_FILE)) or CandidateStore.read_meta(store_dir)["source"] != signature:
+        ingest_csv(csv_path, store_dir)
+    return CandidateStore.open(store_dir, columns)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a candidates CSV into a memory-mappable columnar store.")
+    parser.add_argument("--csv", default=CANDIDATES_FILE, help="Candidates CSV file.")
+    parser.add_argument("--out", help="Store directory. Defaults to the CSV path without extension plus _store.")
+    args = parser.parse_args()
+
+    store = ingest_csv(args.csv, args.out)
+    print(f"{len(store)} candidates, {len(store.columns)} columns.")
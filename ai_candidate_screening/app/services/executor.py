@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import Request
+from app import config
+from app.services.spacy_similarity import get_nlp
+
+# Scoring is CPU-bound and synchronous. Running it directly in an `async def` route blocks
+# the event loop, so one slow request stalls every other request on the worker. Routes
+# instead await InferenceExecutor.run, which runs the work in a pool and keeps the loop free.
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when an executor already has max_pending requests running or queued.
+    """
+
+class InferenceTimeout(Exception):
+    """
+    Raised when a request waited longer than the executor's timeout for its result.
+    """
+
+class InferenceExecutor:
+    """
+    A thread or process pool with a bounded number of pending requests and a per-request timeout.
+
+    Threads suit the NumPy, XGBoost and TensorFlow paths, which release the GIL while they
+    compute. Processes suit pure-Python work such as spaCy, which doesn't.
+    """
+
+    def __init__(self, name: str, kind="thread", max_workers=4, max_pending=32, timeout=30.0, initializer=None):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        # Runs once in each new worker, e.g. to load a pipeline before the first request arrives
+        self.initializer = initializer
+        # A slot is taken when a request is accepted and only given back once its work has
+        # actually finished (or was cancelled before starting), so timed out work that is
+        # still running keeps counting against the limit.
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _create_pool(self):
+        if self.kind == "process":
+            # spawn rather than fork: forking a worker that has TensorFlow threads running is unsafe
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=self.initializer)
+        if self.kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{self.name}-inference", initializer=self.initializer)
+        raise ValueError(f"Unknown executor kind: {self.kind}")
+
+    @property
+    def pool(self):
+        """
+        The underlying pool, created on first use (and again after a shutdown).
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+            return self._pool
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the pool and wait for its result.
+
+        Raises:
+            ExecutorSaturated: Too many requests are already pending.
+            InferenceTimeout: The result didn't arrive within the timeout.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(f"The {self.name} executor is saturated ({self.max_pending} pending requests).")
+        try:
+            future = self.pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            # Drops the work if it is still queued; running work can't be interrupted
+            future.cancel()
+            raise InferenceTimeout(f"The {self.name} executor didn't answer within {self.timeout}s.")
+
+    def shutdown(self, wait=True):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+class InferenceExecutors:
+    """
+    The executors the routes run scoring on: one for the model backends and one for spaCy.
+    """
+
+    def __init__(self):
+        self.model = InferenceExecutor(
+            "model",
+            kind="thread",
+            max_workers=config.MODEL_EXECUTOR_WORKERS,
+            max_pending=config.MAX_PENDING_REQUESTS,
+            timeout=config.REQUEST_TIMEOUT_SECONDS,
+        )
+        self.spacy = InferenceExecutor(
+            "spacy",
+            kind=config.SPACY_EXECUTOR,
+            max_workers=config.SPACY_EXECUTOR_WORKERS,
+            max_pending=config.MAX_PENDING_REQUESTS,
+            timeout=config.REQUEST_TIMEOUT_SECONDS,
+            initializer=get_nlp,
+        )
+
+    def shutdown(self, wait=True):
+        self.model.shutdown(wait)
+        self.spacy.shutdown(wait)
+
+def get_executors(request: Request) -> InferenceExecutors:
+    """
+    FastAPI dependency returning the executors attached to the application.
+    """
+    return request.app.state.executors
@@ -0,0 +1,249 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from app.utils.hashing import content_hashes
+from app.utils.gather import gather_ragged, gather_rows
+from app.utils.storage import atomic_savez
+from app.utils.shared_arrays import publish_arrays, share_arrays
+from app.utils.data_loader import load_candidate_frame
+from app.services.skills_matcher import SkillsMatcher
+from app.services.refine_training_data import extract_candidate_keywords
+from app.services.text_features import education_scores, experience_scores
+
+# Command to build the store: python -m app.services.feature_store
+
+FEATURE_STORE_PATH = os.path.join(os.path.dirname(__file__), "../data/candidate_features.npz")
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")
+
+# Columns the job-independent features are derived from. A row is recomputed only when its hash over these changes.
+SOURCE_COLUMNS = ["Experiences", "Skills", "Educations"]
+
+class CandidateFeatures:
+    """
+    Column-oriented, job-independent features of the candidate pool, aligned with the candidate rows.
+
+    The experience and education scores don't depend on the job description, so they are computed
+    once. Each candidate's keyword set (see extract_candidate_keywords) is stored flattened in
+    `keywords`, with the keywords of row i in keywords[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, hashes, experience_scores, education_scores, keywords, offsets):
+        self.hashes = hashes
+        self.experience_scores = experience_scores
+        self.education_scores = education_scores
+        self.keywords = keywords
+        self.offsets = offsets
+        self._matcher = None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @classmethod
+    def from_frame(cls, candidate_data: pd.DataFrame) -> "CandidateFeatures":
+        """
+        Compute the features of every row of a candidate DataFrame.
+        """
+        experiences = candidate_data["Experiences"].fillna("").astype(str)
+        skills = candidate_data["Skills"].fillna("").astype(str)
+        educations = candidate_data["Educations"].fillna("").astype(str)
+
+        keyword_sets = [sorted(extract_candidate_keywords(s, e)) for s, e in zip(skills, experiences)]
+        return cls(
+            hashes=content_hashes(candidate_data, SOURCE_COLUMNS),
+            experience_scores=experience_scores(experiences),
+            education_scores=education_scores(educations),
+            keywords=np.array([keyword for keywords in keyword_sets for keyword in keywords], dtype=str),
+            offsets=np.cumsum([0] + [len(keywords) for keywords in keyword_sets], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path=FEATURE_STORE_PATH) -> "CandidateFeatures":
+        with np.load(path) as data:
+            return cls(data["hashes"], data["experience_scores"], data["education_scores"], data["keywords"], data["offsets"])
+
+    def save(self, path=FEATURE_STORE_PATH):
+        atomic_savez(
+            path,
+            hashes=self.hashes,
+            experience_scores=self.experience_scores,
+            education_scores=self.education_scores,
+            keywords=self.keywords,
+            offsets=self.offsets,
+        )
+
+    def _shared_arrays(self) -> dict:
+        matcher = self.matcher
+        return {
+            "hashes": self.hashes,
+            "experience_scores": self.experience_scores,
+            "education_scores": self.education_scores,
+            "keywords": self.keywords,
+            "offsets": self.offsets,
+            "matcher_data": matcher.matrix.data,
+            "matcher_indices": matcher.matrix.indices,
+            "matcher_indptr": matcher.matrix.indptr,
+            # The matcher's vocabulary, by column
+            "matcher_terms": np.array(sorted(matcher.vocabulary, key=matcher.vocabulary.get), dtype=str),
+        }
+
+    def share(self, directory: str) -> "CandidateFeatures":
+        """
+        Return the same features backed by read-only files in a shared directory, so every
+        worker maps one copy. The skills matcher's sparse matrix is shared too; only its
+        vocabulary dict stays private.
+        """
+        return CandidateFeatures.attach(share_arrays("features", self._shared_arrays(), directory))
+
+    def publish(self, directory: str) -> str:
+        """
+        Publish the features in a shared directory without mapping them, and return the publication's path.
+        """
+        return publish_arrays("features", self._shared_arrays(), directory)
+
+    @classmethod
+    def attach(cls, arrays: dict, meta=None) -> "CandidateFeatures":
+        """
+        Return the features backed by the mapped arrays of a publication (see attach_arrays).
+        """
+        features = cls(arrays["hashes"], arrays["experience_scores"], arrays["education_scores"], arrays["keywords"], arrays["offsets"])
+        terms = arrays["matcher_terms"]
+        matrix = csr_matrix((arrays["matcher_data"], arrays["matcher_indices"], arrays["matcher_indptr"]), shape=(len(features), len(terms)), copy=False)
+        features._matcher = SkillsMatcher({term: i for i, term in enumerate(terms.tolist())}, matrix)
+        return features
+
+    @classmethod
+    def gather(cls, base: "CandidateFeatures", extra: "CandidateFeatures", rows) -> "CandidateFeatures":
+        """
+        Return the features of rows of `base` followed by `extra`, e.g. a pool that differs from the
+        base pool by the rows of `extra`. Only the rows of `extra` go through the skills matcher;
+        the base rows are copied, in runs where they keep their order.
+        """
+        keywords, offsets = gather_ragged([(base.keywords, base.offsets), (extra.keywords, extra.offsets)], rows)
+        features = cls(
+            hashes=gather_rows([base.hashes, extra.hashes], rows),
+            experience_scores=gather_rows([base.experience_scores, extra.experience_scores], rows),
+            education_scores=gather_rows([base.education_scores, extra.education_scores], rows),
+            keywords=keywords,
+            offsets=offsets,
+        )
+        features._matcher = base.matcher.extend(extra.keywords, extra.offsets).take(rows)
+        return features
+
+    def candidate_keywords(self, i: int) -> list:
+        return self.keywords[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def take(self, rows) -> "CandidateFeatures":
+        """
+        Return the features of the given rows, in the given order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        keyword_lists = [self.candidate_keywords(i) for i in rows]
+        return CandidateFeatures(
+            hashes=self.hashes[rows],
+            experience_scores=self.experience_scores[rows],
+            education_scores=self.education_scores[rows],
+            keywords=np.array([keyword for keywords in keyword_lists for keyword in keywords], dtype=str),
+            offsets=np.cumsum([0] + [len(keywords) for keywords in keyword_lists], dtype=np.int64),
+        )
+
+    def slice(self, start: int, stop: int) -> "CandidateFeatures":
+        """
+        Return the features of rows start to stop, without decoding the keywords row by row like take().
+        """
+        begin, end = self.offsets[start], self.offsets[stop]
+        return CandidateFeatures(
+            hashes=self.hashes[start:stop],
+            experience_scores=self.experience_scores[start:stop],
+            education_scores=self.education_scores[start:stop],
+            keywords=self.keywords[begin:end],
+            offsets=self.offsets[start:stop + 1] - begin,
+        )
+
+    @property
+    def matcher(self) -> SkillsMatcher:
+        """
+        Sparse keyword matcher over the candidates, built on first use.
+        """
+        if self._matcher is None:
+            self._matcher = SkillsMatcher.from_flat_keywords(self.keywords, self.offsets)
+        return self._matcher
+
+    def skills_scores(self, job_description: str) -> np.ndarray:
+        """
+        Calculate calculate_skills_score for every candidate against one job description.
+        """
+        return self.matcher.score(job_description)
+
+    def feature_frame(self, skills_scores, index=None, rows=None) -> pd.DataFrame:
+        """
+        Assemble the model input features in the order the scalers were fitted on.
+
+        skills_scores holds either one score per candidate, or a (candidates, jobs) matrix. For a
+        matrix the rows are stacked job by job: every candidate for the first job, then the second...
+        When rows is given, skills_scores only covers the candidates at those rows.
+        """
+        skills_scores = np.asarray(skills_scores)
+        jobs = 1 if skills_scores.ndim == 1 else skills_scores.shape[1]
+        experience_scores = self.experience_scores if rows is None else self.experience_scores[rows]
+        education_scores = self.education_scores if rows is None else self.education_scores[rows]
+        return pd.DataFrame({
+            "Experience_Score": np.tile(experience_scores, jobs),
+            "Skills_Score": skills_scores.T.ravel(),
+            "Education_Score": np.tile(education_scores, jobs),
+        }, index=index)
+
+def concat_features(parts) -> CandidateFeatures:
+    """
+    Concatenate several CandidateFeatures row-wise.
+    """
+    keyword_offsets = [0]
+    for part in parts:
+        keyword_offsets.append(keyword_offsets[-1] + len(part.keywords))
+    return CandidateFeatures(
+        hashes=np.concatenate([part.hashes for part in parts]),
+        experience_scores=np.concatenate([part.experience_scores for part in parts]),
+        education_scores=np.concatenate([part.education_scores for part in parts]),
+        keywords=np.concatenate([part.keywords for part in parts]).astype(str),
+        offsets=np.concatenate([[0]] + [part.offsets[1:] + base for part, base in zip(parts, keyword_offsets)]).astype(np.int64),
+    )
+
+def load_feature_store(candidate_data: pd.DataFrame, path=FEATURE_STORE_PATH) -> CandidateFeatures:
+    """
+    Return the features of candidate_data, reusing the persisted store for unchanged rows.
+
+    Rows are matched to the stored features by content hash, so only added or edited
+    candidates are recomputed. The store on disk is rewritten when anything changed.
+
+    Args:
+        candidate_data (pd.DataFrame): The current candidate pool.
+        path (str): Path of the .npz feature store.
+
+    Returns:
+        CandidateFeatures: Features aligned with the rows of candidate_data.
+    """
+    hashes = content_hashes(candidate_data, SOURCE_COLUMNS)
+    stored = CandidateFeatures.load(path) if os.path.exists(path) else None
+
+    if stored is not None and np.array_equal(stored.hashes, hashes):
+        return stored
+
+    # Map every known hash to a stored row and recompute only the rows without one
+    known = {} if stored is None else {h: i for i, h in enumerate(stored.hashes.tolist())}
+    stale = [i for i, h in enumerate(hashes.tolist()) if h not in known]
+    # An empty pool without a store still gets empty arrays of the right dtypes
+    fresh = CandidateFeatures.from_frame(candidate_data.iloc[stale]) if stale or stored is None else None
+
+    parts = [part for part in (stored, fresh) if part is not None]
+    combined = concat_features(parts) if len(parts) > 1 else parts[0]
+    fresh_offset = 0 if stored is None else len(stored)
+    fresh_rows = {row: fresh_offset + j for j, row in enumerate(stale)}
+    order = [fresh_rows[i] if i in fresh_rows else known[h] for i, h in enumerate(hashes.tolist())]
+    features = combined.take(order)
+
+    features.save(path)
+    print(f"Feature store updated: {len(stale)} of {len(features)} candidates recomputed.")
+    return features
+
+if __name__ == "__main__":
+    load_feature_store(load_candidate_frame(CANDIDATES_FILE, SOURCE_COLUMNS))
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+from app.utils.shared_arrays import publish_arrays
+
+# Structured columns of candidates.csv that requests can filter on, by request field name.
+# Filters are resolved against this index before scoring, so only the candidates that pass them
+# go through feature extraction and the model.
+FILTER_COLUMNS = {
+    "jobLocation": "Job location",
+    "stage": "Stage",
+    "tags": "Tags",
+    "source": "Source",
+    "department": "Job department",
+    "disqualified": "Disqualified",
+}
+# Columns holding several comma separated values per candidate
+MULTI_VALUE_COLUMNS = {"Tags"}
+
+# A value held by fewer than one candidate in SPARSE_RATIO keeps its sorted rows (4 bytes each)
+# rather than a bitmap (1 bit per candidate), whichever is smaller, like roaring bitmaps do.
+SPARSE_RATIO = 32
+
+def normalize_value(value) -> str:
+    """
+    Filter values match regardless of case and surrounding spaces.
+    """
+    return str(value).strip().casefold()
+
+class FilterIndex:
+    """
+    Inverted index of the filterable columns: for each value, the candidate rows holding it, as a
+    packed bitmap (np.packbits, one bit per candidate) or as sorted rows for rare values.
+    """
+
+    def __init__(self, postings: dict, size: int):
+        # {column: {normalized value: packed uint8 bitmap or int32 rows}}
+        self.postings = postings
+        self.size = size
+
+    @classmethod
+    def build(cls, candidate_data: pd.DataFrame, columns=tuple(FILTER_COLUMNS.values())) -> "FilterIndex":
+        size = len(candidate_data)
+        postings = {}
+        for column in columns:
+            if column not in candidate_data:
+                postings[column] = {}
+                continue
+            values = candidate_data[column]
+            rows = np.arange(size, dtype=np.int32)
+            if column in MULTI_VALUE_COLUMNS:
+                # One (row, value) pair per item of each row
+                items = values.astype("string").str.split(",").explode()
+                rows, values = items.index.to_numpy(dtype=np.int32), items
+            present = values.notna().to_numpy()
+            normalized = pd.Series(values[present].astype(str).map(normalize_value).to_numpy())
+            codes, uniques = pd.factorize(normalized)
+            rows = rows[present]
+            # Group the rows by value with one sort instead of a pass over the pool per value
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            postings[column] = {
+                value: cls._posting(np.unique(rows[order[bounds[code]:bounds[code + 1]]]), size)
+                for code, value in enumerate(uniques) if value
+            }
+        return cls(postings, size)
+
+    @staticmethod
+    def _posting(rows: np.ndarray, size: int) -> np.ndarray:
+        if len(rows) * SPARSE_RATIO < size:
+            return rows.astype(np.int32)
+        mask = np.zeros(size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _bitmap(self, posting: np.ndarray) -> np.ndarray:
+        if posting.dtype == np.uint8:
+            return posting
+        mask = np.zeros(self.size, dtype=bool)
+        mask[posting] = True
+        return np.packbits(mask)
+
+    def match(self, filters: dict) -> np.ndarray:
+        """
+        Packed bitmap of the candidates passing every filter.
+
+        Args:
+            filters (dict): {column: values}; a candidate passes a column's filter when it holds any of the values.
+
+        Returns:
+            np.ndarray: np.packbits of the rows that pass.
+        """
+        result = None
+        for column, values in filters.items():
+            postings = self.postings.get(column, {})
+            matched = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+            for value in {normalize_value(value) for value in values}:
+                if value in postings:
+                    matched |= self._bitmap(postings[value])
+            result = matched if result is None else result & matched
+            if not result.any():
+                break
+        return result if result is not None else np.packbits(np.ones(self.size, dtype=bool))
+
+    def rows(self, filters: dict):
+        """
+        Sorted rows of the candidates passing every filter, or None when there is no filter (every row passes).
+        """
+        if not filters:
+            return None
+        return np.flatnonzero(np.unpackbits(self.match(filters), count=self.size))
+
+    @classmethod
+    def gather(cls, base: "FilterIndex", extra: "FilterIndex", rows) -> "FilterIndex":
+        """
+        Return the index of rows of the candidates of `base` followed by those of `extra`, indexed
+        as if they were concatenated, without reading the candidates again.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        # New position of each row of base and extra, -1 when it isn't kept
+        positions = np.full(base.size + extra.size, -1, dtype=np.int64)
+        positions[rows] = np.arange(len(rows))
+        postings = {}
+        for column in dict.fromkeys(list(base.postings) + list(extra.postings)):
+            postings[column] = {}
+            for value in dict.fromkeys(list(base.postings.get(column, {})) + list(extra.postings.get(column, {}))):
+                held = [index._rows(index.postings.get(column, {}).get(value)) + offset for index, offset in ((base, 0), (extra, base.size))]
+                moved = positions[np.concatenate(held)]
+                moved = np.sort(moved[moved >= 0])
+                if len(moved):
+                    postings[column][value] = cls._posting(moved, len(rows))
+        return cls(postings, len(rows))
+
+    def _rows(self, posting) -> np.ndarray:
+        if posting is None:
+            return np.zeros(0, dtype=np.int64)
+        if posting.dtype == np.uint8:
+            return np.flatnonzero(np.unpackbits(posting, count=self.size))
+        return posting.astype(np.int64)
+
+    def publish(self, directory: str) -> str:
+        """
+        Publish the postings in a shared directory, concatenated into one array per dtype, and return the publication's path.
+        """
+        parts = {"bitmaps": [np.zeros(0, dtype=np.uint8)], "rows": [np.zeros(0, dtype=np.int32)]}
+        lengths = {"bitmaps": 0, "rows": 0}
+        entries = []
+        for column, postings in self.postings.items():
+            for value, posting in postings.items():
+                kind = "bitmaps" if posting.dtype == np.uint8 else "rows"
+                parts[kind].append(posting)
+                entries.append([column, value, kind, lengths[kind], lengths[kind] + len(posting)])
+                lengths[kind] += len(posting)
+        arrays = {kind: np.concatenate(kind_parts) for kind, kind_parts in parts.items()}
+        return publish_arrays("filter_index", arrays, directory, {"size": self.size, "columns": list(self.postings), "postings": entries})
+
+    @classmethod
+    def attach(cls, arrays: dict, meta: dict) -> "FilterIndex":
+        """
+        Return the index backed by the mapped arrays of a publication (see attach_arrays).
+        """
+        postings = {column: {} for column in meta["columns"]}
+        for column, value, kind, start, stop in meta["postings"]:
+            postings[column][value] = arrays[kind][start:stop]
+        return cls(postings, meta["size"])
+
+    def values(self) -> dict:
+        """
+        {column: {value: number of candidates}} of the indexed values.
+        """
+        return {
+            column: {value: int(np.unpackbits(posting, count=self.size).sum()) if posting.dtype == np.uint8 else len(posting) for value, posting in postings.items()}
+            for column, postings in self.postings.items()
+        }
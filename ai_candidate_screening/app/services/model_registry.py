@@ -0,0 +1,431 @@
+import hashlib
+import threading
+import time
+import numpy as np
+from fastapi import Request
+from app import config
+from app.utils.hashing import content_hashes, file_stamp
+from app.utils.shared_arrays import deployment_dir, read_manifest, write_manifest
+from app.utils.metrics import stage_timer
+from app.services.candidate_log import CandidateExists, CandidateLog, Replay, compact_log, default_log_path, upsert
+from app.services.candidate_store import CandidateStore, load_candidate_store
+from app.services.feature_store import FEATURE_STORE_PATH, SOURCE_COLUMNS, CandidateFeatures, concat_features, load_feature_store
+from app.services.filter_index import FilterIndex
+from app.services.spacy_similarity import VECTORS_PATH, CandidateVectors, installed_model, load_candidate_vectors
+from app.services.vector_index import INDEX_DIR, load_vector_index, patch_vector_index
+from app.services.neural_network import predict_model as neural_network_model
+from app.services.XGboost import predict_model as xgboost_model
+
+# The registry is created once per process (i.e. once per gunicorn worker) by the
+# FastAPI lifespan in app/main.py. Requests never load artifacts themselves: they
+# grab the current snapshot through the get_snapshot dependency and keep using it
+# until they finish, so a reload can swap in a new snapshot at any time without
+# affecting requests that are already running.
+
+BACKEND_LOADERS = {
+    "neural_network": neural_network_model.load_artifacts,
+    "xgboost": xgboost_model.load_artifacts,
+}
+
+# Files the loaders read. Their stamp, with the candidates file's, identifies what a snapshot was built from.
+ARTIFACT_FILES = [
+    neural_network_model.MODEL_PATH,
+    neural_network_model.PREPROCESSOR_PATH,
+    neural_network_model.WEIGHTS_PATH,
+    xgboost_model.MODEL_PATH,
+    xgboost_model.PREPROCESSOR_PATH,
+]
+
+class ArtifactSnapshot:
+    """
+    Everything a request needs to score candidates: the memory-mapped candidate pool, its
+    precomputed features, spaCy vectors and their index, the index of its filterable columns,
+    and the loaded artifacts of each backend.
+    A snapshot is never modified after it is built.
+    """
+
+    def __init__(self, candidate_data, features, candidate_vectors, backends, version, sources=None, vector_index=None, artifact_stamp=None, filter_index=None):
+        self.candidate_data = candidate_data
+        self.features = features
+        self.candidate_vectors = candidate_vectors
+        self.vector_index = vector_index
+        self.filter_index = filter_index
+        self.backends = backends
+        self.version = version
+        # Files the snapshot was loaded from, for code that runs in other processes
+        self.sources = sources or {}
+        self.loaded_at = time.time()
+        # Stamp of the artifact and candidate files it was built from; the same in every worker
+        self.artifact_stamp = artifact_stamp
+        # Candidate log operations replayed on top of the candidates file
+        self.log_operations = 0
+
+    def artifacts(self, backend: str) -> dict:
+        """
+        Return the loaded artifacts ("model", "scaler", "encoder") of a backend.
+        """
+        return self.backends[backend]
+
+class ModelRegistry:
+    """
+    Holds the current ArtifactSnapshot and atomically replaces it on reload.
+    """
+
+    def __init__(self, candidates_file=neural_network_model.CANDIDATES_FILE, feature_store_path=FEATURE_STORE_PATH, vectors_path=VECTORS_PATH, index_dir=INDEX_DIR, store_dir=None, shared_dir=config.SHARED_ARRAYS_DIR, loaders=None, artifact_files=ARTIFACT_FILES, log_path=None):
+        self.candidates_file = candidates_file
+        self.artifact_files = artifact_files
+        # Where the feature, vector and filter arrays are published for other workers to map; empty keeps
+        # them private. Each deployment (candidates file) publishes in its own subdirectory
+        self.shared_dir = deployment_dir(shared_dir, candidates_file) if shared_dir else ""
+        # Columnar store of candidates_file; defaults to a directory next to it
+        self.store_dir = store_dir
+        self.feature_store_path = feature_store_path
+        self.vectors_path = vectors_path
+        self.index_dir = index_dir
+        self.loaders = loaders if loaders is not None else BACKEND_LOADERS
+        # Candidates added, replaced or deleted through the API since candidates.csv was written
+        self.log = CandidateLog(log_path or default_log_path(candidates_file))
+        self._log_checked_at = 0.0
+        self._compaction = None
+        # The pool of the candidates file and its derived arrays, reloaded at compaction; the log is applied on top
+        self._base = None
+        self._replay = None
+        self._written = None
+        self._log_position = None
+        self._snapshot = None
+        self._version = 0
+        # Serializes loads so two concurrent reloads don't race each other
+        self._load_lock = threading.Lock()
+
+    def _load_base(self) -> dict:
+        """
+        Load the pool of the candidates file, without the log, and the job-independent arrays derived from it.
+
+        With a shared directory, the arrays another process already published for the same file
+        are mapped as they are. Otherwise they are computed, reusing the persisted feature store
+        and vector cache by content hash, and published for the other workers.
+        """
+        # Taken before loading, so a file changing mid-load leaves the base looking outdated rather than current
+        stamp = file_stamp([self.candidates_file])
+        candidate_data = load_candidate_store(self.candidates_file, self.store_dir)
+
+        key = self.shared_key(stamp)
+        published = read_manifest(self.shared_dir, key) if self.shared_dir else None
+        if published is not None and len(published["features"][0]["hashes"]) != len(candidate_data):
+            # The candidates file changed between the stamp and the load
+            published = None
+        if published is None:
+            # The decoded frame is only needed to compute the derived arrays; requests read
+            # names straight from the memory-mapped store
+            candidate_frame = candidate_data.frame()
+            features = load_feature_store(candidate_frame, self.feature_store_path)
+            # Build the sparse skills matcher now rather than on the first request
+            features.matcher
+            candidate_vectors = load_candidate_vectors(candidate_frame, self.vectors_path)
+            filter_index = FilterIndex.build(candidate_frame)
+            del candidate_frame
+            if self.shared_dir:
+                write_manifest(self.shared_dir, key, {
+                    "features": features.publish(self.shared_dir),
+                    "spacy_vectors": candidate_vectors.publish(self.shared_dir),
+                    "filter_index": filter_index.publish(self.shared_dir),
+                })
+                # Map the publications like the other workers do, dropping the private copies
+                published = read_manifest(self.shared_dir, key)
+        if published is not None:
+            features = CandidateFeatures.attach(*published["features"])
+            candidate_vectors = CandidateVectors.attach(*published["spacy_vectors"])
+            filter_index = FilterIndex.attach(*published["filter_index"])
+        with stage_timer("registry", "load_vector_index"):
+            vector_index = load_vector_index(candidate_vectors, self.index_dir)
+        return {
+            "stamp": stamp, "key": key, "candidate_data": candidate_data, "features": features, "candidate_vectors": candidate_vectors,
+            "filter_index": filter_index, "vector_index": vector_index,
+            # The first row of each Name, for replaying the log
+            "positions": Replay(candidate_data["Name"].to_numpy().tolist()).base,
+        }
+
+    def shared_key(self, stamp: str) -> str:
+        """
+        Fingerprint of what the shared arrays are computed from, which every worker computes the same
+        way: the stamp of the candidates file and the spaCy model.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f"{stamp}:{installed_model()}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def publish_shared_arrays(self):
+        """
+        Publish the shared arrays without loading any model, e.g. in the gunicorn master before
+        it forks, so the workers only map them.
+        """
+        self._load_base()
+
+    def _load_pool(self, rebuild=False):
+        """
+        Bring the pool up to date with the log, applying the operations written since the last call
+        on top of the base pool. The base is (re)loaded first on the first call, when `rebuild` is
+        set, and after a compaction rewrote the candidates file.
+
+        Returns:
+            dict or None: The arrays of the pool, or None when the log didn't change since the last call.
+        """
+        operations = None
+        if not rebuild and self._base is not None and file_stamp([self.candidates_file]) == self._base["stamp"]:
+            # None when the log was compacted since
+            operations, position = self.log.read(since=self._log_position)
+            if operations == [] and position == self._log_position:
+                return None
+        if operations is None:
+            # The log is read before the candidates file, see candidate_log.py
+            operations, position = self.log.read()
+            self._base = self._load_base()
+            self._replay = Replay(positions=self._base["positions"], size=len(self._base["candidate_data"]))
+            self._written = None
+        self._replay.apply(operations)
+        self._log_position = position
+        with stage_timer("registry", "apply_log"):
+            return self._apply_replay()
+
+    def _apply_replay(self) -> dict:
+        """
+        The arrays of the base pool with the replayed operations applied: the base rows a pool keeps
+        are gathered, and only written candidates not seen before are featurized and embedded.
+        """
+        base = self._base
+        pool = {name: base[name] for name in ("candidate_data", "features", "candidate_vectors", "filter_index", "vector_index")}
+        if not self._replay.changed:
+            return pool
+        rows, frame = self._replay.extend(base["candidate_data"].columns)
+        written = rows >= self._replay.size
+
+        def extended(positions):
+            # The written candidates' rows in arrays holding fewer rows than `frame`, deduplicated by content
+            extended_rows = rows.copy()
+            extended_rows[written] = self._replay.size + np.asarray(positions, dtype=np.int64)
+            return extended_rows
+
+        pool["candidate_data"] = CandidateStore.gather([base["candidate_data"], CandidateStore.from_frame(frame)], rows)
+        pool["filter_index"] = FilterIndex.gather(base["filter_index"], FilterIndex.build(frame), rows)
+        features, feature_positions, candidate_vectors, vector_positions = self._written_arrays(frame)
+        pool["features"] = CandidateFeatures.gather(base["features"], features, extended(feature_positions))
+        pool["candidate_vectors"] = CandidateVectors.gather(base["candidate_vectors"], candidate_vectors, extended(vector_positions))
+        pool["vector_index"] = patch_vector_index(base["vector_index"], pool["candidate_vectors"])
+        return pool
+
+    def _written_arrays(self, frame) -> tuple:
+        """
+        Features and vectors of the candidates written since the base was loaded, computed once per
+        content hash and kept until the next base.
+
+        Returns:
+            tuple: The features and the row of each candidate of `frame` in them, then the same for the vectors.
+        """
+        if self._written is None:
+            self._written = {"features": None, "feature_rows": {}, "vectors": None, "vector_rows": {}}
+        written = self._written
+        feature_hashes = content_hashes(frame, SOURCE_COLUMNS).tolist()
+        new = [i for i, h in enumerate(feature_hashes) if h not in written["feature_rows"]]
+        if new or written["features"] is None:
+            fresh = CandidateFeatures.from_frame(frame.iloc[new])
+            offset = 0 if written["features"] is None else len(written["features"])
+            written["features"] = fresh if written["features"] is None else concat_features([written["features"], fresh])
+            for j, i in enumerate(new):
+                written["feature_rows"].setdefault(feature_hashes[i], offset + j)
+
+        vector_hashes = content_hashes(frame, list(frame.columns)).tolist()
+        new = [i for i, h in enumerate(vector_hashes) if h not in written["vector_rows"]]
+        if new or written["vectors"] is None:
+            fresh = CandidateVectors.from_frame(frame.iloc[new])
+            if written["vectors"] is None:
+                offset, written["vectors"] = 0, fresh
+            else:
+                offset = len(written["vectors"])
+                written["vectors"] = CandidateVectors(
+                    np.concatenate([written["vectors"].hashes, fresh.hashes]), np.vstack([written["vectors"].vectors, fresh.vectors]), fresh.pipeline,
+                )
+            for j, i in enumerate(new):
+                written["vector_rows"].setdefault(vector_hashes[i], offset + j)
+        return (
+            written["features"], [written["feature_rows"][h] for h in feature_hashes],
+            written["vectors"], [written["vector_rows"][h] for h in vector_hashes],
+        )
+
+    def artifact_stamp(self) -> str:
+        """
+        Stamp of the artifact and candidate files as they are on disk now.
+        """
+        return file_stamp([self.candidates_file, self.log.path] + list(self.artifact_files))
+
+    def _build_snapshot(self, backends=None, rebuild=True):
+        """
+        Build a snapshot of the pool brought up to date with the log, loading the models unless `backends` are given.
+        Without `rebuild`, returns None when the log didn't change since the last snapshot.
+        """
+        # Taken before loading, so files changing mid-load leave the snapshot looking outdated rather than current
+        artifact_stamp = self.artifact_stamp()
+        with stage_timer("registry", "load_candidates"):
+            pool = self._load_pool(rebuild)
+        if pool is None:
+            return None
+        if backends is None:
+            backends = {}
+            for name, loader in self.loaders.items():
+                with stage_timer(name, "load_model"):
+                    backends[name] = loader()
+        self._version += 1
+        sources = {
+            "candidates_file": self.candidates_file, "store_dir": self.store_dir, "vectors_path": self.vectors_path, "index_dir": self.index_dir,
+            # How far the log was replayed, so process-pool workers replay the same operations
+            "log_path": self.log.path, "log_position": self._log_position,
+            # Where process-pool workers map the arrays published for the candidates file
+            "shared_dir": self.shared_dir, "shared_key": self._base["key"],
+        }
+        snapshot = ArtifactSnapshot(
+            pool["candidate_data"], pool["features"], pool["candidate_vectors"], backends, self._version, sources,
+            pool["vector_index"], artifact_stamp, pool["filter_index"],
+        )
+        snapshot.log_operations = self._replay.operations
+        return snapshot
+
+    def load(self) -> ArtifactSnapshot:
+        """
+        Load the artifacts if they haven't been loaded yet and return the current snapshot.
+        """
+        with self._load_lock:
+            if self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+                print(f"Loaded artifacts (version {self._snapshot.version}).")
+            return self._snapshot
+
+    def reload(self) -> ArtifactSnapshot:
+        """
+        Load a fresh snapshot from disk and swap it in.
+
+        The new artifacts are fully loaded before the swap, so in-flight requests keep
+        the snapshot they started with and a failed reload leaves the current one in place.
+        """
+        with self._load_lock:
+            snapshot = self._build_snapshot()
+            self._snapshot = snapshot
+        print(f"Reloaded artifacts (version {snapshot.version}).")
+        return snapshot
+
+    def apply_log(self) -> ArtifactSnapshot:
+        """
+        Swap in a snapshot of the candidate pool with the log as it is now, keeping the loaded models.
+        Returns the current snapshot when it is already up to date with the log.
+        """
+        with self._load_lock:
+            current = self._snapshot
+            if current is None:
+                snapshot = self._build_snapshot()
+            else:
+                snapshot = self._build_snapshot(current.backends, rebuild=False)
+                if snapshot is None:
+                    return current
+            self._snapshot = snapshot
+        print(f"Applied the candidate log (version {snapshot.version}, {len(snapshot.candidate_data)} candidates).")
+        return snapshot
+
+    def has_candidate(self, name: str) -> bool:
+        """
+        Whether a candidate with this Name is in the pool of the current snapshot.
+        """
+        with self._load_lock:
+            return self._replay is not None and name in self._replay
+
+    def add_candidates(self, candidates) -> tuple:
+        """
+        Append upserts of new candidates to the log.
+
+        Whether a Name is taken is checked against the candidates file and the whole log under
+        the log's lock, so two workers adding the same Name at once can't both succeed.
+
+        Raises:
+            CandidateExists: If a candidate with one of the Names is in the pool; nothing is written then.
+
+        Returns:
+            tuple: The position of the log once they are written.
+        """
+        def check(operations):
+            replay = Replay(positions=self._base_positions(), size=0)
+            replay.apply(operations)
+            for candidate in candidates:
+                if candidate["Name"] in replay:
+                    raise CandidateExists(candidate["Name"])
+
+        return self.log.append([upsert(candidate) for candidate in candidates], check)
+
+    def _base_positions(self) -> dict:
+        base = self._base
+        if base is not None and base["stamp"] == file_stamp([self.candidates_file]):
+            return base["positions"]
+        # Compacted since this worker loaded its base
+        return Replay(load_candidate_store(self.candidates_file, self.store_dir, columns=["Name"])["Name"].to_numpy().tolist()).base
+
+    def refresh(self, check_seconds=config.CANDIDATE_LOG_CHECK_SECONDS) -> ArtifactSnapshot:
+        """
+        Return the current snapshot, first applying what other workers appended to the log since.
+        The log is checked at most every check_seconds.
+        """
+        snapshot = self.snapshot
+        now = time.monotonic()
+        if now - self._log_checked_at < check_seconds:
+            return snapshot
+        self._log_checked_at = now
+        if snapshot.sources.get("log_position") != self.log.position():
+            return self.apply_log()
+        return snapshot
+
+    def compact(self) -> int:
+        """
+        Fold the log into candidates.csv and swap in a snapshot read from the rewritten store.
+
+        Returns:
+            int: The number of operations folded in.
+        """
+        compacted = compact_log(self.candidates_file, self.log.path, self.store_dir)
+        self.apply_log()
+        return compacted
+
+    def compact_in_background(self, min_operations=config.CANDIDATE_LOG_COMPACT_OPERATIONS) -> bool:
+        """
+        Start compacting in a background thread once the log holds min_operations, unless a compaction is already running.
+
+        Returns:
+            bool: Whether a compaction was started.
+        """
+        with self._load_lock:
+            if self._snapshot is None or self._snapshot.log_operations < min_operations:
+                return False
+            if self._compaction is not None and self._compaction.is_alive():
+                return False
+            self._compaction = threading.Thread(target=self._compact_quietly, name="candidate-log-compaction", daemon=True)
+            self._compaction.start()
+        return True
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Compaction failed, keeping the log: {e}")
+
+    @property
+    def snapshot(self) -> ArtifactSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.load()
+        return snapshot
+
+def get_registry(request: Request) -> ModelRegistry:
+    """
+    FastAPI dependency returning the registry attached to the application.
+    """
+    return request.app.state.registry
+
+def get_snapshot(request: Request) -> ArtifactSnapshot:
+    """
+    FastAPI dependency returning the snapshot a request should use for its whole duration.
+    """
+    return get_registry(request).refresh()
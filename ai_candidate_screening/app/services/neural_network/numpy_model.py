@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+from app.utils.storage import atomic_savez
+
+# Command to export the trained model (from ai_candidate_screening/): python -m app.services.neural_network.numpy_model
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), "model.h5")
+PREPROCESSOR_PATH = os.path.join(os.path.dirname(__file__), "preprocessors.pkl")
+WEIGHTS_PATH = os.path.join(os.path.dirname(__file__), "model_weights.npz")
+
+# The network is three dense layers (3 -> 64 -> 32 -> 1). Its weights and the scaler's mean
+# and scale are exported to a plain .npz, and the forward pass below reproduces Keras'
+# model.predict with a few float32 matrix products, so serving never imports TensorFlow.
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0, out=x),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "tanh": np.tanh,
+}
+
+class Standardizer:
+    """
+    The transform of a fitted StandardScaler: (X - mean) / scale.
+    """
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean = mean
+        self.scale = scale
+
+    def transform(self, X) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+class DenseNetwork:
+    """
+    Forward pass of a stack of dense layers, with the same predict() signature as a Keras model.
+    """
+
+    def __init__(self, layers, scaler=None, source=None):
+        # (kernel, bias, activation) per layer, in order
+        self.layers = [(np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation) for kernel, bias, activation in layers]
+        for _, _, activation in self.layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.scaler = scaler
+        # Digest of the Keras files the weights were exported from
+        self.source = source
+
+    def predict(self, X, batch_size=4096, verbose=0) -> np.ndarray:
+        """
+        Run the network over X in batches, like model.predict: float32 inputs and outputs of shape (rows, units).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        outputs = np.empty((len(X), self.layers[-1][0].shape[1]), dtype=np.float32)
+        for start in range(0, len(X), batch_size):
+            hidden = X[start:start + batch_size]
+            for kernel, bias, activation in self.layers:
+                hidden = ACTIVATIONS[activation](hidden @ kernel + bias)
+            outputs[start:start + batch_size] = hidden
+        return outputs
+
+    def save(self, path: str):
+        arrays = {}
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            arrays[f"kernel_{i}"] = kernel
+            arrays[f"bias_{i}"] = bias
+        if self.scaler is not None:
+            arrays["scaler_mean"] = self.scaler.mean
+            arrays["scaler_scale"] = self.scaler.scale
+        meta = {"activations": [activation for _, _, activation in self.layers], "source": self.source}
+        # A loading worker never reads a partial file, and concurrent exports don't share a temporary file
+        atomic_savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "DenseNetwork":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            layers = [(data[f"kernel_{i}"], data[f"bias_{i}"], activation) for i, activation in enumerate(meta["activations"])]
+            scaler = Standardizer(data["scaler_mean"], data["scaler_scale"]) if "scaler_mean" in data else None
+        return cls(layers, scaler, meta["source"])
+
+def source_digest(paths) -> str:
+    """
+    A digest of the content of the Keras model and preprocessor files, to tell whether an export is current.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def layers_from_keras(model) -> list:
+    """
+    The (kernel, bias, activation) of each dense layer of a Keras model.
+    """
+    layers = []
+    for layer in model.layers:
+        kernel, bias = layer.get_weights()
+        layers.append((kernel, bias, layer.get_config()["activation"]))
+    return layers
+
+def layers_from_h5(model_path: str) -> list:
+    """
+    The (kernel, bias, activation) of each dense layer of a saved .h5 model, read with h5py alone.
+    """
+    import h5py
+
+    with h5py.File(model_path, "r") as f:
+        config = json.loads(f.attrs["model_config"])
+        weights = f["model_weights"]
+        layers = []
+        for layer in config["config"]["layers"]:
+            if layer["class_name"] == "InputLayer":
+                continue
+            if layer["class_name"] != "Dense":
+                raise ValueError(f"Unsupported layer: {layer['class_name']}")
+            # Weights sit under model_weights/<layer>/<model>/<layer>/{kernel,bias}, depending on the Keras version
+            datasets = {}
+
+            def collect(path, item):
+                if isinstance(item, h5py.Dataset):
+                    datasets[path.rsplit("/", 1)[-1]] = item[()]
+
+            weights[layer["config"]["name"]].visititems(collect)
+            layers.append((datasets["kernel"], datasets["bias"], layer["config"]["activation"]))
+    return layers
+
+def export_weights(model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, weights_path=WEIGHTS_PATH, model=None, scaler=None) -> DenseNetwork:
+    """
+    Export the trained network and its scaler to a .npz the NumPy runtime loads.
+
+    Args:
+        model_path (str): Path to the trained neural network model (.h5).
+        preprocessor_path (str): Path to the preprocessors file (.pkl).
+        weights_path (str): Path of the .npz to write.
+        model (keras.Model, optional): The model in memory. Defaults to reading model_path with h5py.
+        scaler (StandardScaler, optional): The fitted scaler. Defaults to the one in preprocessor_path.
+
+    Returns:
+        DenseNetwork: The exported network.
+    """
+    if scaler is None:
+        import joblib
+
+        scaler = joblib.load(preprocessor_path)["scaler"]
+    layers = layers_from_keras(model) if model is not None else layers_from_h5(model_path)
+    network = DenseNetwork(layers, Standardizer(scaler.mean_, scaler.scale_), source_digest([model_path, preprocessor_path]))
+    network.save(weights_path)
+    print(f"Network weights exported to {weights_path}")
+    return network
+
+def load_network(model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, weights_path=WEIGHTS_PATH) -> DenseNetwork:
+    """
+    Load the exported network, exporting it first when the export is missing or older than the Keras files.
+    """
+    if os.path.exists(weights_path):
+        network = DenseNetwork.load(weights_path)
+        if network.source == source_digest([model_path, preprocessor_path]):
+            return network
+    return export_weights(model_path, preprocessor_path, weights_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the Keras network and its scaler to a .npz for the NumPy runtime.")
+    parser.add_argument("--model", default=MODEL_PATH, help="Trained Keras model (.h5).")
+    parser.add_argument("--preprocessors", default=PREPROCESSOR_PATH, help="Preprocessors file (.pkl).")
+    parser.add_argument("--out", default=WEIGHTS_PATH, help="Weights file to write (.npz).")
+    args = parser.parse_args()
+
+    network = export_weights(args.model, args.preprocessors, args.out)
+    print(" -> ".join(str(kernel.shape[0]) for kernel, _, _ in network.layers) + f" -> {network.layers[-1][0].shape[1]}")
@@ -3,12 +3,51 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense
+from tensorflow.keras.optimizers import Adam
 import joblib
 import os
+import sys
+import argparse
 
-# Command to run file: python ai_candidate_screening/app/services/neural_network/train_model.py 
+# Add the project root directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
-def train_neural_network(csv_path, model_save_dir="app/services/neural_ network"):
+from app.services.neural_network.numpy_model import export_weights
+from app.services.training_data import DEFAULT_CHUNK_ROWS, FEATURE_COLUMNS, ChunkedTrainingData
+
+# Command to run file: python ai_candidate_screening/app/services/neural_network/train_model.py [--data path] [--streaming]
+
+# Rows held by the shuffle buffer when streaming; the buffer is the only data kept in memory
+SHUFFLE_BUFFER_ROWS = 100_000
+
+def build_model(input_dim: int, hidden_units=(64, 32), learning_rate=0.001) -> Sequential:
+    """
+    The regression network, compiled: 3 -> 64 -> 32 -> 1 unless other hidden layer sizes are given.
+    """
+    model = Sequential()
+    model.add(Dense(hidden_units[0], input_dim=input_dim, activation="relu"))
+    for units in hidden_units[1:]:
+        model.add(Dense(units, activation="relu"))
+    model.add(Dense(1))  # Regression output (Score)
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss="mean_squared_error", metrics=["mae"])
+    return model
+
+def save_model_files(model, scaler, encoder, model_save_dir):
+    """
+    Save the model, its preprocessors, and the weights export the NumPy runtime serves.
+    """
+    model_path = f"{model_save_dir}/model.h5"
+    model.save(model_path)
+    print(f"Model saved to {model_path}")
+
+    preprocessor_path = f"{model_save_dir}/preprocessors.pkl"
+    joblib.dump({"scaler": scaler, "encoder": encoder}, preprocessor_path)
+    print(f"Preprocessors saved to {preprocessor_path}")
+
+    # Export the weights and scaler for the NumPy runtime, which serves without TensorFlow
+    export_weights(model_path, preprocessor_path, f"{model_save_dir}/model_weights.npz", model=model, scaler=scaler)
+
+def train_neural_network(csv_path, model_save_dir="app/services/neural_ network", epochs=50):
     try:
         print("Starting training process...")
         os.makedirs(model_save_dir, exist_ok=True)
@@ -40,30 +79,71 @@ def train_neural_network(csv_path, model_save_dir="app/services/neural_ network"
 
         # Build a neural network model
         print("Building model...")
-        model = Sequential()
-        model.add(Dense(64, input_dim=X_train.shape[1], activation="relu"))
-        model.add(Dense(32, activation="relu"))
-        model.add(Dense(1))  # Regression output (Score)
+        model = build_model(X_train.shape[1])
 
-        print("Compiling model...")
-        model.compile(optimizer="adam", loss="mean_squared_error", metrics=["mae"])
         print("Training model...")
-        model.fit(X_train, y_train, epochs=50, batch_size=32, validation_data=(X_test, y_test))
+        model.fit(X_train, y_train, epochs=epochs, batch_size=32, validation_data=(X_test, y_test))
         print("Model trained.")
 
-        # Save the trained model
-        model_path = f"{model_save_dir}/model.h5"
-        model.save(model_path)
-        print(f"Model saved to {model_path}")
-
-        # Save preprocessors
-        preprocessor_path = f"{model_save_dir}/preprocessors.pkl"
-        joblib.dump({"scaler": scaler, "encoder": encoder}, preprocessor_path)
-        print(f"Preprocessors saved to {preprocessor_path}")
+        # Save the trained model and preprocessors
+        save_model_files(model, scaler, encoder, model_save_dir)
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
+def chunk_dataset(data: ChunkedTrainingData, split: str, batch_size=32, shuffle=False):
+    """
+    A tf.data pipeline over one split, reading the chunks from disk again on every epoch.
+    """
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_generator(
+        lambda: data.batches(split),
+        output_signature=(
+            tf.TensorSpec(shape=(None, len(FEATURE_COLUMNS)), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        ),
+    ).unbatch()
+    if shuffle:
+        dataset = dataset.shuffle(SHUFFLE_BUFFER_ROWS, seed=data.seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+def train_neural_network_streaming(data_path, model_save_dir="app/services/neural_network", chunk_rows=DEFAULT_CHUNK_ROWS, epochs=50):
+    """
+    Train the network out of core: the scaler is fitted chunk by chunk with partial_fit, and
+    Keras reads the rows through tf.data from disk, so peak memory doesn't grow with the number of rows.
+
+    Args:
+        data_path (str): refined_training_data.csv, or a directory of refined Parquet files from training_pipeline.py.
+        model_save_dir (str): Where model.h5, preprocessors.pkl and model_weights.npz are written.
+        chunk_rows (int): Rows read at a time.
+        epochs (int): Passes over the training split.
+
+    Returns:
+        Sequential: The trained model.
+    """
+    os.makedirs(model_save_dir, exist_ok=True)
+
+    print("Fitting preprocessors over the chunks...")
+    data = ChunkedTrainingData(data_path, chunk_rows).fit()
+    print(f"{data.rows} rows.")
+
+    model = build_model(len(FEATURE_COLUMNS))
+    print("Training model...")
+    model.fit(chunk_dataset(data, "train", shuffle=True), epochs=epochs, validation_data=chunk_dataset(data, "test"))
+    print("Model trained.")
+
+    save_model_files(model, data.scaler, data.encoder, model_save_dir)
+    return model
+
 if __name__ == "__main__":
-    csv_path = "app/data/refined_training_data.csv"  # Update with actual CSV path
-    train_neural_network(csv_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the neural network on the refined training data.")
+    parser.add_argument("--data", default="app/data/refined_training_data.csv", help="refined_training_data.csv or a directory of refined Parquet files.")
+    parser.add_argument("--streaming", action="store_true", help="Read the data in chunks instead of loading it into memory.")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per chunk when streaming.")
+    args = parser.parse_args()
+
+    if args.streaming:
+        train_neural_network_streaming(args.data, chunk_rows=args.chunk_rows)
+    else:
+        train_neural_network(args.data)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+# Every backend ends with a score per candidate and only needs the best few of them.
+# Sorting (and copying) the whole pool for that is O(n log n) in time and O(n) in rows;
+# selecting the winners first only sorts the k of them.
+
+DEFAULT_K = 30
+
+def top_k_indices(scores: np.ndarray, k=DEFAULT_K, offset=0, min_score=None) -> np.ndarray:
+    """
+    Indices of the highest scores in descending order, without sorting the whole array.
+
+    Equal scores are ranked by position, so pages of the same scores never overlap.
+
+    Args:
+        scores (np.ndarray): One score per candidate.
+        k (int): Number of indices to return.
+        offset (int): Number of best scores to skip, for pagination.
+        min_score (float, optional): Drop scores below this threshold.
+
+    Returns:
+        np.ndarray: Up to k indices into scores.
+    """
+    scores = np.asarray(scores)
+    if scores.dtype.kind == "f" and np.isnan(scores).any():
+        # A NaN score ranks last instead of breaking the comparisons
+        scores = np.where(np.isnan(scores), -np.inf, scores)
+    n = min(offset + k, len(scores))
+    if k <= 0 or n <= offset:
+        return np.zeros(0, dtype=np.int64)
+
+    if n < len(scores):
+        # The n-th highest score; everything above it wins and the ties are taken in order
+        threshold = np.partition(scores, len(scores) - n)[len(scores) - n]
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[:n - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(len(scores))
+
+    # Sort only the winners, by descending score and then by position
+    winners = candidates[np.lexsort((candidates, -scores[candidates]))][offset:n]
+    if min_score is not None:
+        winners = winners[scores[winners] >= min_score]
+    return winners
+
+def rank_candidates(candidate_data: pd.DataFrame, scores: np.ndarray, k=DEFAULT_K, offset=0, min_score=None, rows=None) -> pd.DataFrame:
+    """
+    Return the names and scores of the highest scoring candidates.
+
+    Only the winners' rows are materialized; the other columns of candidate_data are never copied.
+
+    Args:
+        candidate_data (pd.DataFrame or CandidateStore): The candidate pool the scores are aligned with.
+        scores (np.ndarray): One score per candidate.
+        k (int): Number of candidates to return.
+        offset (int): Number of best candidates to skip, for pagination.
+        min_score (float, optional): Drop candidates scoring below this threshold.
+        rows (np.ndarray, optional): Rows of candidate_data the scores belong to, when only a shortlist was scored.
+
+    Returns:
+        pd.DataFrame: Name and Score of the winners, best first.
+    """
+    scores = np.asarray(scores)
+    winners = top_k_indices(scores, k, offset, min_score)
+    # take() decodes only the winners when candidate_data is a CandidateStore
+    names = np.asarray(candidate_data["Name"].take(winners if rows is None else np.asarray(rows)[winners]))
+    return pd.DataFrame({"Name": names, "Score": scores[winners]})
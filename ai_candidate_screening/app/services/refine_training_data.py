@@ -1,6 +1,12 @@
-from sklearn.preprocessing import MinMaxScaler
 import pandas as pd
 import re
+from app.services.skills_matcher import SkillsMatcher
+from app.services.text_features import education_scores, experience_scores
+
+# Columns of the training data that are dropped once the scores are computed
+TEXT_COLUMNS = ["Candidate ID", "Name", "Job Description", "Education", "Experience", "Skills"]
+# Columns scaled to 0-1 in the refined training data
+SCALED_COLUMNS = ["Education_Score", "Experience_Score", "Skills_Score", "Score"]
 
 def preprocess_training_data(csv_path: str, job_description: str, save_path="app/data/refined_training_data.csv"):
     """
@@ -11,26 +17,33 @@ def preprocess_training_data(csv_path: str, job_description: str, save_path="app
     df = pd.read_csv(csv_path)
     
     # Preprocessed columns
-    df["Education_Score"] = df["Education"].apply(assign_education_score)
-    df["Experience_Score"] = df["Experience"].apply(calculate_experience_score)
-    df["Skills_Score"] = df.apply(
-        lambda row: calculate_skills_score(row["Skills"], row["Experience"], job_description), axis=1
-    )
+    add_feature_scores(df, job_description)
 
-    # Normalize all scores to a range of 0-1
+    # Normalize all scores to a range of 0-1 (scikit-learn is imported here so the scoring helpers stay light to import)
+    from sklearn.preprocessing import MinMaxScaler
     scaler = MinMaxScaler()
-    df[["Education_Score", "Experience_Score", "Skills_Score", "Score"]] = scaler.fit_transform(
-        df[["Education_Score", "Experience_Score", "Skills_Score", "Score"]]
-    )
+    df[SCALED_COLUMNS] = scaler.fit_transform(df[SCALED_COLUMNS])
 
     # Drop original text-based columns
-    df.drop(columns=["Candidate ID", "Name", "Job Description", "Education", "Experience", "Skills"], inplace=True)
+    df.drop(columns=TEXT_COLUMNS, inplace=True)
 
     # Save the refined data
     df.to_csv(save_path, index=False)
     print(f"Refined training data saved to {save_path}")
     return df
 
+def add_feature_scores(df: pd.DataFrame, job_description: str) -> pd.DataFrame:
+    """
+    Add the unscaled Education_Score, Experience_Score and Skills_Score columns to rows of training data.
+    Each row is scored on its own, so the rows can be refined in chunks.
+    """
+    # Whole-column equivalents of assign_education_score and calculate_experience_score
+    df["Education_Score"] = education_scores(df["Education"])
+    df["Experience_Score"] = experience_scores(df["Experience"])
+    keyword_sets = [extract_candidate_keywords(skills, experience) for skills, experience in zip(df["Skills"], df["Experience"])]
+    df["Skills_Score"] = SkillsMatcher.from_keyword_sets(keyword_sets).score(job_description)
+    return df
+
 def assign_education_score(education: str) -> float:
     """
     Assign a numerical score to the education column.
@@ -59,22 +72,23 @@ def calculate_experience_score(experience: str) -> float:
         return total_years
     return 0
 
+def extract_candidate_keywords(skills: str, experience: str) -> set:
+    """
+    Extract the keywords a candidate is matched on: the comma separated skills,
+    or the words of the experience when skills are empty.
+    """
+    # If skills are empty, use experience
+    if pd.isna(skills) or skills.strip() == "":
+        return set(experience.lower().split())
+    return set(skills.lower().split(","))
+
 def calculate_skills_score(skills: str, experience: str, job_description: str) -> float:
     """
     Calculate a skills score based on matching skills to the job description.
     If skills are empty, derive a score based on experience and job description keywords.
     """
     job_keywords = set(job_description.lower().split())
-    
-    # If skills are empty, use experience to derive score
-    if pd.isna(skills) or skills.strip() == "":
-        experience_keywords = set(experience.lower().split())
-        matches = job_keywords.intersection(experience_keywords)
-        return len(matches) / len(job_keywords) if job_keywords else 0
-
-    # If skills are not empty, calculate based on skills
-    candidate_skills = set(skills.lower().split(","))
-    matches = job_keywords.intersection(candidate_skills)
+    matches = job_keywords.intersection(extract_candidate_keywords(skills, experience))
     return len(matches) / len(job_keywords) if job_keywords else 0
 
 # Add the execution statement
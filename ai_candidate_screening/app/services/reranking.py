@@ -0,0 +1,68 @@
+import numpy as np
+from app.services.ranking import DEFAULT_K, rank_candidates
+from app.utils.metrics import stage_timer
+from app.services.spacy_similarity import embed_texts, normalize_rows
+from app.services.neural_network import predict_model as neural_network_model
+from app.services.XGboost import predict_model as xgboost_model
+
+# Two-stage scoring for large pools: the vector index shortlists the candidates closest to
+# the job description, and only the shortlist goes through the NN or XGBoost features and model.
+# Requests with filters likewise only score the rows passing them (app/services/filter_index.py).
+
+SCORE_MATRIX_FUNCTIONS = {
+    "neural_network": neural_network_model.predict_score_matrix,
+    "xgboost": xgboost_model.predict_score_matrix,
+}
+
+def shortlist_rows(job_description: str, snapshot, size: int, allowed=None) -> np.ndarray:
+    """
+    Rows of the snapshot's candidates whose spaCy vectors are closest to the job description.
+    With `allowed` rows, only those can be shortlisted.
+    """
+    if allowed is not None and len(allowed) <= size:
+        # The filters already leave no more candidates than the shortlist holds
+        return allowed
+    # The index doesn't know the filters: fetch enough to expect `size` rows among the allowed ones
+    fetch = size if allowed is None else min(len(snapshot.candidate_vectors), int(np.ceil(size * len(snapshot.candidate_vectors) / len(allowed))))
+    job_vector = normalize_rows(embed_texts([job_description]))
+    ids, _ = snapshot.vector_index.search(job_vector, fetch)[0]
+    # Candidates with identical content share an id, expanded to each of their rows once
+    rows, _ = snapshot.candidate_vectors.rows(ids)
+    if allowed is not None:
+        rows = rows[np.isin(rows, allowed)][:size]
+    return rows
+
+def rerank_candidates(job_description: str, snapshot, backend: str, shortlist: int, k=DEFAULT_K, offset=0, min_score=None, rows=None):
+    """
+    Score a shortlist retrieved from the vector index with a backend's model and rank it.
+
+    Args:
+        job_description (str): The job description text.
+        snapshot (ArtifactSnapshot): The artifacts to use.
+        backend (str): "neural_network" or "xgboost".
+        shortlist (int): Number of candidates retrieved before reranking.
+        k (int): Number of candidates to return.
+        offset (int): Number of best candidates to skip, for pagination.
+        min_score (float, optional): Drop candidates scoring below this threshold.
+        rows (np.ndarray, optional): Only shortlist candidates at these rows, e.g. those passing the request's filters.
+
+    Returns:
+        pd.DataFrame: Name and Score of the top k candidates of the shortlist.
+    """
+    with stage_timer(backend, "shortlist"):
+        rows = shortlist_rows(job_description, snapshot, shortlist, rows)
+    return score_rows(job_description, snapshot, backend, rows, k, offset, min_score)
+
+def score_rows(job_description: str, snapshot, backend: str, rows: np.ndarray, k=DEFAULT_K, offset=0, min_score=None):
+    """
+    Score only the candidates at the given rows with a backend's model and rank them.
+
+    Returns:
+        pd.DataFrame: Name and Score of the top k of those candidates.
+    """
+    if len(rows) == 0:
+        # Nothing passes the filters; the models can't be called on zero rows
+        return rank_candidates(snapshot.candidate_data, np.empty(0), k, offset, min_score, rows=rows)
+    scores = SCORE_MATRIX_FUNCTIONS[backend]([job_description], snapshot.artifacts(backend), snapshot.features, rows)[0]
+    with stage_timer(backend, "rank"):
+        return rank_candidates(snapshot.candidate_data, scores, k, offset, min_score, rows=rows)
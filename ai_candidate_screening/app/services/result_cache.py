@@ -0,0 +1,168 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from app import config
+
+# Recruiters submit the same job descriptions over and over. Responses of the predict endpoints
+# are cached under a key made of the backend, what it reads of the job description, the request's
+# ranking options and the stamp of the artifact and candidate files, so a retrained model or an
+# edited candidates.csv never serves an old answer.
+
+def normalize_job_description(job_description: str, backend: str, shortlist=None) -> str:
+    """
+    The part of a job description a backend's scores depend on, so descriptions that share it score the same.
+
+    The model backends only read the set of lowercased whitespace-separated words (SkillsMatcher.scores),
+    punctuation included. spaCy embeds the text as it is, extra whitespace included, and so does the
+    vector index that retrieves a shortlist.
+    """
+    if backend == "spacy" or shortlist:
+        return job_description
+    return " ".join(sorted(set(job_description.lower().split())))
+
+class ResultCache:
+    """
+    An LRU cache with a TTL, in memory per worker, optionally backed by a SQLite file shared by every worker.
+
+    Results are only cached while the files on disk match the snapshot serving the request. Between
+    a file change and the reload that picks it up, requests bypass the cache, and the memory tier
+    is cleared once the change is seen.
+    """
+
+    def __init__(self, stamp, max_entries=config.RESULT_CACHE_SIZE, ttl_seconds=config.RESULT_CACHE_TTL_SECONDS, db_path=config.RESULT_CACHE_DB, check_seconds=config.RESULT_CACHE_CHECK_SECONDS):
+        # stamp() returns the current stamp of the artifact and candidate files (ModelRegistry.artifact_stamp)
+        self.stamp = stamp
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.check_seconds = check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_stamp = None
+        self._checked_at = 0.0
+        self.counters = {"hits": 0, "diskHits": 0, "misses": 0, "evictions": 0, "expirations": 0, "bypassed": 0, "invalidations": 0}
+        if self.db_path:
+            with self._connect() as connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=1.0)
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def current_stamp(self) -> str:
+        """
+        The stamp of the files on disk, checked at most every check_seconds. A change clears the memory tier.
+        """
+        now = time.monotonic()
+        if self._disk_stamp is None or now - self._checked_at >= self.check_seconds:
+            stamp = self.stamp()
+            self._checked_at = now
+            if self._disk_stamp is not None and stamp != self._disk_stamp:
+                self.clear()
+                self._count("invalidations")
+            self._disk_stamp = stamp
+        return self._disk_stamp
+
+    def key(self, backend: str, job_description: str, snapshot, **options):
+        """
+        Return the cache key of a request, or None when its response must not be cached.
+
+        Args:
+            backend (str): The scoring backend.
+            job_description (str): The job description as submitted.
+            snapshot (ArtifactSnapshot): The snapshot serving the request.
+            **options: Anything else the response depends on (k, offset, minScore...).
+        """
+        if not self.enabled:
+            return None
+        if snapshot.artifact_stamp is None or snapshot.artifact_stamp != self.current_stamp():
+            # The files changed since the snapshot was loaded: its answers are about to be outdated
+            self._count("bypassed")
+            return None
+        payload = json.dumps([backend, normalize_job_description(job_description, backend, options.get("shortlist")), snapshot.artifact_stamp, options], sort_keys=True)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.counters["expirations"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def _set_memory(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _get_disk(self, key):
+        with self._connect() as connection:
+            row = connection.execute("SELECT value, expires_at FROM results WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone()
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def _set_disk(self, key, value, expires_at):
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)", (key, json.dumps(value), expires_at))
+            connection.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+
+    async def get(self, key):
+        """
+        Return the cached response of a key, or None. The disk tier is read in a worker thread.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            return value
+        if self.db_path:
+            found = await run_in_threadpool(self._get_disk, key)
+            if found is not None:
+                value, expires_at = found
+                self._set_memory(key, value, expires_at)
+                self._count("diskHits")
+                return value
+        self._count("misses")
+        return None
+
+    async def set(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        self._set_memory(key, value, expires_at)
+        if self.db_path:
+            await run_in_threadpool(self._set_disk, key, value, expires_at)
+
+    def clear(self):
+        """
+        Empty the memory tier. Disk entries are keyed by stamp, so outdated ones are never read and simply expire.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "maxEntries": self.max_entries, "disk": bool(self.db_path)}
+
+def get_result_cache(request: Request) -> ResultCache:
+    """
+    FastAPI dependency returning the result cache attached to the application.
+    """
+    return request.app.state.result_cache
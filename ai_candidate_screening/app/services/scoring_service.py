@@ -1,16 +1,41 @@
 import os
+import threading
+import time
 import pandas as pd
-from app.utils.data_loader import load_candidates
+from app import config
+from app.utils.data_loader import load_candidate_frame
+from app.services.candidate_log import CandidateLog, apply_operations, default_log_path
+from app.services.candidate_store import SCORING_COLUMNS
 from app.utils.preprocessing import preprocess_text
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from app.services.tfidf_index import TfidfIndex, load_tfidf_index
+from app.utils.lazy import LazyResource
+from app.utils.metrics import stage_timer, timed
 from typing import Any, Coroutine
-from scipy.sparse import csr_matrix
 import numpy as np
+import argparse
 import asyncio
 
+# Command to generate the training data: python -m app.services.scoring_service [--force]
 
-CANDIDATES = load_candidates("app/data/candidates.csv")
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")
+TRAINING_DATA_FILE = os.path.join(os.path.dirname(__file__), "../data/training_data.csv")
+
+# Position of the candidate log the loaded candidates were replayed up to, and when it was last compared with the log
+_log_state = {"position": None, "checked_at": 0.0}
+_pool_lock = threading.Lock()
+
+def load_pool() -> list[dict]:
+    """
+    Load the candidates of CANDIDATES_FILE with its candidate log replayed, like the API serves them.
+    """
+    # The log is read before the candidates file, see candidate_log.py
+    operations, position = CandidateLog(default_log_path(CANDIDATES_FILE)).read()
+    candidate_data = apply_operations(load_candidate_frame(CANDIDATES_FILE, SCORING_COLUMNS), operations)
+    _log_state["position"] = position
+    return candidate_data.fillna("Not Provided").to_dict(orient="records")
+
+# Nothing is read when this module is imported; the candidates are loaded on first use
+CANDIDATES = LazyResource(load_pool, name="candidates")
 
 JOB_DESCRIPTIONS = [
     "Looking for a Golang developer with backend experience and scalability expertise.",
@@ -53,30 +78,66 @@ def calculate_feature_score(feature, job_keywords, weight=1.0):
         return (matches / len(job_keywords)) * weight
     return 0  # If the feature is not a list, return 0
 
-async def score_candidates_for_job(job_description: str) -> list[dict]:
-    resumes = []
-    for candidate in CANDIDATES:
-        resume_text = f"{candidate.get('Experiences', '')} {candidate.get('Skills', '')} {candidate.get('Keywords', '')} {candidate.get('Summary', '')}"
-        resumes.append(preprocess_text(resume_text))
+def resume_text(candidate: dict) -> str:
+    """
+    Build the preprocessed resume text a candidate is matched on.
+    """
+    text = f"{candidate.get('Experiences', '')} {candidate.get('Skills', '')} {candidate.get('Keywords', '')} {candidate.get('Summary', '')}"
+    return preprocess_text(text)
+
+TFIDF_INDEX = LazyResource(lambda: load_tfidf_index([resume_text(candidate) for candidate in get_candidates()]), name="tfidf_index")
 
+def get_candidates() -> list[dict]:
+    """
+    Return the candidates as a list of dicts, loading them on first use.
+    """
+    return CANDIDATES.get()
+
+def get_tfidf_index() -> TfidfIndex:
+    """
+    Return the TF-IDF index over the candidates' resumes, loading or fitting it on first use.
+    """
+    return TFIDF_INDEX.get()
+
+def current_pool(check_seconds=config.CANDIDATE_LOG_CHECK_SECONDS) -> tuple:
+    """
+    Return the candidates and the TF-IDF index over their resumes, as one consistent pair.
+
+    When operations were appended to the candidate log since the candidates were loaded, both are
+    loaded again; the index is synced with the new resumes rather than refit. The log is checked
+    at most every check_seconds.
+    """
+    with _pool_lock:
+        now = time.monotonic()
+        if CANDIDATES.loaded and now - _log_state["checked_at"] >= check_seconds:
+            _log_state["checked_at"] = now
+            position = CandidateLog(default_log_path(CANDIDATES_FILE)).position()
+            if position != _log_state["position"]:
+                _log_state["position"] = position
+                CANDIDATES.reset()
+                TFIDF_INDEX.reset()
+        return get_candidates(), get_tfidf_index()
+
+@timed("scoring_service", "total")
+async def score_candidates_for_job(job_description: str) -> list[dict]:
     job_description = preprocess_text(job_description)
     job_keywords = set(job_description.split())
-    
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform([job_description] + resumes)
-    
-    if isinstance(tfidf_matrix, csr_matrix):
-        tfidf_matrix = tfidf_matrix.toarray()
-    
-    # Explicit casting to help Pylance
-    tfidf_matrix = np.array(tfidf_matrix)
-
-    job_vector = tfidf_matrix[0]
-    candidate_vectors = tfidf_matrix[1:]
-    similarity_scores = cosine_similarity(candidate_vectors, job_vector).flatten()
 
+    candidates, tfidf_index = current_pool()
+    # The resumes are vectorized once; only the job description is transformed here
+    with stage_timer("scoring_service", "tfidf_similarity"):
+        similarity_scores = tfidf_index.similarity(job_description)
+
+    with stage_timer("scoring_service", "score"):
+        scores = score_candidates(candidates, job_description, job_keywords, similarity_scores)
+    return await asyncio.sleep(0, result=scores)
+
+def score_candidates(candidates, job_description: str, job_keywords: set, similarity_scores) -> list[dict]:
+    """
+    The rows score_candidates_for_job returns: every candidate with its score for the preprocessed job description.
+    """
     scores = []
-    for i, candidate in enumerate(CANDIDATES):
+    for i, candidate in enumerate(candidates):
         experience_score = min(len(str(candidate.get("Experiences", "")).split()) / 100, 1) * 0.3
         skills_score = calculate_feature_score(str(candidate.get("Skills", "")).split(), job_keywords, weight=0.4)
         education_score = 0.1 if "degree" in str(candidate.get("Educations", "")).lower() else 0
@@ -92,16 +153,18 @@ async def score_candidates_for_job(job_description: str) -> list[dict]:
             "Education": candidate.get("Educations", ""),
             "Score": round(final_score, 2)
         })
-    return await asyncio.sleep(0, result=scores)
+    return scores
 
-async def generate_training_data():
+async def generate_training_data(csv_path=TRAINING_DATA_FILE, force=False):
     """
     Generate training data for 20 job descriptions and save it to a CSV file.
-    """
-    csv_path = "app/data/training_data.csv"
 
+    Args:
+        csv_path (str): Where to write the training data.
+        force (bool): Regenerate the file even if it already exists.
+    """
     # Check if training data file already exists
-    if os.path.exists(csv_path):
+    if os.path.exists(csv_path) and not force:
         print("Training data already exists. No need to regenerate.")
         return
 
@@ -119,4 +182,9 @@ async def generate_training_data():
 async def training_data_generation():
     await generate_training_data()
 
-asyncio.run(training_data_generation())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate training data by scoring every candidate against JOB_DESCRIPTIONS.")
+    parser.add_argument("--output", default=TRAINING_DATA_FILE, help="Path of the training data CSV.")
+    parser.add_argument("--force", action="store_true", help="Regenerate the file even if it already exists.")
+    args = parser.parse_args()
+    asyncio.run(generate_training_data(args.output, force=args.force))
@@ -0,0 +1,383 @@
+import argparse
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import os
+import queue
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import AuthenticationError, Client, Listener
+import numpy as np
+import pandas as pd
+from fastapi import Request
+from app import config
+from app.utils.hashing import file_stamp
+from app.services.feature_store import CandidateFeatures
+from app.services.ranking import DEFAULT_K, top_k_indices
+from app.services.reranking import SCORE_MATRIX_FUNCTIONS
+from app.services.spacy_similarity import CandidateVectors, embed_texts
+
+# Command to start a shard server (from ai_candidate_screening/): python -m app.services.sharding --listen 0.0.0.0:7001 [--authkey secret]
+
+# Scatter-gather scoring for large pools. The pool is split into contiguous row ranges, one per
+# shard. A shard is a long-lived process serving requests on a socket: it holds the features and
+# spaCy vectors of its rows and loads the backends' models itself, so each request only sends the
+# job description and gets back the shard's top k. The coordinator, in the API worker, sends
+# every shard the same request and merges the answers with a heap.
+#
+# Shards are local processes on Unix sockets by default; SHARD_ADDRESSES points the coordinator
+# at shard servers started on other nodes instead. Local shards belong to the process that started
+# them: with PRELOAD_APP the gunicorn master starts them once (gunicorn.conf.py) and every worker
+# inherits their addresses; otherwise each worker starts its own SHARDS processes.
+#
+# Several API workers, each numbering its snapshots on its own, can share the same shards, so a
+# shard's rows are identified by their content (shard_key), not by a snapshot version. A shard
+# keeps the rows of its last SHARD_POOLS keys: when a request is for another key, the coordinator
+# sends the shard its rows first. Ranges are recomputed for every pool, so after an ingest the shards
+# are rebalanced and never differ by more than one row.
+
+class ShardError(Exception):
+    """
+    Raised when a shard can't be reached, doesn't answer in time or fails a request.
+    """
+
+def partition(size: int, shards: int) -> list:
+    """
+    Contiguous (start, stop) row ranges of `shards` shards over `size` rows, equal to one row.
+    """
+    bounds = [size * shard // shards for shard in range(shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def merge_top_k(results, k=DEFAULT_K, offset=0) -> tuple:
+    """
+    Merge the top candidates of every shard into the global top k.
+
+    Each shard's candidates are sorted best first, with equal scores by row, like top_k_indices
+    orders them, so the heap merge ranks exactly as scoring the whole pool at once would.
+
+    Args:
+        results (list[tuple]): (scores, rows) of each shard, best first, each holding at least offset + k candidates when the shard has them.
+        k (int): Number of candidates to return.
+        offset (int): Number of best candidates to skip, for pagination.
+
+    Returns:
+        tuple: The scores and global rows of the winners, best first.
+    """
+    def ranked(scores, rows):
+        # NaN scores rank last, as in top_k_indices
+        keys = np.where(np.isnan(scores), np.inf, -scores)
+        return zip(keys.tolist(), rows.tolist(), scores.tolist())
+
+    merged = list(itertools.islice(heapq.merge(*(ranked(scores, rows) for scores, rows in results)), offset, offset + k))
+    return np.array([score for _, _, score in merged], dtype=np.float64), np.array([row for _, row, _ in merged], dtype=np.int64)
+
+def shard_key(snapshot, start: int, stop: int) -> str:
+    """
+    Fingerprint of a shard's rows of a snapshot, the same in every API worker serving the same pool:
+    the files the pool was loaded from, how far the candidate log was replayed, and the row range.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{snapshot.artifact_stamp}:{snapshot.sources.get('log_position')}:{start}:{stop}".encode("utf-8"))
+    return digest.hexdigest()
+
+def score_range(features, vectors, backends, base: int, start: int, stop: int, backend: str, job_description=None, job_vector=None, n=DEFAULT_K, min_score=None, rows=None) -> tuple:
+    """
+    The n best candidates of the global rows start to stop.
+
+    Args:
+        features (CandidateFeatures): Features whose first row is global row `base`: a shard's rows, or the whole pool with base 0.
+        vectors (CandidateVectors): The spaCy vectors of the same rows.
+        backends (dict): Loaded artifacts of each backend.
+        rows (np.ndarray, optional): Global rows passing the request's filters.
+
+    Returns:
+        tuple: Their scores and global rows, best first.
+    """
+    local = None
+    if rows is not None:
+        # The rows passing the request's filters, in this range
+        local = rows[(rows >= start) & (rows < stop)] - base
+    elif start != base or stop != base + len(features):
+        local = np.arange(start, stop) - base
+    if stop == start or (local is not None and len(local) == 0):
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+    if backend == "spacy":
+        scores = vectors.similarities(job_vector, local) * 100
+    else:
+        scores = SCORE_MATRIX_FUNCTIONS[backend]([job_description], backends[backend], features, local)[0]
+    winners = top_k_indices(scores, n, 0, min_score)
+    return scores[winners], (winners if local is None else local[winners]) + base
+
+class ShardState:
+    """
+    What a shard server holds: its rows of the last few shard keys and the backends' loaded models.
+
+    API workers whose snapshots lag each other by a log write ask for different keys at the same
+    time; keeping the rows of the most recently loaded keys serves them all without reloading.
+    """
+
+    def __init__(self, loaders=None, max_pools=config.SHARD_POOLS):
+        self.loaders = loaders
+        self.max_pools = max_pools
+        # Shard key -> (start, features, vectors), least recently used first
+        self.pools = OrderedDict()
+        self.backends = {}
+        self._models_stamp = None
+        self._lock = threading.Lock()
+
+    def load(self, key: str, start: int, features: dict, vectors: np.ndarray):
+        """
+        Hold the shard's rows of another shard key, dropping those of the least recently used key past max_pools.
+        """
+        features = CandidateFeatures(**features)
+        # The skills matcher is built now rather than by the first request
+        features.matcher
+        with self._lock:
+            self.pools[key] = (start, features, CandidateVectors(features.hashes, vectors, ""))
+            self.pools.move_to_end(key)
+            while len(self.pools) > max(self.max_pools, 1):
+                self.pools.popitem(last=False)
+            self._reload_models()
+        return {"rows": len(features)}
+
+    def _reload_models(self):
+        from app.services.model_registry import ARTIFACT_FILES, BACKEND_LOADERS
+        # Models only change with their files, not with every ingest
+        stamp = file_stamp(ARTIFACT_FILES)
+        if stamp != self._models_stamp:
+            self.backends = {name: loader() for name, loader in (self.loaders or BACKEND_LOADERS).items()}
+            self._models_stamp = stamp
+
+    def score(self, key: str, backend: str, **request):
+        """
+        The shard's n best candidates (see score_range), or None when it doesn't hold the rows of this key.
+        """
+        with self._lock:
+            pool = self.pools.get(key)
+            if pool is None:
+                return None
+            self.pools.move_to_end(key)
+            backends = self.backends
+        start, features, vectors = pool
+        return score_range(features, vectors, backends, start, start, start + len(features), backend, **request)
+
+def handle_connection(connection, state: ShardState):
+    with connection:
+        while True:
+            try:
+                method, kwargs = connection.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                connection.send(("ok", getattr(state, method)(**kwargs)))
+            except Exception as e:
+                connection.send(("error", f"{type(e).__name__}: {e}"))
+
+def serve(address, authkey: bytes, loaders=None):
+    """
+    Run a shard server: every connection is served by its own thread until the client closes it.
+    """
+    state = ShardState(loaders)
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Shard server listening on {address}.")
+        while True:
+            try:
+                connection = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                print(f"Refused a shard connection: {e}")
+                continue
+            threading.Thread(target=handle_connection, args=(connection, state), daemon=True).start()
+
+def parse_address(address: str):
+    """
+    "host:port" -> (host, port); anything else is a Unix socket path.
+    """
+    host, _, port = address.rpartition(":")
+    return (host, int(port)) if host and port.isdigit() else address
+
+class ShardCoordinator:
+    """
+    Fans scoring requests out to the shards and merges their top k.
+
+    Local shards are started by start(); remote ones (addresses) must already be running.
+    Connections are reused, one per concurrent request and shard. A coordinator forked after
+    start() (a gunicorn worker) uses the same shards and leaves stopping them to the process that started them.
+    """
+
+    def __init__(self, shards=config.SHARDS, addresses=None, authkey=None, timeout=config.REQUEST_TIMEOUT_SECONDS, loaders=None):
+        self.addresses = [parse_address(address) for address in addresses or []]
+        self.shards = len(self.addresses) or shards
+        # Local shards get a random key unless one is configured
+        self.authkey = authkey or secrets.token_bytes(16)
+        self.timeout = timeout
+        # Models the local shards load; the registry's backends by default
+        self.loaders = loaders
+        self._idle = [queue.SimpleQueue() for _ in range(self.shards)]
+        # Shard key each shard is known to hold; a shard holding another one answers None and is loaded again
+        self._loaded = [None] * self.shards
+        self._load_locks = [threading.Lock() for _ in range(self.shards)]
+        self._processes = []
+        self._socket_dir = None
+        # The process that started the local shards
+        self._owner = None
+        self._pool = ThreadPoolExecutor(max_workers=4 * self.shards, thread_name_prefix="shard-scatter")
+
+    @classmethod
+    def from_config(cls):
+        addresses = [address.strip() for address in config.SHARD_ADDRESSES.split(",") if address.strip()]
+        return cls(config.SHARDS, addresses, config.SHARD_AUTHKEY.encode("utf-8") or None)
+
+    def start(self):
+        """
+        Start the local shard processes, unless the coordinator uses remote shards.
+        """
+        if self.addresses:
+            return self
+        self._socket_dir = tempfile.mkdtemp(prefix="candidate-shards-")
+        self._owner = os.getpid()
+        context = multiprocessing.get_context("spawn")
+        for shard in range(self.shards):
+            address = os.path.join(self._socket_dir, f"shard-{shard}.sock")
+            process = context.Process(target=serve, args=(address, self.authkey, self.loaders), name=f"candidate-shard-{shard}", daemon=True)
+            process.start()
+            self._processes.append(process)
+            self.addresses.append(address)
+        # Wait until every shard accepts connections. They aren't kept: a process forked later can't share them
+        deadline = time.monotonic() + self.timeout
+        for shard in range(self.shards):
+            while True:
+                try:
+                    self._connect(shard).close()
+                    break
+                except ShardError:
+                    if time.monotonic() > deadline or not self._processes[shard].is_alive():
+                        raise
+                    time.sleep(0.05)
+        print(f"Started {self.shards} candidate shards.")
+        return self
+
+    def _connect(self, shard: int):
+        try:
+            return Client(self.addresses[shard], authkey=self.authkey)
+        except OSError as e:
+            raise ShardError(f"Shard {shard} at {self.addresses[shard]} is unreachable: {e}")
+
+    def _release(self, shard: int, connection):
+        self._idle[shard].put(connection)
+
+    def call(self, shard: int, method: str, **kwargs):
+        """
+        Call a ShardState method on a shard and return its result.
+        """
+        try:
+            connection = self._idle[shard].get_nowait()
+        except queue.Empty:
+            connection = self._connect(shard)
+        try:
+            connection.send((method, kwargs))
+            if not connection.poll(self.timeout):
+                raise ShardError(f"Shard {shard} didn't answer within {self.timeout}s.")
+            status, result = connection.recv()
+        except Exception as e:
+            # The connection may be halfway through a message; never reuse it
+            connection.close()
+            raise e if isinstance(e, ShardError) else ShardError(f"Shard {shard} failed: {e}")
+        self._release(shard, connection)
+        if status == "error":
+            raise ShardError(f"Shard {shard}: {result}")
+        return result
+
+    def load(self, shard: int, snapshot, start: int, stop: int):
+        """
+        Send a shard its rows of the snapshot.
+        """
+        key = shard_key(snapshot, start, stop)
+        with self._load_locks[shard]:
+            if self._loaded[shard] == key:
+                return
+            features = snapshot.features.slice(start, stop)
+            arrays = {name: np.array(getattr(features, name)) for name in ("hashes", "experience_scores", "education_scores", "keywords", "offsets")}
+            self.call(shard, "load", key=key, start=start, features=arrays, vectors=np.array(snapshot.candidate_vectors.vectors[start:stop]))
+            self._loaded[shard] = key
+
+    def _score_shard(self, shard: int, snapshot, start: int, stop: int, request: dict):
+        key = shard_key(snapshot, start, stop)
+        if self._loaded[shard] != key:
+            self.load(shard, snapshot, start, stop)
+        result = self.call(shard, "score", key=key, **request)
+        if result is None:
+            # Another coordinator loaded the rows of another pool into the shard meanwhile
+            self._loaded[shard] = None
+            self.load(shard, snapshot, start, stop)
+            result = self.call(shard, "score", key=key, **request)
+            if result is None:
+                # Coordinators serving more pools than the shard keeps evict each other's rows: score the range here
+                print(f"Shard {shard} no longer holds its rows; scoring them in the API process.")
+                return score_range(snapshot.features, snapshot.candidate_vectors, snapshot.backends, 0, start, stop, **request)
+        return result
+
+    def rank(self, snapshot, backend: str, job_description: str, k=DEFAULT_K, offset=0, min_score=None, rows=None) -> pd.DataFrame:
+        """
+        Score the snapshot's candidates on every shard in parallel and merge their top k.
+
+        Args:
+            snapshot (ArtifactSnapshot): The snapshot serving the request.
+            backend (str): "neural_network", "xgboost" or "spacy".
+            job_description (str): The job description text.
+            k (int): Number of candidates to return.
+            offset (int): Number of best candidates to skip, for pagination.
+            min_score (float, optional): Drop candidates scoring below this threshold.
+            rows (np.ndarray, optional): Only score the candidates at these rows, e.g. those passing the request's filters.
+
+        Returns:
+            pd.DataFrame: Name and Score of the top k candidates, as rank_candidates returns them.
+        """
+        request = {"backend": backend, "n": offset + k, "min_score": min_score, "rows": rows}
+        if backend == "spacy":
+            # Embedded once here rather than by every shard
+            request["job_vector"] = embed_texts([job_description])[0]
+        else:
+            request["job_description"] = job_description
+        ranges = partition(len(snapshot.candidate_data), self.shards)
+        futures = [self._pool.submit(self._score_shard, shard, snapshot, start, stop, request) for shard, (start, stop) in enumerate(ranges)]
+        scores, winners = merge_top_k([future.result() for future in futures], k, offset)
+        return pd.DataFrame({"Name": np.asarray(snapshot.candidate_data["Name"].take(winners)), "Score": scores})
+
+    def shutdown(self):
+        for idle in self._idle:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+        self._pool.shutdown(wait=False)
+        if self._owner != os.getpid():
+            return
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._socket_dir:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+
+def get_shards(request: Request):
+    """
+    FastAPI dependency returning the shard coordinator, or None when scoring isn't sharded.
+    """
+    return request.app.state.shards
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a candidate shard for coordinators listing it in SHARD_ADDRESSES.")
+    parser.add_argument("--listen", required=True, help="host:port to listen on, or a Unix socket path.")
+    parser.add_argument("--authkey", default=config.SHARD_AUTHKEY, help="Shared secret of the coordinators (SHARD_AUTHKEY).")
+    args = parser.parse_args()
+
+    if not args.authkey:
+        parser.error("an authkey is required for a shard server")
+    serve(parse_address(args.listen), args.authkey.encode("utf-8"))
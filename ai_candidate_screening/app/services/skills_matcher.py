@@ -0,0 +1,99 @@
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+
+class SkillsMatcher:
+    """
+    Batched equivalent of calculate_skills_score.
+
+    Every candidate's keyword set is encoded once as a row of a binary CSR matrix over a
+    shared vocabulary. Matching job descriptions is then a single sparse product: the
+    number of job keywords a candidate has is the dot product of its row with the job's
+    binary keyword vector, and the score is that count divided by the number of job keywords.
+    """
+
+    def __init__(self, vocabulary: dict, matrix: csr_matrix):
+        self.vocabulary = vocabulary
+        self.matrix = matrix
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @classmethod
+    def from_flat_keywords(cls, keywords, offsets) -> "SkillsMatcher":
+        """
+        Build the matcher from flattened keyword sets, where keywords[offsets[i]:offsets[i + 1]]
+        are the distinct keywords of candidate i (the CandidateFeatures layout).
+        """
+        keywords = keywords.tolist() if isinstance(keywords, np.ndarray) else list(keywords)
+        # Assign column ids in order of first appearance
+        vocabulary = {}
+        columns = np.fromiter((vocabulary.setdefault(keyword, len(vocabulary)) for keyword in keywords), dtype=np.int32, count=len(keywords))
+        matrix = csr_matrix(
+            (np.ones(len(keywords)), columns, np.asarray(offsets, dtype=np.int64)),
+            shape=(len(offsets) - 1, len(vocabulary)),
+        )
+        return cls(vocabulary, matrix)
+
+    @classmethod
+    def from_keyword_sets(cls, keyword_sets) -> "SkillsMatcher":
+        """
+        Build the matcher from one keyword set per candidate (see extract_candidate_keywords).
+        """
+        keyword_lists = [list(keywords) for keywords in keyword_sets]
+        keywords = [keyword for keyword_list in keyword_lists for keyword in keyword_list]
+        offsets = np.cumsum([0] + [len(keyword_list) for keyword_list in keyword_lists], dtype=np.int64)
+        return cls.from_flat_keywords(keywords, offsets)
+
+    def extend(self, keywords, offsets) -> "SkillsMatcher":
+        """
+        Return a matcher over these candidates followed by more, given as flattened keyword sets
+        (see from_flat_keywords). New keywords are added to a copy of the vocabulary.
+        """
+        vocabulary = dict(self.vocabulary)
+        keywords = keywords.tolist() if isinstance(keywords, np.ndarray) else list(keywords)
+        columns = np.fromiter((vocabulary.setdefault(keyword, len(vocabulary)) for keyword in keywords), dtype=np.int32, count=len(keywords))
+        extra = csr_matrix((np.ones(len(keywords)), columns, np.asarray(offsets, dtype=np.int64)), shape=(len(offsets) - 1, len(vocabulary)))
+        # The existing rows don't have the new columns
+        matrix = csr_matrix((self.matrix.data, self.matrix.indices, self.matrix.indptr), shape=(self.matrix.shape[0], len(vocabulary)))
+        return SkillsMatcher(vocabulary, vstack([matrix, extra], format="csr"))
+
+    def take(self, rows) -> "SkillsMatcher":
+        """
+        Return a matcher over the candidates at the given rows, in that order.
+        """
+        return SkillsMatcher(self.vocabulary, self.matrix[np.asarray(rows, dtype=np.int64)])
+
+    def scores(self, job_descriptions, rows=None) -> np.ndarray:
+        """
+        Calculate the skills score of every candidate for every job description.
+
+        Args:
+            job_descriptions (list[str]): The job descriptions.
+            rows (np.ndarray, optional): Only score the candidates at these rows, in this order.
+
+        Returns:
+            np.ndarray: Scores of shape (candidates, jobs), identical to calculate_skills_score.
+        """
+        job_keyword_sets = [set(job_description.lower().split()) for job_description in job_descriptions]
+
+        # Binary (vocabulary x jobs) matrix of the job keywords the candidates can match.
+        # Job keywords outside the vocabulary can't match but still count in the denominator.
+        terms, columns = [], []
+        for j, job_keywords in enumerate(job_keyword_sets):
+            for keyword in job_keywords:
+                i = self.vocabulary.get(keyword)
+                if i is not None:
+                    terms.append(i)
+                    columns.append(j)
+        jobs = csr_matrix((np.ones(len(terms)), (terms, columns)), shape=(len(self.vocabulary), len(job_keyword_sets)))
+
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        matches = (matrix @ jobs).toarray()
+        job_sizes = np.array([len(job_keywords) for job_keywords in job_keyword_sets], dtype=np.float64)
+        return np.divide(matches, job_sizes, out=np.zeros_like(matches), where=job_sizes > 0)
+
+    def score(self, job_description: str) -> np.ndarray:
+        """
+        Calculate the skills score of every candidate for one job description.
+        """
+        return self.scores([job_description])[:, 0]
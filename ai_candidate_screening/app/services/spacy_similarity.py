@@ -1,39 +1,362 @@
-import spacy
+import importlib.metadata
+import numpy as np
 import pandas as pd
 import os
+from app.utils.gather import gather_rows
+from app.utils.hashing import content_hashes
+from app.utils.lazy import LazyResource
+from app.utils.storage import atomic_savez
+from app.utils.shared_arrays import publish_arrays, read_manifest, share_arrays
+from app.utils.data_loader import load_candidate_frame
+from app.services.candidate_log import CandidateLog, Replay
+from app.services.candidate_store import CandidateStore, default_store_dir
+from app.services.ranking import DEFAULT_K, rank_candidates
+from app.utils.metrics import stage_timer
+from app.services.vector_index import INDEX_DIR, load_vector_index, patch_vector_index
 
-# Load spaCy's English language model
-nlp = spacy.load("en_core_web_sm")
+CANDIDATES_FILE = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")
+VECTORS_PATH = os.path.join(os.path.dirname(__file__), "../data/spacy_vectors.npz")
 
-def calculate_similarity(job_description: str, candidates_file = os.path.join(os.path.dirname(__file__), "../data/candidates.csv")):
+# spaCy's English language model
+MODEL = "en_core_web_sm"
+
+def load_pipeline():
+    """
+    Load spaCy's English language model.
+    """
+    import spacy
+    return spacy.load(MODEL)
+
+def installed_model() -> str:
+    """
+    Name and version of the installed spaCy model, read without loading spaCy.
+    """
+    try:
+        return f"{MODEL}-{importlib.metadata.version(MODEL)}"
+    except importlib.metadata.PackageNotFoundError:
+        return MODEL
+
+# spaCy and its model are only loaded when a text is first processed
+NLP = LazyResource(load_pipeline, name="spacy")
+
+def get_nlp():
+    return NLP.get()
+
+# Only the document vectors are used, which come from the word vectors or the tok2vec
+# tensor. The other components don't change them, so they are skipped when embedding.
+UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+def candidate_texts(candidate_data: pd.DataFrame) -> list:
     """
-    Calculate similarity scores between a job description and candidates' details, 
-    and return the top 30 candidates with the highest scores.
-    
+    Combine all columns of each candidate into a single text.
+    """
+    return [" ".join(values) for values in candidate_data.fillna("").astype(str).itertuples(index=False)]
+
+def pipeline_id(language=None) -> str:
+    """
+    Identify the spaCy pipeline the vectors were computed with, so a model change invalidates the cache.
+    """
+    language = language if language is not None else get_nlp()
+    return f"{language.meta.get('lang')}_{language.meta.get('name')}-{language.meta.get('version')}"
+
+def embed_texts(texts, language=None, batch_size=64, n_process=1) -> np.ndarray:
+    """
+    Compute the document vectors of many texts with nlp.pipe.
+
+    Args:
+        texts (list[str]): Texts to embed.
+        language (spacy.Language, optional): The pipeline. Defaults to the en_core_web_sm pipeline.
+        batch_size (int): Number of texts per nlp.pipe batch.
+        n_process (int): Number of processes nlp.pipe uses. -1 uses every core.
+
+    Returns:
+        np.ndarray: float32 matrix with one document vector per text.
+    """
+    language = language if language is not None else get_nlp()
+    disable = [name for name in UNUSED_COMPONENTS if name in language.pipe_names]
+    vectors = [doc.vector for doc in language.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disable)]
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(vectors).astype(np.float32)
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale each row to unit length. Zero rows stay zero, so their similarity is 0 like Doc.similarity.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+class CandidateVectors:
+    """
+    Unit-normalized spaCy document vectors of the candidate pool, aligned with the candidate rows
+    and keyed by a content hash of each row.
+    """
+
+    def __init__(self, hashes, vectors, pipeline):
+        self.hashes = hashes
+        self.vectors = vectors
+        self.pipeline = pipeline
+        # Hashes sorted once for rows()
+        self._sorted = None
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @classmethod
+    def load(cls, path=VECTORS_PATH) -> "CandidateVectors":
+        with np.load(path) as data:
+            return cls(data["hashes"], data["vectors"], str(data["pipeline"]))
+
+    def save(self, path=VECTORS_PATH):
+        atomic_savez(path, hashes=self.hashes, vectors=self.vectors, pipeline=np.array(self.pipeline))
+
+    def similarities(self, job_vector: np.ndarray, rows=None) -> np.ndarray:
+        """
+        Cosine similarity of every candidate, or of the candidates at the given rows, with a job description vector.
+        """
+        job_vector = normalize_rows(job_vector.reshape(1, -1).astype(np.float32))[0]
+        return (self.vectors if rows is None else self.vectors[rows]) @ job_vector
+
+    def share(self, directory: str) -> "CandidateVectors":
+        """
+        Return the same vectors backed by read-only files in a shared directory, so every worker maps one copy.
+        """
+        arrays = share_arrays("spacy_vectors", {"hashes": self.hashes, "vectors": self.vectors}, directory, {"pipeline": self.pipeline})
+        return CandidateVectors(arrays["hashes"], arrays["vectors"], self.pipeline)
+
+    def publish(self, directory: str) -> str:
+        """
+        Publish the vectors in a shared directory without mapping them, and return the publication's path.
+        """
+        return publish_arrays("spacy_vectors", {"hashes": self.hashes, "vectors": self.vectors}, directory, {"pipeline": self.pipeline})
+
+    @classmethod
+    def attach(cls, arrays: dict, meta: dict) -> "CandidateVectors":
+        """
+        Return the vectors backed by the mapped arrays of a publication (see attach_arrays).
+        """
+        return cls(arrays["hashes"], arrays["vectors"], meta["pipeline"])
+
+    @classmethod
+    def from_frame(cls, candidate_data: pd.DataFrame, language=None) -> "CandidateVectors":
+        """
+        Embed every row of a candidate DataFrame.
+        """
+        language = language if language is not None else get_nlp()
+        texts = candidate_texts(candidate_data)
+        # Without rows to embed, the pipeline still gives the width of its vectors
+        vectors = normalize_rows(embed_texts(texts, language)) if texts else embed_texts(["candidate"], language)[:0]
+        return cls(content_hashes(candidate_data, list(candidate_data.columns)), vectors.astype(np.float32), pipeline_id(language))
+
+    @classmethod
+    def gather(cls, base: "CandidateVectors", extra: "CandidateVectors", rows) -> "CandidateVectors":
+        """
+        Return the vectors of rows of `base` followed by `extra`, indexed as if they were concatenated.
+        """
+        return cls(gather_rows([base.hashes, extra.hashes], rows), gather_rows([base.vectors, extra.vectors], rows), base.pipeline)
+
+    def rows(self, ids) -> tuple:
+        """
+        Row positions of the candidates with the given content hashes, e.g. the ids a vector index returned.
+
+        Candidates with identical content share a hash, which the index returns once per candidate:
+        each distinct id is expanded to every row holding it, so each row comes back exactly once.
+
+        Returns:
+            tuple: (rows, position in ids of each row's hash), ordered like the first occurrence of the ids.
+        """
+        if self._sorted is None:
+            order = np.argsort(self.hashes, kind="stable")
+            self._sorted = (order, self.hashes[order])
+        order, sorted_hashes = self._sorted
+        ids = np.asarray(ids, dtype=self.hashes.dtype)
+        positions = np.sort(np.unique(ids, return_index=True)[1])
+        starts = np.searchsorted(sorted_hashes, ids[positions], "left")
+        counts = np.searchsorted(sorted_hashes, ids[positions], "right") - starts
+        # The sorted positions of every row of each id, in row order within an id
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return order[np.repeat(starts, counts) + offsets], np.repeat(positions, counts)
+
+    def similarity_matrix(self, job_vectors: np.ndarray) -> np.ndarray:
+        """
+        Cosine similarity of every candidate with many job description vectors.
+
+        Returns:
+            np.ndarray: Similarities of shape (jobs, candidates).
+        """
+        return normalize_rows(job_vectors.astype(np.float32)) @ self.vectors.T
+
+def load_candidate_vectors(candidate_data: pd.DataFrame, path=VECTORS_PATH, language=None, batch_size=64, n_process=1, save=True) -> CandidateVectors:
+    """
+    Return the document vectors of candidate_data, embedding only rows that aren't cached yet.
+
+    Rows are matched to the cached vectors by content hash. The cache is rebuilt from
+    scratch when it was computed with a different spaCy pipeline.
+
+    Args:
+        candidate_data (pd.DataFrame): The current candidate pool.
+        path (str): Path of the .npz vector cache.
+        language (spacy.Language, optional): The pipeline. Defaults to the en_core_web_sm pipeline.
+        batch_size (int): Number of texts per nlp.pipe batch.
+        n_process (int): Number of processes nlp.pipe uses.
+        save (bool): Save the cache back when rows were embedded.
+
+    Returns:
+        CandidateVectors: Vectors aligned with the rows of candidate_data.
+    """
+    pipeline = pipeline_id(language)
+    hashes = content_hashes(candidate_data, list(candidate_data.columns))
+    cached = CandidateVectors.load(path) if os.path.exists(path) else None
+    if cached is not None and cached.pipeline != pipeline:
+        cached = None
+
+    if cached is not None and np.array_equal(cached.hashes, hashes):
+        return cached
+
+    known = {} if cached is None else {h: i for i, h in enumerate(cached.hashes.tolist())}
+    stale = [i for i, h in enumerate(hashes.tolist()) if h not in known]
+    texts = candidate_texts(candidate_data.iloc[stale])
+    fresh = normalize_rows(embed_texts(texts, language, batch_size, n_process)) if stale else None
+
+    if cached is not None:
+        dimensions = cached.vectors.shape[1]
+    else:
+        # Without rows to embed, the pipeline still gives the width of its vectors
+        dimensions = (fresh if stale else embed_texts(["candidate"], language)).shape[1]
+    vectors = np.empty((len(hashes), dimensions), dtype=np.float32)
+    stale_rows = set(stale)
+    reused = [i for i in range(len(hashes)) if i not in stale_rows]
+    if reused:
+        vectors[reused] = cached.vectors[[known[h] for h in hashes[reused].tolist()]]
+    if stale:
+        vectors[stale] = fresh
+
+    candidate_vectors = CandidateVectors(hashes, vectors, pipeline)
+    if save:
+        candidate_vectors.save(path)
+        print(f"spaCy vector cache updated: {len(stale)} of {len(hashes)} candidates embedded.")
+    return candidate_vectors
+
+def calculate_similarity(job_description: str, candidates_file = CANDIDATES_FILE, candidate_data=None, candidate_vectors=None, k=DEFAULT_K, offset=0, min_score=None, vector_index=None, rows=None):
+    """
+    Calculate similarity scores between a job description and candidates' details,
+    and return the top k candidates with the highest scores.
+
     Args:
         job_description (str): The job description text.
         candidates_file (str): Path to the candidates CSV file.
-    
+        candidate_data (pd.DataFrame, optional): Preloaded candidate pool. Skips reading candidates_file. It is not modified.
+        candidate_vectors (CandidateVectors, optional): Precomputed vectors aligned with candidate_data.
+        vector_index (FlatIndex, optional): Index over candidate_vectors to search instead of scoring every candidate.
+        k (int): Number of candidates to return.
+        offset (int): Number of best candidates to skip, for pagination.
+        min_score (float, optional): Drop candidates scoring below this threshold.
+        rows (np.ndarray, optional): Only score the candidates at these rows, e.g. those passing the request's filters.
+
     Returns:
-        pd.DataFrame: DataFrame of the top 30 candidates with their similarity scores.
+        pd.DataFrame: DataFrame of the top k candidates with their similarity scores.
     """
     # Load the candidates data
-    df = pd.read_csv(candidates_file)
+    if candidate_data is None:
+        with stage_timer("spacy", "load_candidates"):
+            candidate_data = load_candidate_frame(candidates_file)
 
-    # Combine all columns into a single text column
-    df["CandidateText"] = df.apply(lambda row: " ".join(row.fillna("").astype(str)), axis=1)
+    # Candidate texts don't change between requests, so their vectors come from the cache
+    if candidate_vectors is None:
+        with stage_timer("spacy", "candidate_vectors"):
+            candidate_vectors = load_candidate_vectors(candidate_data)
 
     # Process the job description using spaCy
-    job_doc = nlp(job_description)
+    with stage_timer("spacy", "embed"):
+        job_vector = embed_texts([job_description])[0]
 
-    # Calculate similarity scores
-    df["Score"] = df["CandidateText"].apply(lambda text: job_doc.similarity(nlp(text)) * 100)
+    # An index only returns its best matches, already ranked; a filtered subset is scored directly instead
+    if vector_index is not None and rows is None:
+        with stage_timer("spacy", "search"):
+            ids, similarities = vector_index.search(normalize_rows(job_vector.reshape(1, -1)), offset + k)[0]
+        with stage_timer("spacy", "rank"):
+            rows, positions = candidate_vectors.rows(ids)
+            # In row order, ties break like the exact scan below
+            order = np.argsort(rows, kind="stable")
+            return rank_candidates(candidate_data, similarities[positions[order]] * 100, k, offset, min_score, rows=rows[order])
 
-    # Sort candidates by similarity scores in descending order
-    top_candidates = df.sort_values(by="Score", ascending=False).head(30)
+    # Calculate similarity scores as one matrix-vector product
+    with stage_timer("spacy", "similarity"):
+        scores = candidate_vectors.similarities(job_vector, rows) * 100
+
+    # Return the top k candidates with their scores and names, without sorting the whole pool
+    with stage_timer("spacy", "rank"):
+        return rank_candidates(candidate_data, scores, k, offset, min_score, rows=rows)
+
+def similarity_matrix(job_descriptions, candidate_vectors: CandidateVectors) -> np.ndarray:
+    """
+    Score every candidate for many job descriptions, embedding the job descriptions in one nlp.pipe pass.
+
+    Args:
+        job_descriptions (list[str]): The job description texts.
+        candidate_vectors (CandidateVectors): Precomputed vectors of the candidate pool.
+
+    Returns:
+        np.ndarray: Similarity scores from 0 to 100 of shape (jobs, candidates).
+    """
+    if not job_descriptions:
+        return np.zeros((0, len(candidate_vectors)), dtype=np.float32)
+    with stage_timer("spacy", "embed"):
+        job_vectors = embed_texts(job_descriptions)
+    with stage_timer("spacy", "similarity"):
+        return candidate_vectors.similarity_matrix(job_vectors) * 100
+
+# Candidate pool and vectors of a process-pool worker, for the snapshot version it last served
+_worker_state = {}
+
+def calculate_similarity_in_worker(job_description: str, version: int, candidates_file=CANDIDATES_FILE, store_dir=None, vectors_path=VECTORS_PATH, index_dir=INDEX_DIR, log_path=None, log_position=None, shared_dir="", shared_key=None, **ranking):
+    """
+    Run calculate_similarity in a process-pool worker.
+
+    The worker can't share the API process's snapshot, so it maps the candidate store and the
+    published vectors itself, and maps them again when the API has moved to a new snapshot version.
+    The ranking keyword arguments (k, offset, min_score) are passed on to calculate_similarity.
+    """
+    state = _load_worker_state(version, candidates_file, store_dir, vectors_path, index_dir, log_path, log_position, shared_dir, shared_key)
+    return calculate_similarity(job_description, candidate_data=state["candidate_data"], candidate_vectors=state["candidate_vectors"], vector_index=state["vector_index"], **ranking)
+
+def similarity_matrix_in_worker(job_descriptions, version: int, candidates_file=CANDIDATES_FILE, store_dir=None, vectors_path=VECTORS_PATH, index_dir=INDEX_DIR, log_path=None, log_position=None, shared_dir="", shared_key=None) -> np.ndarray:
+    """
+    Run similarity_matrix in a process-pool worker. Rows follow the candidates of the snapshot version.
+    """
+    state = _load_worker_state(version, candidates_file, store_dir, vectors_path, index_dir, log_path, log_position, shared_dir, shared_key)
+    return similarity_matrix(job_descriptions, state["candidate_vectors"])
+
+def _load_worker_state(version, candidates_file, store_dir, vectors_path, index_dir, log_path=None, log_position=None, shared_dir="", shared_key=None) -> dict:
+    """
+    Load the pool of a snapshot version like the API process does, without writing any file: the
+    store and the vectors the API process published are mapped, and only the candidates written
+    to the log since are embedded here.
+    """
+    if _worker_state.get("version") != version:
+        # Replays the candidate log up to where the API process did for this version. It is read
+        # before the store, so a compaction landing in between replays operations the store already holds
+        operations, _ = CandidateLog(log_path).read(until=log_position) if log_path else ([], None)
+        # Maps the same store files as the API process, which keeps them up to date with the candidates file
+        candidate_data = CandidateStore.open(store_dir or default_store_dir(candidates_file))
+        published = read_manifest(shared_dir, shared_key) if shared_dir and shared_key else None
+        if published is not None and len(published["spacy_vectors"][0]["hashes"]) == len(candidate_data):
+            candidate_vectors = CandidateVectors.attach(*published["spacy_vectors"])
+        else:
+            # Nothing published for this store (SHARED_ARRAYS_DIR is empty): read the API process's cache
+            candidate_vectors = load_candidate_vectors(candidate_data.frame(), vectors_path, save=False)
+        # The index the API process saved for the store
+        vector_index = load_vector_index(candidate_vectors, index_dir, save=False)
 
-    # Return the top 30 candidates with their scores and names
-    return top_candidates[["Name", "Score"]]
+        replay = Replay(candidate_data["Name"].to_numpy().tolist())
+        replay.apply(operations)
+        if replay.changed:
+            rows, written = replay.extend(candidate_data.columns)
+            candidate_data = CandidateStore.gather([candidate_data, CandidateStore.from_frame(written)], rows)
+            candidate_vectors = CandidateVectors.gather(candidate_vectors, CandidateVectors.from_frame(written), rows)
+            vector_index = patch_vector_index(vector_index, candidate_vectors)
+        _worker_state.update(version=version, candidate_data=candidate_data, candidate_vectors=candidate_vectors, vector_index=vector_index)
+    return _worker_state
 
 if __name__ == "__main__":
     job_description = "Senior software Ruby engineer with PostgreSQL experience"
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+from app.utils.hashing import hash_texts
+from app.utils.storage import atomic_savez
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "../data")
+MATRIX_FILE = "tfidf_matrix.npz"
+VOCABULARY_FILE = "tfidf_vocabulary.json"
+
+# Documents added after the fit are weighted with the IDF of the fitted corpus, and their
+# unseen terms are ignored. Once added plus removed documents exceed this fraction of the
+# fitted corpus the weights have drifted enough that the index is refitted from scratch.
+REFIT_THRESHOLD = 0.2
+# Reads of the matrix and vocabulary files before giving up on finding a matching pair
+LOAD_ATTEMPTS = 5
+
+class TfidfIndex:
+    """
+    TF-IDF vectors of a fixed set of documents, fitted once and queried many times.
+
+    Rows are l2-normalized like TfidfVectorizer's output, so the cosine similarity with a
+    query is a sparse matrix-vector product. Each row keeps the content hash of its
+    document, which is how sync() finds the rows to add or remove.
+    """
+
+    def __init__(self, vocabulary: dict, idf: np.ndarray, matrix, hashes: np.ndarray, fitted_size: int, changes: int = 0, refit_threshold: float = REFIT_THRESHOLD):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.matrix = matrix
+        self.hashes = hashes
+        self.fitted_size = fitted_size
+        self.changes = changes
+        self.refit_threshold = refit_threshold
+        self._counter = CountVectorizer(vocabulary=vocabulary)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @classmethod
+    def fit(cls, documents, refit_threshold=REFIT_THRESHOLD) -> "TfidfIndex":
+        """
+        Fit the vocabulary and IDF weights on the documents and vectorize them.
+        """
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(documents).tocsr()
+        vocabulary = {term: int(i) for term, i in vectorizer.vocabulary_.items()}
+        return cls(vocabulary, vectorizer.idf_, matrix, hash_texts(documents), len(documents), refit_threshold=refit_threshold)
+
+    def transform(self, documents):
+        """
+        Vectorize documents with the fitted vocabulary and IDF, as TfidfVectorizer.transform would.
+        """
+        counts = self._counter.transform(documents).astype(np.float64)
+        return normalize(counts.multiply(self.idf).tocsr())
+
+    def similarities(self, documents) -> np.ndarray:
+        """
+        Cosine similarity of every indexed document with every query document.
+
+        Returns:
+            np.ndarray: Dense scores of shape (indexed documents, queries). The
+            document-term matrices themselves stay sparse.
+        """
+        return (self.matrix @ self.transform(documents).T).toarray()
+
+    def similarity(self, document: str) -> np.ndarray:
+        return self.similarities([document])[:, 0]
+
+    @property
+    def needs_refit(self) -> bool:
+        return self.changes > self.refit_threshold * max(self.fitted_size, 1)
+
+    def add(self, documents):
+        """
+        Append documents, weighted with the current IDF.
+        """
+        self.matrix = vstack([self.matrix, self.transform(documents)]).tocsr()
+        self.hashes = np.concatenate([self.hashes, hash_texts(documents)])
+        self.changes += len(documents)
+
+    def remove(self, rows):
+        """
+        Remove the documents at the given row positions.
+        """
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(rows, dtype=np.int64)] = False
+        self.matrix = self.matrix[keep]
+        self.hashes = self.hashes[keep]
+        self.changes += int((~keep).sum())
+
+    def sync(self, documents) -> "TfidfIndex":
+        """
+        Bring the index in line with the current documents, in their order.
+
+        Unchanged documents keep their vectors, new or edited ones are added and
+        missing ones removed. Returns a refitted index instead when the changes since
+        the last fit exceed the refit threshold.
+        """
+        hashes = hash_texts(documents)
+        if np.array_equal(hashes, self.hashes):
+            return self
+
+        current = set(hashes.tolist())
+        self.remove([i for i, h in enumerate(self.hashes.tolist()) if h not in current])
+        known = {h: i for i, h in enumerate(self.hashes.tolist())}
+        new_rows = [i for i, h in enumerate(hashes.tolist()) if h not in known]
+        if new_rows:
+            self.add([documents[i] for i in new_rows])
+
+        if self.needs_refit:
+            return TfidfIndex.fit(documents, self.refit_threshold)
+
+        known = {h: i for i, h in enumerate(self.hashes.tolist())}
+        order = [known[h] for h in hashes.tolist()]
+        self.matrix = self.matrix[order]
+        self.hashes = self.hashes[order]
+        return self
+
+    def fingerprint(self) -> str:
+        """
+        A short digest of the matrix and the vocabulary, saved with both files of the index.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for array in (self.matrix.data, self.matrix.indices, self.matrix.indptr, self.idf, self.hashes):
+            digest.update(memoryview(np.ascontiguousarray(array)).cast("B"))
+        digest.update(json.dumps(self.vocabulary, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def save(self, index_dir=INDEX_DIR):
+        """
+        Save the index as a matrix file and a vocabulary file, without readers ever seeing a mismatched pair.
+
+        Each file is written to a temporary file then renamed into place, the matrix first. Both hold
+        the same fingerprint, which load() checks, so a reader that lands between the two renames
+        (or between those of two concurrent writers) reads the pair again.
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        fingerprint = self.fingerprint()
+        atomic_savez(
+            os.path.join(index_dir, MATRIX_FILE),
+            data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape), fingerprint=np.array(fingerprint),
+        )
+        path = os.path.join(index_dir, VOCABULARY_FILE)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump({
+                "vocabulary": self.vocabulary,
+                "idf": self.idf.tolist(),
+                "hashes": [str(h) for h in self.hashes.tolist()],
+                "fitted_size": self.fitted_size,
+                "changes": self.changes,
+                "refit_threshold": self.refit_threshold,
+                "fingerprint": fingerprint,
+            }, f)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR, attempts=LOAD_ATTEMPTS) -> "TfidfIndex":
+        """
+        Load a saved index.
+
+        Raises:
+            ValueError: If the matrix and vocabulary files still belong to different saves after `attempts` reads.
+        """
+        for _ in range(attempts):
+            with open(os.path.join(index_dir, VOCABULARY_FILE)) as f:
+                meta = json.load(f)
+            with np.load(os.path.join(index_dir, MATRIX_FILE)) as data:
+                if "fingerprint" in data and str(data["fingerprint"]) == meta.get("fingerprint"):
+                    matrix = csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+                    break
+            time.sleep(0.01)
+        else:
+            raise ValueError(f"The TF-IDF index in {index_dir} has a matrix and a vocabulary from different saves.")
+        return cls(
+            meta["vocabulary"],
+            np.array(meta["idf"]),
+            matrix,
+            np.array([int(h) for h in meta["hashes"]], dtype=np.uint64),
+            meta["fitted_size"],
+            meta["changes"],
+            meta["refit_threshold"],
+        )
+
+def load_tfidf_index(documents, index_dir=INDEX_DIR) -> TfidfIndex:
+    """
+    Load the saved index and sync it with the documents, or fit a new one if there is none.
+    The index is saved back when it changed.
+    """
+    index = None
+    if os.path.exists(os.path.join(index_dir, VOCABULARY_FILE)):
+        try:
+            index = TfidfIndex.load(index_dir)
+        except (ValueError, OSError) as e:
+            # A save interrupted between its two renames, or files from an older version
+            print(f"TF-IDF index not reused: {e}")
+    if index is not None:
+        if np.array_equal(index.hashes, hash_texts(documents)):
+            return index
+        index = index.sync(documents)
+    else:
+        index = TfidfIndex.fit(documents)
+    index.save(index_dir)
+    return index
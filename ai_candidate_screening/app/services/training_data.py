@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+REFINED_CSV = os.path.join(os.path.dirname(__file__), "../data/refined_training_data.csv")
+PARQUET_DIR = os.path.join(os.path.dirname(__file__), "../data/training_pipeline/refined")
+DEFAULT_CHUNK_ROWS = 100_000
+
+FEATURE_COLUMNS = ["Experience_Score", "Skills_Score", "Education_Score"]
+TARGET_COLUMN = "Score"
+# Columns the training scripts label-encode (as strings) before scaling
+ENCODED_COLUMNS = ["Skills_Score", "Education_Score"]
+
+# Out-of-core access to the refined training data, for training on more rows than fit in
+# memory. The data is read in chunks from refined_training_data.csv or from the Parquet files
+# of app/services/training_pipeline.py. The label encoding and the scaler are fitted over
+# the chunks (the scaler with partial_fit), then every pass re-reads the chunks from disk,
+# so memory holds one chunk at a time whatever the size of the data.
+
+def training_files(path: str) -> list:
+    """
+    The files of a training data source: a CSV or Parquet file, or a directory of Parquet files.
+    """
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".parquet")]
+    return [path]
+
+def iter_chunks(paths, chunk_rows=DEFAULT_CHUNK_ROWS, columns=None):
+    """
+    Yield the rows of the files as DataFrames of at most chunk_rows rows, in order.
+    """
+    columns = columns or FEATURE_COLUMNS + [TARGET_COLUMN]
+    for path in paths:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+def test_mask(chunk_index: int, rows: int, test_size: float, seed: int) -> np.ndarray:
+    """
+    Which rows of a chunk are held out. Drawn from a generator seeded per chunk, so every pass splits the rows alike.
+    """
+    return np.random.default_rng([seed, chunk_index]).random(rows) < test_size
+
+class ChunkedTrainingData:
+    """
+    The training data of one or more files, read chunk by chunk.
+
+    fit() makes one pass to collect the values of the encoded columns, and one to fit the
+    scaler; batches() then yields scaled float32 features and targets of the train or test split.
+    """
+
+    def __init__(self, path: str, chunk_rows=DEFAULT_CHUNK_ROWS, test_size=0.2, seed=42):
+        self.paths = training_files(path)
+        self.chunk_rows = chunk_rows
+        self.test_size = test_size
+        self.seed = seed
+        # Sorted distinct values of each encoded column, as LabelEncoder.classes_
+        self.classes = {}
+        self.scaler = None
+        self.rows = 0
+
+    def encode(self, chunk: pd.DataFrame) -> np.ndarray:
+        X = chunk[FEATURE_COLUMNS].copy()
+        for column in ENCODED_COLUMNS:
+            # The position among the sorted distinct values, as LabelEncoder.transform gives
+            X[column] = np.searchsorted(self.classes[column], X[column].astype(str).to_numpy(dtype=object))
+        return X.to_numpy(dtype=np.float64)
+
+    def fit(self) -> "ChunkedTrainingData":
+        values = {column: set() for column in ENCODED_COLUMNS}
+        self.rows = 0
+        for chunk in iter_chunks(self.paths, self.chunk_rows):
+            for column in ENCODED_COLUMNS:
+                values[column].update(chunk[column].astype(str))
+            self.rows += len(chunk)
+        self.classes = {column: np.array(sorted(values[column]), dtype=object) for column in ENCODED_COLUMNS}
+
+        self.scaler = StandardScaler()
+        for chunk in iter_chunks(self.paths, self.chunk_rows):
+            self.scaler.partial_fit(pd.DataFrame(self.encode(chunk), columns=FEATURE_COLUMNS))
+        return self
+
+    @property
+    def encoder(self) -> LabelEncoder:
+        """
+        A LabelEncoder of the last encoded column, as the training scripts have always saved.
+        """
+        encoder = LabelEncoder()
+        encoder.classes_ = self.classes[ENCODED_COLUMNS[-1]]
+        return encoder
+
+    def batches(self, split="train"):
+        """
+        Yield (X, y) per chunk of the split: scaled float32 features and float32 targets.
+
+        Args:
+            split (str): "train", "test" or "all".
+        """
+        for i, chunk in enumerate(iter_chunks(self.paths, self.chunk_rows)):
+            X = self.scaler.transform(pd.DataFrame(self.encode(chunk), columns=FEATURE_COLUMNS)).astype(np.float32)
+            y = chunk[TARGET_COLUMN].to_numpy(dtype=np.float32)
+            if split != "all":
+                mask = test_mask(i, len(chunk), self.test_size, self.seed)
+                keep = mask if split == "test" else ~mask
+                X, y = X[keep], y[keep]
+            if len(y):
+                yield X, y
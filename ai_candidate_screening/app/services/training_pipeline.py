@@ -0,0 +1,236 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.utils.hashing import file_stamp
+from app.services.refine_training_data import SCALED_COLUMNS, TEXT_COLUMNS, add_feature_scores
+
+# Command to build the training data (from ai_candidate_screening/): python -m app.services.training_pipeline [--workers 4] [--shard-size 4] [--csv app/data/refined_training_data.csv]
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "../data/training_pipeline")
+MANIFEST_FILE = "manifest.json"
+# What the pipeline writes in its output directory; nothing else there is ever deleted
+OUTPUTS = ["raw", "refined", MANIFEST_FILE, f"{MANIFEST_FILE}.tmp"]
+DEFAULT_SHARD_SIZE = 4
+
+# The training data is built in shards of job descriptions, each scored and refined by a
+# worker process and streamed to its own Parquet file, one row group per job description:
+#
+#   raw/part-00000.parquet       training_data.csv's columns plus the unscaled feature scores
+#   refined/part-00000.parquet   refined_training_data.csv's columns, scaled to 0-1
+#
+# MinMax scaling needs the minimum and maximum over every row, so each worker reports those of
+# its shard, and refined files are written once all shards are done. The manifest records the
+# finished shards; a rerun with the same inputs only scores the missing ones.
+
+def shard_job_descriptions(job_descriptions, shard_size: int) -> list:
+    return [list(job_descriptions[start:start + shard_size]) for start in range(0, len(job_descriptions), shard_size)]
+
+def part_name(shard: int) -> str:
+    return f"part-{shard:05d}.parquet"
+
+def run_fingerprint(job_descriptions, shard_size: int, skills_job_description: str, candidates_file: str) -> str:
+    """
+    A digest of everything the shards depend on. Finished shards are only reused when it matches.
+    """
+    payload = json.dumps([list(job_descriptions), shard_size, skills_job_description, file_stamp([candidates_file])])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def read_manifest(output_dir: str) -> dict:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(output_dir: str, manifest: dict):
+    # Written next to the manifest and renamed, so an interrupted run never leaves it half written
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def clear_outputs(output_dir: str):
+    """
+    Delete what an earlier run wrote in output_dir.
+
+    Raises:
+        ValueError: The directory holds other files and no manifest, so it isn't a pipeline output directory.
+    """
+    if not os.path.isdir(output_dir):
+        return
+    others = sorted(set(os.listdir(output_dir)) - set(OUTPUTS))
+    if others and not os.path.exists(os.path.join(output_dir, MANIFEST_FILE)):
+        raise ValueError(f"{output_dir} isn't empty and has no {MANIFEST_FILE}; pick an empty or new directory for the output (found {others[:5]})")
+    for name in OUTPUTS:
+        path = os.path.join(output_dir, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+def score_shard(shard: int, job_descriptions: list, raw_dir: str, skills_job_description: str, candidates_file: str) -> dict:
+    """
+    Score and refine every candidate against a shard of job descriptions, in a worker process.
+
+    Only one job description's rows are held in memory at a time: each is appended to the
+    shard's Parquet file as a row group.
+
+    Returns:
+        dict: The shard's row count and the "min" and "max" of each column to scale.
+    """
+    # Imported in the worker, which loads the candidates and the TF-IDF index once for all its shards
+    from app.services import scoring_service
+
+    if os.path.abspath(candidates_file) != os.path.abspath(scoring_service.CANDIDATES_FILE):
+        scoring_service.CANDIDATES_FILE = candidates_file
+        scoring_service.CANDIDATES.reset()
+        scoring_service.TFIDF_INDEX.reset()
+
+    path = os.path.join(raw_dir, part_name(shard))
+    tmp_path = f"{path}.tmp"
+    rows, minimum, maximum = 0, None, None
+    writer = None
+    try:
+        for job_description in job_descriptions:
+            df = pd.DataFrame(asyncio.run(scoring_service.score_candidates_for_job(job_description)))
+            add_feature_scores(df, skills_job_description)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table)
+
+            values = df[SCALED_COLUMNS].to_numpy(dtype=np.float64)
+            minimum = values.min(axis=0) if minimum is None else np.minimum(minimum, values.min(axis=0))
+            maximum = values.max(axis=0) if maximum is None else np.maximum(maximum, values.max(axis=0))
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return {"rows": rows, "min": dict(zip(SCALED_COLUMNS, minimum.tolist())), "max": dict(zip(SCALED_COLUMNS, maximum.tolist()))}
+
+def global_range(shards: dict):
+    """
+    Combine the per-shard minimums and maximums, and derive the MinMaxScaler scale of each column.
+    """
+    minimum = np.array([min(stats["min"][column] for stats in shards.values()) for column in SCALED_COLUMNS])
+    maximum = np.array([max(stats["max"][column] for stats in shards.values()) for column in SCALED_COLUMNS])
+    # Like MinMaxScaler, a constant column is shifted to 0 rather than divided by zero
+    scale = np.where(maximum > minimum, maximum - minimum, 1.0)
+    return minimum, scale
+
+def write_refined(output_dir: str, shards: dict, csv_path=None):
+    """
+    Scale the raw shards with the global range into refined/, and optionally one CSV like refined_training_data.csv.
+    """
+    minimum, scale = global_range(shards)
+    raw_dir, refined_dir = os.path.join(output_dir, "raw"), os.path.join(output_dir, "refined")
+    os.makedirs(refined_dir, exist_ok=True)
+    if csv_path:
+        csv_tmp = f"{csv_path}.tmp"
+        open(csv_tmp, "w").close()
+
+    for shard in sorted(shards, key=int):
+        raw = pq.ParquetFile(os.path.join(raw_dir, part_name(int(shard))))
+        path = os.path.join(refined_dir, part_name(int(shard)))
+        writer = None
+        for batch in raw.iter_batches(columns=[column for column in raw.schema_arrow.names if column not in TEXT_COLUMNS]):
+            df = batch.to_pandas()
+            df[SCALED_COLUMNS] = (df[SCALED_COLUMNS].to_numpy(dtype=np.float64) - minimum) / scale
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(f"{path}.tmp", table.schema)
+            writer.write_table(table)
+            if csv_path:
+                df.to_csv(csv_tmp, mode="a", header=os.path.getsize(csv_tmp) == 0, index=False)
+        writer.close()
+        os.replace(f"{path}.tmp", path)
+
+    if csv_path:
+        os.replace(csv_tmp, csv_path)
+        print(f"Refined training data saved to {csv_path}")
+
+def refined_files(output_dir=OUTPUT_DIR) -> list:
+    """
+    Paths of the refined Parquet files, in order.
+    """
+    refined_dir = os.path.join(output_dir, "refined")
+    return [os.path.join(refined_dir, name) for name in sorted(os.listdir(refined_dir)) if name.endswith(".parquet")]
+
+def run_pipeline(job_descriptions=None, output_dir=OUTPUT_DIR, shard_size=DEFAULT_SHARD_SIZE, workers=None, skills_job_description=None, candidates_file=None, csv_path=None) -> dict:
+    """
+    Build the raw and refined training data, resuming from the shards a previous run finished.
+
+    Args:
+        job_descriptions (list[str], optional): Job descriptions to score every candidate against. Defaults to scoring_service.JOB_DESCRIPTIONS.
+        output_dir (str): Where the Parquet files and the manifest are written.
+        shard_size (int): Job descriptions per shard.
+        workers (int, optional): Worker processes. Defaults to the number of CPUs.
+        skills_job_description (str, optional): The job description Skills_Score is computed against, as in
+            refine_training_data.py. Defaults to the first job description.
+        candidates_file (str, optional): The candidates CSV. Defaults to scoring_service.CANDIDATES_FILE.
+        csv_path (str, optional): Also write the refined data to this CSV.
+
+    Returns:
+        dict: The manifest of the run.
+    """
+    from app.services import scoring_service
+
+    job_descriptions = list(job_descriptions or scoring_service.JOB_DESCRIPTIONS)
+    skills_job_description = skills_job_description or job_descriptions[0]
+    candidates_file = candidates_file or scoring_service.CANDIDATES_FILE
+    fingerprint = run_fingerprint(job_descriptions, shard_size, skills_job_description, candidates_file)
+    shards = shard_job_descriptions(job_descriptions, shard_size)
+    raw_dir = os.path.join(output_dir, "raw")
+
+    manifest = read_manifest(output_dir)
+    if manifest.get("fingerprint") != fingerprint:
+        # Different inputs: nothing from an earlier run can be reused
+        clear_outputs(output_dir)
+        manifest = {"fingerprint": fingerprint, "shards": {}}
+    os.makedirs(raw_dir, exist_ok=True)
+
+    done = manifest["shards"]
+    pending = [shard for shard in range(len(shards)) if str(shard) not in done or not os.path.exists(os.path.join(raw_dir, part_name(shard)))]
+    print(f"{len(shards) - len(pending)} of {len(shards)} shards already done.")
+
+    if pending:
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(score_shard, shard, shards[shard], raw_dir, skills_job_description, candidates_file): shard for shard in pending}
+            for future in as_completed(futures):
+                done[str(futures[future])] = future.result()
+                # Checkpoint after every shard, so an interrupted run resumes from here
+                write_manifest(output_dir, manifest)
+                print(f"Shard {futures[future]} done ({len(done)}/{len(shards)}).")
+
+    write_refined(output_dir, done, csv_path)
+    manifest["rows"] = sum(stats["rows"] for stats in done.values())
+    write_manifest(output_dir, manifest)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score candidates against job descriptions in parallel and write refined training data as Parquet.")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="Directory of the Parquet files and the manifest.")
+    parser.add_argument("--jobs-file", help="Text file with one job description per line. Defaults to scoring_service.JOB_DESCRIPTIONS.")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Job descriptions per shard.")
+    parser.add_argument("--workers", type=int, help="Worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--csv", help="Also write the refined data to this CSV, e.g. app/data/refined_training_data.csv.")
+    args = parser.parse_args()
+
+    job_descriptions = None
+    if args.jobs_file:
+        with open(args.jobs_file) as f:
+            job_descriptions = [line.strip() for line in f if line.strip()]
+
+    manifest = run_pipeline(job_descriptions, args.output, args.shard_size, args.workers, csv_path=args.csv)
+    print(f"{manifest['rows']} rows in {len(manifest['shards'])} shards.")
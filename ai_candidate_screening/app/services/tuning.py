@@ -0,0 +1,283 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.services.training_data import REFINED_CSV, ChunkedTrainingData
+
+# Command to tune a model (from ai_candidate_screening/): python -m app.services.tuning xgboost [--trials 20] [--parallel 4] [--data path] [--json results.json]
+
+# Trials run in threads of one process: XGBoost and TensorFlow release the GIL while they
+# train, and threads share one copy of the data, including XGBoost's QuantileDMatrix. A
+# trial whose validation RMSE is worse than the median of the other trials at the same step
+# is stopped early. Once all trials are done, each model is timed with the predictor that
+# serves it, so models can be picked on the accuracy/latency/size Pareto front.
+
+XGBOOST_SPACE = {
+    "max_depth": [3, 4, 6, 8],
+    "eta": [0.03, 0.1, 0.3],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.8, 1.0],
+    "num_boost_round": [50, 100, 200],
+}
+
+NEURAL_NETWORK_SPACE = {
+    "hidden_units": [[32, 16], [64, 32], [128, 64], [64]],
+    "learning_rate": [0.0003, 0.001, 0.003],
+    "batch_size": [32, 128],
+    "epochs": [10, 25, 50],
+}
+
+# Rows scored per timed prediction: about a candidate pool
+LATENCY_ROWS = 10_000
+LATENCY_REPEAT = 20
+
+def sample_trials(space: dict, trials: int, seed=0) -> list:
+    """
+    Draw random parameter sets from a search space, without repeats while the space allows.
+    """
+    rng = np.random.default_rng(seed)
+    size = math.prod(len(values) for values in space.values())
+    samples, seen = [], set()
+    while len(samples) < trials:
+        params = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        key = json.dumps(params, sort_keys=True)
+        if key in seen and len(seen) < size:
+            continue
+        seen.add(key)
+        samples.append(params)
+    return samples
+
+class MedianPruner:
+    """
+    Stops a trial whose intermediate value (lower is better) is worse than the median of what
+    the other trials reported at the same step. Shared by the trials of a study.
+
+    Args:
+        warmup_steps (int): Steps every trial runs before it may be pruned.
+        interval (int): Only check every `interval` steps.
+        min_trials (int): Other trials that must have reached the step before comparing.
+    """
+
+    def __init__(self, warmup_steps=10, interval=5, min_trials=3):
+        self.warmup_steps = warmup_steps
+        self.interval = interval
+        self.min_trials = min_trials
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def report(self, trial: int, step: int, value: float) -> bool:
+        """
+        Record a trial's value at a step, and return whether the trial should stop.
+        """
+        with self._lock:
+            self._values.setdefault(trial, {})[step] = value
+            if step < self.warmup_steps or (step - self.warmup_steps) % self.interval:
+                return False
+            others = [values[step] for other, values in self._values.items() if other != trial and step in values]
+        return len(others) >= self.min_trials and value > float(np.median(others))
+
+def median_latency_ms(predict, X) -> float:
+    predict(X)
+    latencies = []
+    for _ in range(LATENCY_REPEAT):
+        start = time.perf_counter()
+        predict(X)
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)) * 1000
+
+def load_arrays(data_path: str) -> dict:
+    """
+    The scaled train and test splits of the training data, preprocessed as the trainers do.
+    """
+    data = ChunkedTrainingData(data_path).fit()
+    arrays = {}
+    for split in ("train", "test"):
+        X, y = zip(*data.batches(split))
+        arrays[f"X_{split}"], arrays[f"y_{split}"] = np.concatenate(X), np.concatenate(y)
+    # Timing input: test rows repeated to the size of a candidate pool
+    arrays["X_latency"] = np.resize(arrays["X_test"], (LATENCY_ROWS, arrays["X_test"].shape[1]))
+    return arrays
+
+class XGBoostTuner:
+    """
+    Trains XGBoost trials on one QuantileDMatrix built once for the whole study.
+    """
+
+    space = XGBOOST_SPACE
+
+    def __init__(self, arrays: dict, nthread: int):
+        import xgboost as xgb
+
+        self.xgb = xgb
+        self.arrays = arrays
+        self.nthread = nthread
+        self.dtrain = xgb.QuantileDMatrix(arrays["X_train"], arrays["y_train"])
+        self.dtest = xgb.QuantileDMatrix(arrays["X_test"], arrays["y_test"], ref=self.dtrain)
+
+    def pruner(self) -> MedianPruner:
+        return MedianPruner(warmup_steps=10, interval=5)
+
+    def run(self, trial: int, params: dict, pruner: MedianPruner) -> tuple:
+        """
+        Train one trial. Returns its result and the predict function of the model as it would be served.
+        """
+        from app.services.XGboost.predictors import BoosterPredictor
+        from app.services.XGboost.train_model import PARAMS
+
+        xgb = self.xgb
+        pruned = []
+
+        class Pruning(xgb.callback.TrainingCallback):
+            def after_iteration(self, model, epoch, evals_log):
+                stop = pruner.report(trial, epoch, evals_log["test"]["rmse"][-1])
+                if stop:
+                    pruned.append(epoch)
+                return stop
+
+        booster_params = {**PARAMS, **{name: value for name, value in params.items() if name != "num_boost_round"}, "nthread": self.nthread}
+        log = {}
+        booster = xgb.train(
+            booster_params, self.dtrain, num_boost_round=params["num_boost_round"], evals=[(self.dtest, "test")],
+            early_stopping_rounds=10, evals_result=log, verbose_eval=False, callbacks=[Pruning()],
+        )
+        result = {
+            "rmse": min(log["test"]["rmse"]),
+            "steps": booster.num_boosted_rounds(),
+            "pruned": bool(pruned),
+            "size_bytes": len(booster.save_raw("ubj")),
+        }
+        return result, BoosterPredictor(booster, nthread=self.nthread).predict
+
+class NeuralNetworkTuner:
+    """
+    Trains Keras trials on the arrays loaded once for the whole study, and times them with the NumPy runtime that serves them.
+    """
+
+    space = NEURAL_NETWORK_SPACE
+
+    def __init__(self, arrays: dict, nthread: int):
+        import tensorflow as tf
+
+        self.tf = tf
+        self.arrays = arrays
+        # Before TensorFlow starts its thread pools: each trial gets its share of the cores
+        tf.config.threading.set_intra_op_parallelism_threads(nthread)
+
+    def pruner(self) -> MedianPruner:
+        return MedianPruner(warmup_steps=3, interval=1)
+
+    def run(self, trial: int, params: dict, pruner: MedianPruner) -> tuple:
+        from app.services.neural_network.numpy_model import DenseNetwork, layers_from_keras
+        from app.services.neural_network.train_model import build_model
+
+        pruned, rmse = [], []
+
+        class Pruning(self.tf.keras.callbacks.Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                rmse.append(math.sqrt(logs["val_loss"]))
+                if pruner.report(trial, epoch, rmse[-1]):
+                    pruned.append(epoch)
+                    self.model.stop_training = True
+
+        model = build_model(self.arrays["X_train"].shape[1], params["hidden_units"], params["learning_rate"])
+        model.fit(
+            self.arrays["X_train"], self.arrays["y_train"], epochs=params["epochs"], batch_size=params["batch_size"],
+            validation_data=(self.arrays["X_test"], self.arrays["y_test"]), verbose=0, callbacks=[Pruning()],
+        )
+        network = DenseNetwork(layers_from_keras(model))
+        result = {
+            "rmse": min(rmse),
+            "steps": len(rmse),
+            "pruned": bool(pruned),
+            "size_bytes": sum(kernel.nbytes + bias.nbytes for kernel, bias, _ in network.layers),
+        }
+        return result, network.predict
+
+TUNERS = {
+    "xgboost": XGBoostTuner,
+    "neural_network": NeuralNetworkTuner,
+}
+
+def pareto_front(trials: list, objectives=("rmse", "latency_ms", "size_bytes")) -> list:
+    """
+    The trials no other trial beats on every objective (all minimized). Pruned and failed trials are left out.
+    """
+    candidates = [trial for trial in trials if not trial.get("pruned") and "error" not in trial]
+
+    def dominates(a, b):
+        return all(a[name] <= b[name] for name in objectives) and any(a[name] < b[name] for name in objectives)
+
+    return [trial for trial in candidates if not any(dominates(other, trial) for other in candidates if other is not trial)]
+
+def tune(backend: str, trials=20, parallel=None, data_path=REFINED_CSV, seed=0) -> dict:
+    """
+    Run a study: random trials of a backend's search space, in parallel, with median pruning.
+
+    Args:
+        backend (str): "xgboost" or "neural_network".
+        trials (int): Number of parameter sets to try.
+        parallel (int, optional): Trials running at once. Defaults to the number of CPUs.
+        data_path (str): refined_training_data.csv or a directory of refined Parquet files.
+        seed (int): Seed of the parameter sampling.
+
+    Returns:
+        dict: Every trial's "params", "rmse", "steps", "pruned", "latency_ms" and "size_bytes", and the "pareto" front.
+    """
+    if backend not in TUNERS:
+        raise ValueError(f"Unknown backend: {backend}")
+    cores = os.cpu_count() or 1
+    parallel = min(parallel or cores, trials)
+    # Split the cores between the trials that run at once, so they don't oversubscribe the CPU
+    tuner = TUNERS[backend](load_arrays(data_path), nthread=max(1, cores // parallel))
+    pruner = tuner.pruner()
+    samples = sample_trials(tuner.space, trials, seed)
+
+    def run(trial):
+        start = time.perf_counter()
+        predict = None
+        try:
+            result, predict = tuner.run(trial, samples[trial], pruner)
+        except Exception as e:
+            result = {"error": str(e)}
+        result = {"trial": trial, "params": samples[trial], **result, "seconds": time.perf_counter() - start}
+        print(f"Trial {trial}: {result}")
+        return result, predict
+
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        runs = list(pool.map(run, range(len(samples))))
+
+    # Timed one model at a time once training is over, so trials still training don't skew the latencies
+    results = []
+    for result, predict in runs:
+        if predict is not None:
+            result["latency_ms"] = median_latency_ms(predict, tuner.arrays["X_latency"])
+        results.append(result)
+    return {"backend": backend, "trials": results, "pareto": [trial["trial"] for trial in pareto_front(results)]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search hyperparameters of a model, reporting accuracy, latency and size of every trial.")
+    parser.add_argument("backend", choices=list(TUNERS), help="Model to tune.")
+    parser.add_argument("--trials", type=int, default=20, help="Parameter sets to try.")
+    parser.add_argument("--parallel", type=int, help="Trials running at once. Defaults to the number of CPUs.")
+    parser.add_argument("--data", default=REFINED_CSV, help="refined_training_data.csv or a directory of refined Parquet files.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the parameter sampling.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    study = tune(args.backend, args.trials, args.parallel, args.data, args.seed)
+
+    print(f"{'trial':>5} {'rmse':>8} {'steps':>5} {'pruned':>6} {'latency (ms)':>12} {'size (KB)':>9}  pareto  params")
+    for trial in study["trials"]:
+        if "error" in trial:
+            print(f"{trial['trial']:>5} {trial['error']}")
+            continue
+        pareto = "*" if trial["trial"] in study["pareto"] else ""
+        print(f"{trial['trial']:>5} {trial['rmse']:>8.4f} {trial['steps']:>5} {str(trial['pruned']):>6} {trial['latency_ms']:>12.3f} {trial['size_bytes'] / 1024:>9.1f}  {pareto:^6}  {json.dumps(trial['params'])}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(study, f, indent=2)
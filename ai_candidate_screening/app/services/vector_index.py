@@ -0,0 +1,301 @@
+import copy
+import json
+import os
+import numpy as np
+from app import config
+from app.utils.storage import atomic_save_arrays, resolve_arrays_dir
+from app.services.ranking import top_k_indices
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "../data/vector_index")
+META_FILE = "meta.json"
+
+# Inserted and deleted vectors are kept aside (an overflow block and tombstones) so a change
+# never rewrites the main arrays, which may be memory-mapped. Once they exceed this fraction
+# of the index it is rebuilt from the live vectors.
+REBUILD_THRESHOLD = 0.2
+
+# Rows per matrix product when assigning vectors to IVF lists, to bound the temporary memory
+ASSIGN_CHUNK_SIZE = 65536
+
+class FlatIndex:
+    """
+    Exact inner-product search over unit-normalized vectors.
+
+    Each vector carries an id (the content hash of its candidate). The main arrays are
+    read-only and can be memory-mapped; add() appends to a small in-memory overflow block
+    and remove() sets tombstones, so both are cheap until the next rebuild.
+    """
+
+    kind = "flat"
+    # Arrays written by save(), one .npy file each
+    ARRAYS = ["ids", "vectors", "deleted", "extra_ids", "extra_vectors"]
+
+    def __init__(self, ids, vectors, deleted=None, extra_ids=None, extra_vectors=None, rebuild_threshold=REBUILD_THRESHOLD):
+        self.ids = ids
+        self.vectors = vectors
+        self.deleted = np.zeros(len(ids), dtype=bool) if deleted is None else np.array(deleted, dtype=bool)
+        self.extra_ids = np.zeros(0, dtype=ids.dtype) if extra_ids is None else extra_ids
+        self.extra_vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32) if extra_vectors is None else extra_vectors
+        self.rebuild_threshold = rebuild_threshold
+
+    def __len__(self):
+        return int(len(self.ids) - self.deleted.sum() + len(self.extra_ids))
+
+    @classmethod
+    def build(cls, ids, vectors, **params) -> "FlatIndex":
+        return cls(np.asarray(ids), np.ascontiguousarray(vectors, dtype=np.float32), **params)
+
+    def params(self) -> dict:
+        """
+        Build parameters, passed back to build() on a rebuild.
+        """
+        return {"rebuild_threshold": self.rebuild_threshold}
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        """
+        Positions in the main arrays worth scoring for a query; a flat index scores them all.
+        """
+        return None
+
+    def search(self, queries: np.ndarray, k: int) -> list:
+        """
+        Find the k vectors with the highest inner product with each query.
+
+        Args:
+            queries (np.ndarray): Unit-normalized query vectors, one per row (or a single vector).
+            k (int): Number of results per query.
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: (ids, scores) of each query, best first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        results = []
+        for query in queries:
+            positions = self._probe(query)
+            vectors = self.vectors if positions is None else self.vectors[positions]
+            ids = self.ids if positions is None else self.ids[positions]
+            deleted = self.deleted if positions is None else self.deleted[positions]
+
+            scores = np.concatenate([vectors @ query, self.extra_vectors @ query])
+            ids = np.concatenate([ids, self.extra_ids])
+            scores[:len(deleted)][deleted] = -np.inf
+
+            winners = top_k_indices(scores, k, min_score=-np.finfo(np.float32).max)
+            results.append((ids[winners], scores[winners]))
+        return results
+
+    @property
+    def changes(self) -> int:
+        return int(self.deleted.sum()) + len(self.extra_ids)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return self.changes > self.rebuild_threshold * max(len(self.ids), 1)
+
+    def add(self, ids, vectors):
+        """
+        Insert vectors into the overflow block.
+        """
+        self.extra_ids = np.concatenate([self.extra_ids, np.asarray(ids, dtype=self.ids.dtype)])
+        self.extra_vectors = np.vstack([self.extra_vectors, np.asarray(vectors, dtype=np.float32)])
+
+    def remove(self, ids):
+        """
+        Delete every vector with one of the given ids.
+        """
+        ids = np.asarray(ids, dtype=self.ids.dtype)
+        self.deleted |= np.isin(self.ids, ids)
+        keep = ~np.isin(self.extra_ids, ids)
+        self.extra_ids, self.extra_vectors = self.extra_ids[keep], self.extra_vectors[keep]
+
+    def live(self):
+        """
+        Return the (ids, vectors) that haven't been deleted, overflow included.
+        """
+        keep = ~self.deleted
+        return np.concatenate([self.ids[keep], self.extra_ids]), np.vstack([self.vectors[keep], self.extra_vectors])
+
+    def rebuild(self) -> "FlatIndex":
+        ids, vectors = self.live()
+        return type(self).build(ids, vectors, **self.params())
+
+    def sync(self, ids, vectors):
+        """
+        Bring the index in line with the current (ids, vectors), e.g. the candidate pool.
+
+        Returns:
+            tuple: The synced index (rebuilt if the changes exceed the threshold) and whether anything changed.
+        """
+        ids = np.asarray(ids)
+        live_ids, _ = self.live()
+        stale = np.setdiff1d(live_ids, ids)
+        new = ~np.isin(ids, live_ids)
+        if not len(stale) and not new.any():
+            return self, False
+
+        self.remove(stale)
+        self.add(ids[new], vectors[new])
+        return (self.rebuild() if self.needs_rebuild else self), True
+
+    def _arrays(self) -> dict:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def save(self, index_dir=INDEX_DIR, **meta):
+        """
+        Save the index as .npy files that load() can memory-map, plus a JSON header.
+        Extra keyword arguments are stored in the header.
+        """
+        atomic_save_arrays(index_dir, self._arrays(), META_FILE, {"kind": self.kind, "params": self.params(), **meta})
+
+    @staticmethod
+    def read_meta(index_dir=INDEX_DIR) -> dict:
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            return json.load(f)
+
+    @classmethod
+    def _from_arrays(cls, arrays, params):
+        return cls(arrays["ids"], arrays["vectors"], arrays["deleted"], arrays["extra_ids"], arrays["extra_vectors"], **params)
+
+def load_arrays(index_dir, names, mmap=True) -> dict:
+    # Only the large read-only arrays are mapped; tombstones and the overflow block are modified in place
+    mapped = {"ids", "vectors"}
+    return {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r" if mmap and name in mapped else None) for name in names}
+
+class IVFIndex(FlatIndex):
+    """
+    Inverted-file approximate index: the vectors are clustered with spherical k-means and
+    stored grouped by cluster, and a query only scores the clusters of its nprobe closest
+    centroids. The overflow block is always scored in full.
+    """
+
+    kind = "ivf"
+    ARRAYS = FlatIndex.ARRAYS + ["centroids", "list_offsets"]
+
+    def __init__(self, ids, vectors, centroids, list_offsets, nprobe=config.IVF_NPROBE, deleted=None, extra_ids=None, extra_vectors=None, rebuild_threshold=REBUILD_THRESHOLD):
+        super().__init__(ids, vectors, deleted, extra_ids, extra_vectors, rebuild_threshold)
+        # The main arrays are sorted by list: list i holds rows list_offsets[i]:list_offsets[i + 1]
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, ids, vectors, nlist=config.IVF_NLIST, nprobe=config.IVF_NPROBE, iterations=10, seed=0, **params) -> "IVFIndex":
+        """
+        Cluster the vectors into nlist lists. nlist defaults to about sqrt(number of vectors).
+        """
+        ids = np.asarray(ids)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        nlist = max(1, min(nlist or int(np.sqrt(len(vectors))), len(vectors)))
+        centroids = train_centroids(vectors, nlist, iterations, seed)
+
+        lists = assign_lists(vectors, centroids)
+        order = np.argsort(lists, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=nlist))]).astype(np.int64)
+        return cls(ids[order], vectors[order], centroids, list_offsets, nprobe, **params)
+
+    def params(self) -> dict:
+        return {"nlist": len(self.centroids), "nprobe": self.nprobe, "rebuild_threshold": self.rebuild_threshold}
+
+    def _probe(self, query: np.ndarray) -> np.ndarray:
+        nprobe = min(self.nprobe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists])
+
+    @classmethod
+    def _from_arrays(cls, arrays, params):
+        params = dict(params)
+        params.pop("nlist", None)
+        return cls(arrays["ids"], arrays["vectors"], arrays["centroids"], arrays["list_offsets"], deleted=arrays["deleted"], extra_ids=arrays["extra_ids"], extra_vectors=arrays["extra_vectors"], **params)
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Index of the closest centroid (highest inner product) of every vector.
+    """
+    lists = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        lists[start:start + ASSIGN_CHUNK_SIZE] = np.argmax(vectors[start:start + ASSIGN_CHUNK_SIZE] @ centroids.T, axis=1)
+    return lists
+
+def train_centroids(vectors: np.ndarray, nlist: int, iterations=10, seed=0) -> np.ndarray:
+    """
+    Spherical k-means on a sample of the vectors (at most 64 per list, like usual IVF training).
+    """
+    rng = np.random.default_rng(seed)
+    sample = vectors if len(vectors) <= 64 * nlist else vectors[np.sort(rng.choice(len(vectors), 64 * nlist, replace=False))]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        lists = assign_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, lists, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # An empty list keeps its previous centroid
+        centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids).astype(np.float32)
+    return centroids
+
+INDEX_TYPES = {"flat": FlatIndex, "ivf": IVFIndex}
+
+def build_index(kind: str, ids, vectors, **params) -> FlatIndex:
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"Unknown vector index kind: {kind}")
+    return INDEX_TYPES[kind].build(ids, vectors, **params)
+
+def load_index(index_dir=INDEX_DIR, mmap=True) -> FlatIndex:
+    """
+    Load a saved index. With mmap the main arrays stay on disk and are shared by every process mapping them.
+    """
+    # Every file is read from the version the index directory points to now, even if it is replaced meanwhile
+    index_dir = resolve_arrays_dir(index_dir)
+    meta = FlatIndex.read_meta(index_dir)
+    index_type = INDEX_TYPES[meta["kind"]]
+    return index_type._from_arrays(load_arrays(index_dir, index_type.ARRAYS, mmap), meta["params"])
+
+def load_vector_index(candidate_vectors, index_dir=INDEX_DIR, kind=config.VECTOR_INDEX, save=True, **params) -> FlatIndex:
+    """
+    Return an index over the spaCy vectors of the candidate pool.
+
+    With kind "none" the vectors are wrapped in a FlatIndex without copying or saving anything.
+    Otherwise the saved index is loaded (memory-mapped) and synced with the pool, or built from
+    scratch when there is none or it was built with another kind or spaCy pipeline. It is saved
+    back when it changed, unless save is False.
+
+    Args:
+        candidate_vectors (CandidateVectors): Vectors of the current candidate pool.
+        index_dir (str): Directory of the saved index.
+        kind (str): "none", "flat" or "ivf".
+        save (bool): Save the index back when it changed.
+
+    Returns:
+        FlatIndex: The index; its ids are the candidates' content hashes.
+    """
+    if kind == "none":
+        return FlatIndex(candidate_vectors.hashes, candidate_vectors.vectors)
+
+    index = None
+    if os.path.exists(os.path.join(index_dir, META_FILE)):
+        meta = FlatIndex.read_meta(index_dir)
+        if meta["kind"] == kind and meta.get("pipeline") == candidate_vectors.pipeline:
+            index = load_index(index_dir)
+
+    if index is None:
+        index, changed = build_index(kind, candidate_vectors.hashes, candidate_vectors.vectors, **params), True
+    else:
+        index, changed = index.sync(candidate_vectors.hashes, candidate_vectors.vectors)
+
+    if changed and save:
+        index.save(index_dir, pipeline=candidate_vectors.pipeline)
+        print(f"Vector index ({kind}) saved: {len(index)} vectors, {index.changes} pending changes.")
+    return index
+
+def patch_vector_index(index: FlatIndex, candidate_vectors, kind=config.VECTOR_INDEX) -> FlatIndex:
+    """
+    Return a copy of an index synced with the vectors of a pool that differs from the one it was
+    built for by a few rows. The changes go to the copy's tombstones and overflow block; the index
+    and its saved files are left as they are.
+    """
+    if kind == "none":
+        return FlatIndex(candidate_vectors.hashes, candidate_vectors.vectors)
+    patched = copy.copy(index)
+    # remove() sets tombstones in place
+    patched.deleted = index.deleted.copy()
+    patched, _ = patched.sync(candidate_vectors.hashes, candidate_vectors.vectors)
+    return patched
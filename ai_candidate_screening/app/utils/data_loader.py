@@ -1,12 +1,14 @@
 import pandas as pd
 import json
+from app.services.candidate_store import load_candidate_store
 
-def load_candidates(csv_path):
+def load_candidates(csv_path, columns=None):
     """
     Load candidates from a CSV file, preprocess, and return as a JSON list.
+    The CSV is read through its columnar store, and only `columns` are decoded when given.
     """
-    # Read the CSV file
-    df = pd.read_csv(csv_path)
+    # Read the candidate store (converted from the CSV file when it changed)
+    df = load_candidate_store(csv_path, columns=columns).frame(columns)
 
     # Basic preprocessing (fill missing values, clean text, etc.)
     df = df.fillna("Not Provided")
@@ -14,3 +16,12 @@ def load_candidates(csv_path):
     # Convert the DataFrame to a JSON-like format
     candidates = df.to_dict(orient="records")
     return candidates
+
+def load_candidate_frame(csv_path, columns=None):
+    """
+    Load the raw candidate pool from a CSV file as a DataFrame, through its columnar store.
+
+    Unlike load_candidates, missing values are kept as NaN so each scoring
+    backend can apply its own filling rules on the shared frame.
+    """
+    return load_candidate_store(csv_path, columns=columns).frame(columns)
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Gathering rows of several arrays into one, as if they were concatenated first but without
+# the concatenated copy. Used to build a candidate pool that differs from a large base pool by
+# a few rows: the base arrays (possibly memory-mapped) plus a small array of the changed rows.
+
+def _locate(sizes, rows) -> tuple:
+    """
+    The part each of `rows` falls in, and its row within that part.
+    """
+    bounds = np.cumsum([0] + list(sizes))
+    rows = np.asarray(rows, dtype=np.int64)
+    parts = np.searchsorted(bounds, rows, "right") - 1
+    return parts, rows - bounds[parts]
+
+def gather_rows(arrays, rows) -> np.ndarray:
+    """
+    Rows of arrays with the same trailing shape, indexed as if they were concatenated.
+
+    Args:
+        arrays (list[np.ndarray]): The parts.
+        rows (np.ndarray): Rows to gather, in order.
+
+    Returns:
+        np.ndarray: The gathered rows.
+    """
+    parts, local = _locate([len(array) for array in arrays], rows)
+    result = np.empty((len(local),) + arrays[0].shape[1:], dtype=np.result_type(*arrays))
+    for part, array in enumerate(arrays):
+        mask = parts == part
+        if mask.any():
+            result[mask] = array[local[mask]]
+    return result
+
+def gather_ragged(parts, rows) -> tuple:
+    """
+    Rows of ragged arrays, where row i of a part is data[offsets[i]:offsets[i + 1]], indexed as if the parts were concatenated.
+
+    Consecutive rows of a part are copied as one slice, so gathering a pool that mostly keeps
+    the order of its base costs a few slice copies rather than one per row.
+
+    Args:
+        parts (list[tuple]): (data, offsets) of each part.
+        rows (np.ndarray): Rows to gather, in order.
+
+    Returns:
+        tuple: (data, offsets) of the gathered rows.
+    """
+    which, local = _locate([len(offsets) - 1 for _, offsets in parts], rows)
+    lengths = np.zeros(len(local), dtype=np.int64)
+    for part, (_, offsets) in enumerate(parts):
+        mask = which == part
+        if mask.any():
+            lengths[mask] = np.asarray(offsets)[local[mask] + 1] - np.asarray(offsets)[local[mask]]
+    offsets_out = np.zeros(len(local) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets_out[1:])
+
+    data_out = np.empty(offsets_out[-1], dtype=np.result_type(*[data for data, _ in parts]))
+    # A run of rows ends where the next row isn't the following row of the same part
+    breaks = np.flatnonzero((np.diff(local) != 1) | (np.diff(which) != 0)) + 1
+    starts = np.concatenate([[0], breaks]).astype(np.int64) if len(local) else np.zeros(0, dtype=np.int64)
+    stops = np.concatenate([breaks, [len(local)]]).astype(np.int64) if len(local) else np.zeros(0, dtype=np.int64)
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        data, offsets = parts[which[start]]
+        data_out[offsets_out[start]:offsets_out[stop]] = data[offsets[local[start]]:offsets[local[stop - 1] + 1]]
+    return data_out, offsets_out
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import numpy as np
+
+def hash_texts(texts) -> np.ndarray:
+    """
+    Compute a 64-bit content hash per text.
+
+    Args:
+        texts (list[str]): The texts to hash.
+
+    Returns:
+        np.ndarray: One uint64 hash per text, in order.
+    """
+    texts = list(texts)
+    hashes = np.empty(len(texts), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+        hashes[i] = int.from_bytes(digest, "little")
+    return hashes
+
+def content_hashes(df, columns) -> np.ndarray:
+    """
+    Compute a 64-bit content hash per row over the given columns.
+
+    Missing values hash like empty strings, matching how the scoring code fills them.
+
+    Args:
+        df (pd.DataFrame): The candidate data.
+        columns (list[str]): Columns that make up the row content.
+
+    Returns:
+        np.ndarray: One uint64 hash per row, in row order.
+    """
+    values = [df[column].fillna("").astype(str).tolist() for column in columns]
+    # The unit separator keeps ("ab", "c") and ("a", "bc") apart
+    return hash_texts("\x1f".join(row) for row in zip(*values))
+
+def file_stamp(paths) -> str:
+    """
+    A short digest of the size and modification time of each file, which changes whenever one of them is rewritten.
+    Missing files are part of the digest too.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        except FileNotFoundError:
+            digest.update(f"{os.path.abspath(path)}:missing\n".encode("utf-8"))
+    return digest.hexdigest()
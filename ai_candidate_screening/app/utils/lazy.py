@@ -0,0 +1,43 @@
+import importlib
+import threading
+
+class LazyResource:
+    """
+    A heavy resource (a parsed dataset, an NLP pipeline, an ML runtime) created on first use.
+
+    Importing a module that declares a LazyResource costs nothing; the factory runs once,
+    the first time get() is called, even when several threads ask for it at the same time.
+    """
+
+    def __init__(self, factory, name=None):
+        self.factory = factory
+        self.name = name or getattr(factory, "__name__", "resource")
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self.factory()
+                    self._loaded = True
+        return self._value
+
+    def reset(self):
+        """
+        Drop the resource so the next get() creates it again.
+        """
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+def lazy_import(module_name: str) -> LazyResource:
+    """
+    Defer importing a module until it is first used, e.g. `tf = lazy_import("tensorflow")` then `tf.get()`.
+    """
+    return LazyResource(lambda: importlib.import_module(module_name), name=module_name)
@@ -0,0 +1,44 @@
+import os
+
+# Fields of /proc/<pid>/smaps_rollup reported by memory_usage, in kB
+SMAPS_FIELDS = ["Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty", "Swap"]
+
+def memory_usage(pid="self") -> dict:
+    """
+    Private and shared memory of a process, from /proc/<pid>/smaps_rollup (Linux only).
+
+    Shared pages are counted in full by every process mapping them; Pss splits them
+    between those processes, so summing Pss over the workers gives their real footprint.
+
+    Returns:
+        dict: The SMAPS_FIELDS in bytes plus "Private" and "Shared" totals, or {} when unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+
+    usage = {}
+    for line in lines:
+        field, _, value = line.partition(":")
+        if field in SMAPS_FIELDS:
+            usage[field] = int(value.split()[0]) * 1024
+    usage["Private"] = usage.get("Private_Clean", 0) + usage.get("Private_Dirty", 0)
+    usage["Shared"] = usage.get("Shared_Clean", 0) + usage.get("Shared_Dirty", 0)
+    return usage
+
+def sibling_workers() -> list:
+    """
+    PIDs of the processes forked by the same gunicorn master as this one, this one included.
+    Returns just this process when it isn't a gunicorn worker.
+    """
+    parent = os.getppid()
+    try:
+        with open(f"/proc/{parent}/cmdline", "rb") as f:
+            is_gunicorn = b"gunicorn" in f.read()
+        with open(f"/proc/{parent}/task/{parent}/children") as f:
+            children = [int(pid) for pid in f.read().split()]
+    except OSError:
+        return [os.getpid()]
+    return sorted(children) if is_gunicorn else [os.getpid()]
@@ -0,0 +1,134 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+class Histogram:
+    """
+    A thread-safe histogram with fixed bucket upper bounds, reported cumulatively like Prometheus.
+    """
+
+    def __init__(self, name: str, buckets, description: str = ""):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # The last one counts values above every bound
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def to_dict(self) -> dict:
+        """
+        Return the cumulative count per upper bound ("+Inf" included), the count and the sum.
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + ["+Inf"], counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "count": count, "sum": total}
+
+    def to_prometheus(self, name: str, labels=None) -> list:
+        """
+        Return the _bucket, _sum and _count sample lines of the histogram in the Prometheus text format.
+        """
+        histogram = self.to_dict()
+        lines = [f"{name}_bucket{format_labels({**(labels or {}), 'le': bound})} {count}" for bound, count in histogram["buckets"].items()]
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+        return lines
+
+STAGE_SECONDS_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+class StageTimings:
+    """
+    One latency histogram per (backend, stage), created on first use.
+
+    Stages are timed with the time() context manager or the timed() decorator, which only read
+    the clock twice and update a histogram, so they stay on in production. Timings are per process.
+    """
+
+    def __init__(self, buckets=STAGE_SECONDS_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, backend: str, stage: str) -> Histogram:
+        key = (backend, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(f"{backend}_{stage}_seconds", self.buckets))
+        return histogram
+
+    @contextmanager
+    def time(self, backend: str, stage: str):
+        """
+        Time the block as a stage of a backend, whether it returns or raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(backend, stage).observe(time.perf_counter() - start)
+
+    def timed(self, backend: str, stage: str):
+        """
+        Decorator timing every call of a function, or every await of a coroutine function, as a stage of a backend.
+        """
+        def decorator(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.time(backend, stage):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(backend, stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def items(self) -> list:
+        """
+        Return ((backend, stage), histogram) pairs, sorted.
+        """
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def stats(self) -> dict:
+        stats = {}
+        for (backend, stage), histogram in self.items():
+            stats.setdefault(backend, {})[stage] = histogram.to_dict()
+        return stats
+
+# Stage timings of this process, filled by the scoring code and exported on /metrics
+STAGES = StageTimings()
+stage_timer = STAGES.time
+timed = STAGES.timed
+
+def format_labels(labels=None) -> str:
+    """
+    Format labels as {name="value",...}, escaped as the Prometheus text format requires, or "" without labels.
+    """
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+def metric_family(name: str, kind: str, description: str, lines) -> list:
+    """
+    Return the # HELP and # TYPE lines of a metric followed by its sample lines.
+    """
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}", *lines]
@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# A small sampling profiler for single requests. While a request runs, a background thread
+# reads the stack of every other thread of the process (sys._current_frames) at a fixed
+# interval and counts each stack, so the time spent in executor threads and in the event loop
+# both show up. Stacks are folded ("outer;inner;innermost", the flame graph input format).
+# Nothing runs unless a profile is started: app/main.py only installs it when enabled.
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def fold_stack(frame, max_depth=64) -> str:
+    """
+    The stack ending at a frame, outermost first, joined with ";".
+    """
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread but its own until stopped.
+
+    Args:
+        interval_ms (float): Time between two samples.
+    """
+
+    def __init__(self, interval_ms=1.0):
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = 0.0
+        self.seconds = 0.0
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self.stacks[fold_stack(frame)] += 1
+            self.samples += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    def report(self, top=50) -> dict:
+        """
+        Return the "samples", "intervalMs", "seconds" and the `top` most sampled "stacks" with their "count".
+
+        Idle threads (executor workers waiting for work, the event loop selecting) are sampled too;
+        their stacks end in a wait and are usually at the top, so look below them.
+        """
+        return {
+            "samples": self.samples,
+            "intervalMs": self.interval * 1000,
+            "seconds": self.seconds,
+            "stacks": [{"stack": stack, "count": count} for stack, count in self.stacks.most_common(top)],
+        }
+
+class ProfileStore:
+    """
+    The reports of the last `max_profiles` profiled requests, by id.
+    """
+
+    def __init__(self, max_profiles=32):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, report: dict) -> str:
+        with self._lock:
+            self._next_id += 1
+            profile_id = f"{os.getpid()}-{self._next_id}"
+            self._profiles[profile_id] = report
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str):
+        with self._lock:
+            return self._profiles.get(profile_id)
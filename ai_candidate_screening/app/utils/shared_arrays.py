@@ -0,0 +1,140 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from app.utils.storage import save_arrays_once
+
+META_FILE = "meta.json"
+MANIFEST_PREFIX = "manifest-"
+
+# Read-only arrays are published once as .npy files in a shared directory (/dev/shm by
+# default, i.e. RAM) and every process maps them instead of holding a private copy. Files
+# are keyed by a fingerprint of their content, so processes that computed the same arrays
+# map the same files, whichever of them published first.
+
+def fingerprint(arrays: dict) -> str:
+    """
+    A short digest of the names, dtypes, shapes and bytes of the arrays.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for name, array in sorted(arrays.items()):
+        array = np.ascontiguousarray(array)
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode("utf-8"))
+        digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+def share_arrays(name: str, arrays: dict, directory: str, meta=None) -> dict:
+    """
+    Return read-only memory-mapped views of the arrays, publishing them first if no process has yet.
+
+    Args:
+        name (str): Name of the group of arrays, e.g. "features".
+        arrays (dict): The arrays to share, by name.
+        directory (str): Shared directory to publish into.
+        meta (dict, optional): JSON-serializable values saved along, see attach_arrays().
+
+    Returns:
+        dict: np.memmap views of the arrays, by name.
+    """
+    for attempt in range(2):
+        path = publish_arrays(name, arrays, directory, meta)
+        try:
+            return attach_arrays(path)[0]
+        except FileNotFoundError:
+            # Another process removed it as stale meanwhile; publish again
+            if attempt:
+                raise
+
+def publish_arrays(name: str, arrays: dict, directory: str, meta=None) -> str:
+    """
+    Publish the arrays unless a publication of the same content exists, and return its path.
+
+    Older publications under the same name are removed. Processes that still map them keep
+    working, since a mapping outlives its file, and they pick up the new files on their next load.
+    """
+    # The meta is part of the content
+    encoded_meta = np.frombuffer(json.dumps(meta or {}, sort_keys=True).encode("utf-8"), dtype=np.uint8)
+    path = os.path.join(directory, f"{name}-{fingerprint({**arrays, '__meta__': encoded_meta})}")
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        os.makedirs(directory, exist_ok=True)
+        save_arrays_once(path, arrays, META_FILE, {"name": name, "arrays": list(arrays), "meta": meta or {}})
+        remove_stale(directory, name, keep=os.path.basename(path))
+    return path
+
+def attach_arrays(path: str) -> tuple:
+    """
+    Map a publication.
+
+    Returns:
+        tuple: (np.memmap views of the arrays by name, the meta dict it was published with).
+
+    Raises:
+        FileNotFoundError: If the publication was removed.
+    """
+    with open(os.path.join(path, META_FILE)) as f:
+        header = json.load(f)
+    arrays = {array_name: np.load(os.path.join(path, f"{array_name}.npy"), mmap_mode="r") for array_name in header["arrays"]}
+    return arrays, header.get("meta", {})
+
+def remove_stale(directory: str, name: str, keep: str):
+    for entry in os.listdir(directory):
+        if entry.startswith(f"{name}-") and entry != keep and "." not in entry:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+
+# A manifest maps the fingerprint of what a process loads its arrays from (files on disk, the
+# same in every worker) to the publications computed from them. A process that finds one maps
+# the publications straight away, without reading the sources or computing anything.
+
+def write_manifest(directory: str, key: str, publications: dict):
+    """
+    Record the publications (name -> path) computed from the sources identified by `key`,
+    replacing the manifests of older sources.
+    """
+    path = os.path.join(directory, f"{MANIFEST_PREFIX}{key}.json")
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as f:
+        json.dump({name: os.path.basename(publication) for name, publication in publications.items()}, f)
+    os.replace(temporary_path, path)
+    for entry in os.listdir(directory):
+        if entry.startswith(MANIFEST_PREFIX) and entry.endswith(".json") and entry != os.path.basename(path):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, entry))
+
+def read_manifest(directory: str, key: str):
+    """
+    Map the publications of the manifest of `key`.
+
+    Returns:
+        dict or None: {name: (arrays, meta)} as attach_arrays() returns them, or None when there is
+        no manifest for `key` or one of its publications was removed since.
+    """
+    try:
+        with open(os.path.join(directory, f"{MANIFEST_PREFIX}{key}.json")) as f:
+            publications = json.load(f)
+        return {name: attach_arrays(os.path.join(directory, publication)) for name, publication in publications.items()}
+    except (FileNotFoundError, ValueError):
+        return None
+
+def deployment_dir(directory: str, anchor: str) -> str:
+    """
+    Subdirectory of the shared directory for one deployment, named after the absolute path of
+    `anchor` (e.g. its candidates file). Deployments sharing /dev/shm then never map, or remove,
+    each other's publications.
+    """
+    digest = hashlib.blake2b(os.path.abspath(anchor).encode("utf-8"), digest_size=6).hexdigest()
+    return os.path.join(directory, digest)
+
+def shared_usage(directory: str) -> dict:
+    """
+    Bytes published in the shared directory, per publication.
+    """
+    if not os.path.isdir(directory):
+        return {}
+    usage = {}
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            usage[entry] = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+    return usage
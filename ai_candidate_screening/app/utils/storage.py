@@ -0,0 +1,109 @@
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+def atomic_savez(path: str, **arrays):
+    """
+    Save arrays to an .npz file without readers ever seeing a partially written file.
+
+    The arrays are written to a temporary file next to `path` which then replaces it in
+    one rename, so other processes reading the file get either the old or the new version.
+    """
+    temporary_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temporary_path, **arrays)
+    os.replace(temporary_path, path)
+
+# atomic_save_arrays() never writes into the directory readers open. Each save is a new version,
+# a sibling directory "<name>.v<id>", and <name> is a symlink switched to it with one rename, so
+# readers see the old version or the new one and never a missing or half-written directory.
+# Readers resolve the link once (resolve_arrays_dir) and read every file of one version. A
+# replaced version is kept for VERSION_GRACE_SECONDS, for readers that resolved it just before the
+# switch, and removed by a later save (files already mapped outlive their removal).
+
+VERSION_SEPARATOR = ".v"
+VERSION_GRACE_SECONDS = 60
+
+def resolve_arrays_dir(directory: str) -> str:
+    """
+    The version directory saved arrays are read from, so every file of one load comes from the same save.
+    """
+    return os.path.realpath(directory)
+
+@contextmanager
+def _switch_lock(directory: str):
+    with open(f"{directory}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _versions(directory: str) -> list:
+    """
+    (time saved in ns, path) of every version of a directory, oldest first.
+    """
+    parent, name = os.path.split(os.path.abspath(directory))
+    prefix = f"{name}{VERSION_SEPARATOR}"
+    versions = []
+    for entry in os.listdir(parent):
+        if entry.startswith(prefix):
+            versions.append((int(entry[len(prefix):].split("-")[0]), os.path.join(parent, entry)))
+    return sorted(versions)
+
+def _write_temporary(directory: str, arrays: dict, meta_file: str, meta: dict) -> str:
+    parent, name = os.path.split(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    # Unique per writer, threads of one process included
+    temporary_directory = tempfile.mkdtemp(prefix=f"{name}.tmp-", dir=parent)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(temporary_directory, f"{array_name}.npy"), np.asarray(array))
+    with open(os.path.join(temporary_directory, meta_file), "w") as f:
+        json.dump(meta, f)
+    return temporary_directory
+
+def atomic_save_arrays(directory: str, arrays: dict, meta_file: str, meta: dict):
+    """
+    Save arrays as .npy files (which np.load can memory-map) plus a JSON header into a directory,
+    replacing the directory as a whole.
+
+    Everything is written to a new version directory first, then `directory`, a symlink, is
+    switched to it in one rename. Concurrent writers each write their own version; the last
+    switch wins. Processes that already memory-mapped the old files keep reading them until they reload.
+    """
+    directory = os.path.abspath(directory)
+    temporary_directory = _write_temporary(directory, arrays, meta_file, meta)
+    version = f"{directory}{VERSION_SEPARATOR}{time.time_ns()}-{os.getpid()}-{threading.get_ident()}"
+    link = f"{temporary_directory}.link"
+    with _switch_lock(directory):
+        # Only versions that were switched to are named like one, so cleanup never removes a save in progress
+        os.replace(temporary_directory, version)
+        if os.path.isdir(directory) and not os.path.islink(directory):
+            # A directory written before versions existed: it becomes one, leaving a moment without a directory once
+            os.replace(directory, f"{directory}{VERSION_SEPARATOR}0-{os.getpid()}")
+        os.symlink(os.path.basename(version), link)
+        os.replace(link, directory)
+        # A version was replaced when the next one was saved
+        versions = _versions(directory)
+        for (_, stale), (replaced_at, _) in zip(versions, versions[1:]):
+            if stale != version and time.time_ns() - replaced_at > VERSION_GRACE_SECONDS * 1e9:
+                shutil.rmtree(stale, ignore_errors=True)
+
+def save_arrays_once(directory: str, arrays: dict, meta_file: str, meta: dict):
+    """
+    Save arrays like atomic_save_arrays, into a directory whose content never changes once written
+    (e.g. named after a fingerprint of the arrays). The directory appears in one rename; when
+    another process wrote it first, its copy is kept and this one is dropped.
+    """
+    temporary_directory = _write_temporary(directory, arrays, meta_file, meta)
+    try:
+        os.rename(temporary_directory, directory)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+        shutil.rmtree(temporary_directory, ignore_errors=True)
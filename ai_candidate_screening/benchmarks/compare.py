@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+
+# Command to compare two runs (from ai_candidate_screening/): python -m benchmarks.compare baseline.json current.json [--threshold 0.1]
+
+# Compares the JSON results of benchmarks/throughput.py or benchmarks/load_test.py from two
+# commits. Rows are matched on their non-metric fields (function and rows, or backend and
+# concurrency); latencies (*_ms) should go down and rates (*_per_second) up.
+
+def metric_direction(field: str):
+    """
+    1 when higher is better, -1 when lower is better, None when the field isn't a metric.
+    """
+    if field.endswith("_per_second"):
+        return 1
+    if field.endswith("_ms"):
+        return -1
+    return None
+
+def row_key(row: dict) -> tuple:
+    return tuple(sorted((field, value) for field, value in row.items() if metric_direction(field) is None and not isinstance(value, (dict, list))))
+
+def compare(baseline: dict, current: dict, threshold=0.1) -> list:
+    """
+    Compare every metric of the rows both runs have.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        current (dict): Results of the run to check.
+        threshold (float): Relative change counted as a regression, e.g. 0.1 for 10% worse.
+
+    Returns:
+        list[dict]: One row per (row, metric) with the "change" (positive is better) and whether it "regressed".
+    """
+    reference = {row_key(row): row for row in baseline["results"]}
+    comparisons = []
+    for row in current["results"]:
+        before = reference.get(row_key(row))
+        if before is None:
+            continue
+        for field, value in row.items():
+            direction = metric_direction(field)
+            if direction is None or not before.get(field):
+                continue
+            change = direction * (value - before[field]) / before[field]
+            comparisons.append({"row": dict(row_key(row)), "metric": field, "baseline": before[field], "current": value, "change": change, "regressed": change < -threshold})
+    return comparisons
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files; exits with 1 when a metric regressed.")
+    parser.add_argument("baseline", help="Results of the reference commit.")
+    parser.add_argument("current", help="Results of the commit to check.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression.")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    comparisons = compare(baseline, current, args.threshold)
+    print(f"{baseline['metadata'].get('commit')} -> {current['metadata'].get('commit')}")
+    print(f"{'row':<50} {'metric':<20} {'baseline':>12} {'current':>12} {'change':>8}")
+    for comparison in comparisons:
+        row = " ".join(f"{field}={value}" for field, value in comparison["row"].items())
+        flag = "  REGRESSION" if comparison["regressed"] else ""
+        print(f"{row:<50} {comparison['metric']:<20} {comparison['baseline']:>12.2f} {comparison['current']:>12.2f} {comparison['change']:>+7.1%}{flag}")
+
+    sys.exit(1 if any(comparison["regressed"] for comparison in comparisons) else 0)
@@ -0,0 +1,87 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.import_time [--json results.json] [--budget 2.0]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Modules a gunicorn worker imports when it boots, plus the heavy runtimes they defer
+MODULES = [
+    "app.main",
+    "app.routes.candidate_routes",
+    "app.services.model_registry",
+    "app.services.neural_network.predict_model",
+    "app.services.XGboost.predict_model",
+    "app.services.spacy_similarity",
+    "app.services.scoring_service",
+    "tensorflow",
+    "xgboost",
+    "spacy",
+]
+
+IMPORT_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+STARTUP_SNIPPET = """
+import json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+app.state.registry.load()
+print(json.dumps({"import_seconds": imported - start, "load_seconds": time.perf_counter() - imported}))
+"""
+
+def run_snippet(snippet: str) -> dict:
+    """
+    Run a snippet in a fresh interpreter so nothing is already imported, and return its JSON output.
+    """
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_imports(modules=MODULES, repeat=3) -> dict:
+    """
+    Measure the import cost of each module in isolation, keeping the best of `repeat` runs.
+    """
+    results = {}
+    for module in modules:
+        runs = [run_snippet(IMPORT_SNIPPET.format(module=module)) for _ in range(repeat)]
+        errors = [run["error"] for run in runs if "error" in run]
+        results[module] = {"error": errors[0]} if errors else {"seconds": min(run["seconds"] for run in runs)}
+    return results
+
+def measure_startup() -> dict:
+    """
+    Measure a worker's boot: importing app.main, then loading every artifact like the lifespan does.
+    """
+    return run_snippet(STARTUP_SNIPPET)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report per-module import cost and worker startup time.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per module; the fastest is reported.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    parser.add_argument("--budget", type=float, help="Exit with an error if importing app.main takes longer (seconds).")
+    args = parser.parse_args()
+
+    results = {"imports": measure_imports(repeat=args.repeat), "startup": measure_startup()}
+
+    print(f"{'module':<45} {'import (s)':>10}")
+    for module, result in results["imports"].items():
+        print(f"{module:<45} {result['error'] if 'error' in result else format(result['seconds'], '10.3f'):>10}")
+    print("startup:", results["startup"])
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+    app_import = results["imports"]["app.main"].get("seconds")
+    if args.budget is not None and (app_import is None or app_import > args.budget):
+        sys.exit(f"Importing app.main took {app_import}s, over the {args.budget}s budget.")
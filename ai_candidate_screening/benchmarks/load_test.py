@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+import httpx
+from app.main import app
+from app.services.candidate_store import load_candidate_store
+from app.services.model_registry import ModelRegistry
+from app.services.result_cache import ResultCache
+from app.services.scoring_service import JOB_DESCRIPTIONS
+from benchmarks.synthetic import percentiles, run_metadata, seed_vector_cache, write_candidate_pool
+
+# Command to run the load test (from ai_candidate_screening/): python -m benchmarks.load_test [--rows 10000] [--concurrency 1 8 32] [--requests 200] [--json results.json]
+
+# The app runs in this process, behind an ASGI client (no network and no gunicorn), with its
+# lifespan, executors and micro-batchers as in production. The client shares the CPU with the
+# server, so compare results of the same machine, and use a real deployment for absolute numbers.
+
+ENDPOINTS = {
+    "neural_network": "/api/predict-candidates",
+    "xgboost": "/api/predict-candidates/XGboost",
+    "spacy": "/api/predict-candidates/spacy",
+}
+DEFAULT_CONCURRENCY = [1, 8, 32]
+
+def use_synthetic_pool(rows: int, directory: str):
+    """
+    Serve a synthetic pool of `rows` candidates (with random spaCy vectors) instead of app/data/candidates.csv.
+    """
+    csv_path = os.path.join(directory, "candidates.csv")
+    write_candidate_pool(rows, csv_path)
+    store_dir = os.path.join(directory, "store")
+    vectors_path = os.path.join(directory, "vectors.npz")
+    seed_vector_cache(load_candidate_store(csv_path, store_dir).frame(), vectors_path)
+    app.state.registry = ModelRegistry(
+        candidates_file=csv_path, feature_store_path=os.path.join(directory, "features.npz"), vectors_path=vectors_path,
+        index_dir=os.path.join(directory, "index"), store_dir=store_dir, shared_dir="",
+    )
+
+async def run_level(client: httpx.AsyncClient, path: str, concurrency: int, requests: int, job_descriptions) -> dict:
+    """
+    Send `requests` requests to an endpoint from `concurrency` clients that each wait for their answer before sending the next.
+    """
+    jobs = itertools.cycle(job_descriptions)
+    remaining = iter(range(requests))
+    latencies, statuses = [], {}
+
+    async def client_loop():
+        for _ in remaining:
+            body = {"jobDescription": next(jobs)}
+            start = time.perf_counter()
+            try:
+                status = (await client.post(path, json=body)).status_code
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    return {**percentiles(latencies), "requests_per_second": len(latencies) / seconds, "statuses": statuses}
+
+async def load_test(endpoints, concurrency_levels, requests: int, warmup: int) -> list:
+    results = []
+    # Runs the lifespan: artifacts are loaded once, before the first request, as in a worker
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+            for backend in endpoints:
+                path = ENDPOINTS[backend]
+                # Warm-up: first-call costs (spaCy loading, process pool start) aren't part of the measure
+                await run_level(client, path, 1, warmup, JOB_DESCRIPTIONS)
+                for concurrency in concurrency_levels:
+                    result = await run_level(client, path, concurrency, requests, JOB_DESCRIPTIONS)
+                    results.append({"backend": backend, "concurrency": concurrency, "requests": requests, **result})
+                    print(f"{backend} at concurrency {concurrency}: {result['requests_per_second']:.1f} requests/s, p99 {result['p99_ms']:.1f} ms")
+    return results
+
+def run(rows=None, endpoints=tuple(ENDPOINTS), concurrency_levels=DEFAULT_CONCURRENCY, requests=200, warmup=5, cache=False) -> dict:
+    """
+    Load test the predict endpoints at each concurrency level.
+
+    Args:
+        rows (int, optional): Serve a synthetic pool of this many candidates. Defaults to app/data/candidates.csv.
+        endpoints (list[str]): Backends to load, among ENDPOINTS.
+        concurrency_levels (list[int]): Concurrent clients of each run.
+        requests (int): Requests per run.
+        warmup (int): Requests sent before each backend's runs, not measured.
+        cache (bool): Keep the result cache; by default it is disabled so every request is scored.
+
+    Returns:
+        dict: The run's "metadata" and one "results" row per (backend, concurrency).
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if rows:
+            use_synthetic_pool(rows, directory)
+        stamp = app.state.registry.artifact_stamp
+        app.state.result_cache = ResultCache(stamp) if cache else ResultCache(stamp, max_entries=0, db_path="")
+        results = asyncio.run(load_test(endpoints, concurrency_levels, requests, warmup))
+    metadata = {**run_metadata(), "rows": rows, "cache": cache, "jobDescriptions": len(JOB_DESCRIPTIONS)}
+    return {"metadata": metadata, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process concurrent load test of the predict endpoints.")
+    parser.add_argument("--rows", type=int, help="Serve a synthetic pool of this many candidates instead of app/data/candidates.csv.")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS), help="Backends to load.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Concurrent clients of each run.")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per run.")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each backend's runs.")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file, for benchmarks/compare.py.")
+    args = parser.parse_args()
+
+    study = run(args.rows, args.endpoints, args.concurrency, args.requests, args.warmup, args.cache)
+
+    print(f"{'backend':<15} {'clients':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'requests/s':>11}  statuses")
+    for result in study["results"]:
+        print(f"{result['backend']:<15} {result['concurrency']:>7} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['requests_per_second']:>11.1f}  {json.dumps(result['statuses'])}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(study, f, indent=2)
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.nn_runtime [--requests 50] [--json results.json]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+RUNTIMES = ["keras", "numpy"]
+
+JOB_DESCRIPTIONS = [
+    "Looking for a Golang developer with backend experience and scalability expertise.",
+    "Senior Python engineer with machine learning, TensorFlow and data pipeline experience.",
+    "Frontend developer skilled in React, TypeScript and accessibility.",
+]
+
+# Each runtime runs in a fresh interpreter, so its cold start includes importing its runtime
+# and the RSS it reports is what a worker using it would hold.
+RUNTIME_SNIPPET = """
+import json, time
+import numpy as np
+from app.utils.memory import memory_usage
+from app.services.feature_store import SOURCE_COLUMNS, CandidateFeatures
+from app.utils.data_loader import load_candidate_frame
+from app.services.neural_network.predict_model import CANDIDATES_FILE
+features = CandidateFeatures.from_frame(load_candidate_frame(CANDIDATES_FILE, ["Name"] + SOURCE_COLUMNS))
+from app.services.neural_network import predict_model
+baseline = memory_usage().get("Rss", 0)
+
+start = time.perf_counter()
+artifacts = predict_model.load_artifacts(runtime={runtime!r})
+cold_start = time.perf_counter() - start
+loaded = memory_usage().get("Rss", 0)
+
+jobs = {jobs!r}
+predict_model.predict_score_matrix(jobs[:1], artifacts, features)
+latencies = []
+for i in range({requests}):
+    start = time.perf_counter()
+    predict_model.predict_score_matrix([jobs[i % len(jobs)]], artifacts, features)
+    latencies.append(time.perf_counter() - start)
+X = np.random.default_rng(0).normal(size=(len(features), 3))
+start = time.perf_counter()
+artifacts["model"].predict(artifacts["scaler"].transform(X), batch_size=predict_model.PREDICT_BATCH_SIZE, verbose=0)
+model_call = time.perf_counter() - start
+print(json.dumps({{
+    "cold_start_seconds": cold_start,
+    "rss_bytes": memory_usage().get("Rss", 0),
+    "rss_added_bytes": loaded - baseline,
+    "latency_p50_ms": float(np.percentile(latencies, 50)) * 1000,
+    "latency_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+    "model_call_ms": model_call * 1000,
+    "candidates": len(features),
+}}))
+"""
+
+def run_runtime(runtime: str, requests: int) -> dict:
+    """
+    Load one runtime in a fresh interpreter and return its cold start, memory and latency.
+    """
+    snippet = RUNTIME_SNIPPET.format(runtime=runtime, jobs=JOB_DESCRIPTIONS, requests=requests)
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the Keras and NumPy neural network runtimes.")
+    parser.add_argument("--requests", type=int, default=50, help="Single-job scoring calls timed per runtime.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = {runtime: run_runtime(runtime, args.requests) for runtime in RUNTIMES}
+
+    print(f"{'runtime':<8} {'cold start (s)':>14} {'RSS (MB)':>9} {'+RSS (MB)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'model (ms)':>10}")
+    for runtime, result in results.items():
+        if "error" in result:
+            print(f"{runtime:<8} {result['error']}")
+            continue
+        print(
+            f"{runtime:<8} {result['cold_start_seconds']:>14.3f} {result['rss_bytes'] / 2**20:>9.1f} {result['rss_added_bytes'] / 2**20:>10.1f}"
+            f" {result['latency_p50_ms']:>9.2f} {result['latency_p95_ms']:>9.2f} {result['model_call_ms']:>10.2f}"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
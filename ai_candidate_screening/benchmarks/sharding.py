@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import tempfile
+from app.services.ranking import rank_candidates
+from app.services.reranking import SCORE_MATRIX_FUNCTIONS
+from app.services.sharding import ShardCoordinator
+from app.services.spacy_similarity import embed_texts
+from benchmarks.synthetic import run_metadata
+from benchmarks.throughput import JOB_DESCRIPTION, measure, prepare
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.sharding [--rows 1000000] [--shards 1 2 4 8] [--json results.json]
+
+# Latency of one predict request on a synthetic pool, scored in this process and then fanned out
+# to 1, 2, 4... local shard processes. The speedup is bounded by the cores of the machine: run it
+# with at least as many cores as the largest shard count.
+
+BACKENDS = ["neural_network", "xgboost", "spacy"]
+
+def single_process(snapshot, backend: str):
+    """
+    The unsharded request: score the whole pool, then rank it.
+    """
+    if backend == "spacy":
+        def score():
+            return snapshot.candidate_vectors.similarities(embed_texts([JOB_DESCRIPTION])[0]) * 100
+    else:
+        def score():
+            return SCORE_MATRIX_FUNCTIONS[backend]([JOB_DESCRIPTION], snapshot.artifacts(backend), snapshot.features)[0]
+    return lambda: rank_candidates(snapshot.candidate_data, score())
+
+def run(rows=200_000, shard_counts=(1, 2, 4), backends=BACKENDS, repeat=10) -> dict:
+    """
+    Time a request of each backend unsharded and with each shard count.
+
+    Args:
+        rows (int): Size of the synthetic pool.
+        shard_counts (list[int]): Numbers of shard processes to compare.
+        backends (list[str]): Backends to time, among BACKENDS.
+        repeat (int): Timed requests per backend and configuration.
+
+    Returns:
+        dict: The run's "metadata" and one "results" row per (backend, shards), shards 0 being unsharded.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = prepare(rows, directory)["snapshot"]
+        baseline = {}
+        for backend in backends:
+            result = measure(single_process(snapshot, backend), rows, repeat)
+            baseline[backend] = result["p50_ms"]
+            results.append({"backend": backend, "shards": 0, "rows": rows, **result, "speedup": 1.0})
+            print(f"{backend} unsharded: {result['p50_ms']:.1f} ms")
+        for shards in shard_counts:
+            coordinator = ShardCoordinator(shards).start()
+            try:
+                for backend in backends:
+                    # The warm-up call of measure() also sends every shard its rows
+                    result = measure(lambda: coordinator.rank(snapshot, backend, JOB_DESCRIPTION), rows, repeat)
+                    results.append({"backend": backend, "shards": shards, "rows": rows, **result, "speedup": baseline[backend] / result["p50_ms"]})
+                    print(f"{backend} on {shards} shards: {result['p50_ms']:.1f} ms")
+            finally:
+                coordinator.shutdown()
+    return {"metadata": {**run_metadata(), "repeat": repeat}, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Speedup of sharded scoring with the number of shard processes.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Size of the synthetic pool.")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Numbers of shard processes to compare.")
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS, help="Backends to time.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed requests per backend and configuration.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file, for benchmarks/compare.py.")
+    args = parser.parse_args()
+
+    study = run(args.rows, args.shards, args.backends, args.repeat)
+
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'backend':<15} {'shards':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'speedup':>8}")
+    for result in study["results"]:
+        shards = result["shards"] or "-"
+        print(f"{result['backend']:<15} {shards:>6} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['speedup']:>7.2f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(study, f, indent=2)
@@ -0,0 +1,145 @@
+import argparse
+import os
+import platform
+import re
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+from app.utils.hashing import content_hashes
+from app.services.spacy_similarity import CandidateVectors, pipeline_id
+
+# Command to write a synthetic pool (from ai_candidate_screening/): python -m benchmarks.synthetic 100000 /tmp/candidates.csv [--seed 0]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CANDIDATES_FILE = os.path.join(PROJECT_ROOT, "app/data/candidates.csv")
+
+# Synthetic candidate pools of any size with the columns of candidates.csv, for the benchmarks.
+# Experiences and Educations are rebuilt from the "<title> at <organization>" entries of the real
+# pool with random dates, and Skills and Keywords from random sets of its skills, so every row is
+# different and the text features do real work. The other columns are resampled from the real
+# pool, keeping how often each value (or a missing value) occurs.
+
+ENTRY_SEPARATOR = "  | "
+DATES = re.compile(r"\s*\([^()]*\)\s*$")
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def entries(values: pd.Series) -> tuple:
+    """
+    The "<title> at <organization>" entries of an Experiences or Educations column without their
+    dates, and how many entries each non-empty row has.
+    """
+    rows = [value.split(ENTRY_SEPARATOR) for value in values.dropna().astype(str)]
+    return [DATES.sub("", entry.strip()) for row in rows for entry in row], [len(row) for row in rows]
+
+def listed(values: pd.Series, separator: str) -> tuple:
+    """
+    The distinct items of a list column and how many items each non-empty row has.
+    """
+    rows = [[item.strip() for item in value.split(separator) if item.strip()] for value in values.dropna().astype(str)]
+    return sorted({item for row in rows for item in row}), [len(row) for row in rows]
+
+def random_dates(rng, count: int) -> list:
+    starts = rng.integers(1995, 2025, count)
+    ends = starts + rng.integers(0, 7, count)
+    months = rng.integers(0, 12, (count, 2))
+    # About one entry in five is still ongoing
+    ongoing = rng.random(count) < 0.2
+    return [
+        f"({MONTHS[start_month]} {start} to {'N/A' if is_ongoing else f'{MONTHS[end_month]} {min(end, 2024)}'})"
+        for start, end, (start_month, end_month), is_ongoing in zip(starts.tolist(), ends.tolist(), months.tolist(), ongoing.tolist())
+    ]
+
+def compose(rng, rows: int, items: list, counts: list, present: float, join) -> list:
+    """
+    `rows` values made of a number of random items drawn like the real counts, missing at the real rate.
+    """
+    sizes = rng.choice(counts, rows)
+    picks = rng.integers(0, len(items), int(sizes.sum()))
+    missing = rng.random(rows) >= present
+    values, start = [], 0
+    for size, is_missing in zip(sizes.tolist(), missing.tolist()):
+        chosen = [items[i] for i in picks[start:start + size].tolist()]
+        start += size
+        values.append(None if is_missing else join(chosen))
+    return values
+
+def make_candidate_pool(rows: int, seed=0, source=CANDIDATES_FILE) -> pd.DataFrame:
+    """
+    A synthetic candidate pool of `rows` rows with the columns of the source pool.
+
+    Args:
+        rows (int): Number of candidates.
+        seed (int): Seed of the generator; the same seed gives the same pool.
+        source (str): The candidates.csv the values and their frequencies are drawn from.
+
+    Returns:
+        pd.DataFrame: The pool, named "Candidate 1" to "Candidate <rows>".
+    """
+    real = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+
+    # Every other column: values of random rows, drawn per column
+    pool = pd.DataFrame({column: real[column].to_numpy()[rng.integers(0, len(real), rows)] for column in real.columns})
+    pool["Name"] = [f"Candidate {i}" for i in range(1, rows + 1)]
+
+    for column in ("Experiences", "Educations"):
+        items, counts = entries(real[column])
+        present = real[column].notna().mean()
+        # Each entry gets its own dates, so the experience score varies from row to row
+        dated = lambda chosen: ENTRY_SEPARATOR.join(f"{entry} {dates}" for entry, dates in zip(chosen, random_dates(rng, len(chosen))))
+        pool[column] = compose(rng, rows, items, counts, present, dated)
+
+    for column, separator in (("Skills", "|"), ("Keywords", "|")):
+        items, counts = listed(real[column], separator)
+        pool[column] = compose(rng, rows, items, counts, real[column].notna().mean(), separator.join)
+    return pool
+
+def write_candidate_pool(rows: int, path: str, seed=0) -> pd.DataFrame:
+    pool = make_candidate_pool(rows, seed)
+    pool.to_csv(path, index=False)
+    return pool
+
+def seed_vector_cache(pool: pd.DataFrame, path: str, dimensions=96, seed=0) -> CandidateVectors:
+    """
+    Write random unit vectors as the spaCy vector cache of a pool, so large pools can be benchmarked
+    without embedding every candidate. Scoring costs the same whatever the vectors hold.
+    """
+    vectors = np.random.default_rng(seed).standard_normal((len(pool), dimensions)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    candidate_vectors = CandidateVectors(content_hashes(pool, list(pool.columns)), vectors, pipeline_id())
+    candidate_vectors.save(path)
+    return candidate_vectors
+
+def run_metadata() -> dict:
+    """
+    What a benchmark ran on, stored with its results so runs of different commits can be compared.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def percentiles(latencies) -> dict:
+    """
+    The p50, p95 and p99 of latencies in seconds, in milliseconds.
+    """
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if len(latencies) else (float("nan"),) * 3
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic candidate pool with the columns of candidates.csv.")
+    parser.add_argument("rows", type=int, help="Number of candidates.")
+    parser.add_argument("path", help="CSV file to write.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generator.")
+    args = parser.parse_args()
+
+    write_candidate_pool(args.rows, args.path, args.seed)
+    print(f"Wrote {args.rows} candidates to {args.path}.")
@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from app.services.refine_training_data import assign_education_score, calculate_experience_score
+from app.services.text_features import education_scores, experience_scores
+from app.services.feature_store import CANDIDATES_FILE
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.text_features [--sizes 1000 100000 1000000] [--json results.json]
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+FEATURES = {
+    "experience": ("Experiences", calculate_experience_score, experience_scores),
+    "education": ("Educations", assign_education_score, education_scores),
+}
+
+def make_column(column: str, rows: int) -> list:
+    """
+    `rows` texts resampled from a column of the candidate pool.
+    """
+    values = pd.read_csv(CANDIDATES_FILE, usecols=[column])[column].fillna("").astype(str).to_numpy()
+    return values[np.random.default_rng(0).integers(0, len(values), rows)].tolist()
+
+def best_time(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def run(sizes=DEFAULT_SIZES, repeat=3) -> list:
+    """
+    Time the per-row functions (as Series.apply runs them) against the whole-column ones.
+
+    Returns:
+        list[dict]: One row per (feature, size), after checking both give the same scores.
+    """
+    results = []
+    for feature, (column, per_row, whole_column) in FEATURES.items():
+        for rows in sizes:
+            texts = make_column(column, rows)
+            series = pd.Series(texts)
+            if whole_column(texts).tolist() != series.apply(per_row).tolist():
+                raise AssertionError(f"{feature} scores differ at {rows} rows")
+            apply_seconds = best_time(lambda: series.apply(per_row), repeat)
+            vectorized_seconds = best_time(lambda: whole_column(texts), repeat)
+            results.append({"feature": feature, "rows": rows, "apply_seconds": apply_seconds, "vectorized_seconds": vectorized_seconds, "speedup": apply_seconds / vectorized_seconds})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row vs whole-column experience and education scores.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Column sizes (rows).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+
+    print(f"{'feature':<11} {'rows':>9} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for result in results:
+        print(f"{result['feature']:<11} {result['rows']:>9} {result['apply_seconds']:>10.4f} {result['vectorized_seconds']:>15.4f} {result['speedup']:>7.1f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
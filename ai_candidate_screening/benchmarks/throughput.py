@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from app.services.candidate_store import SCORING_COLUMNS, load_candidate_store
+from app.services.model_registry import ModelRegistry
+from app.services.neural_network import predict_model as neural_network_model
+from app.services.reranking import score_rows
+from app.services.XGboost import predict_model as xgboost_model
+from app.services.spacy_similarity import calculate_similarity
+from app.services.text_features import education_scores, experience_scores
+from app.services.tfidf_index import TfidfIndex
+from app.services import scoring_service
+from app.utils.data_loader import load_candidates
+from app.utils.lazy import LazyResource
+from benchmarks.synthetic import percentiles, run_metadata, seed_vector_cache, write_candidate_pool
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.throughput [--sizes 1000 10000 100000] [--json results.json]
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+JOB_DESCRIPTION = scoring_service.JOB_DESCRIPTIONS[0]
+# Filters of the score_rows benchmarks; about 6% of the synthetic pool passes them
+FILTERS = {"Job location": ["Colombia"], "Disqualified": ["No"]}
+
+# Every function is run on a synthetic pool of each size, with what the server keeps loaded
+# (models, candidate store, features, vectors) prepared beforehand, so only the per-request work
+# is timed. The spaCy vectors of the pool are random: embedding a large pool would take hours
+# and the similarity costs the same whatever the vectors hold.
+
+def prepare(rows: int, directory: str) -> dict:
+    """
+    Write a synthetic pool of `rows` candidates and load it as the server would.
+    """
+    csv_path = os.path.join(directory, "candidates.csv")
+    write_candidate_pool(rows, csv_path)
+    store_dir = os.path.join(directory, "store")
+    vectors_path = os.path.join(directory, "vectors.npz")
+    seed_vector_cache(load_candidate_store(csv_path, store_dir).frame(), vectors_path)
+    registry = ModelRegistry(
+        candidates_file=csv_path, feature_store_path=os.path.join(directory, "features.npz"), vectors_path=vectors_path,
+        index_dir=os.path.join(directory, "index"), store_dir=store_dir, shared_dir="",
+    )
+    snapshot = registry.load()
+    frame = load_candidate_store(csv_path, store_dir).frame()
+    return {
+        "snapshot": snapshot,
+        "experiences": frame["Experiences"].fillna("").astype(str).tolist(),
+        "educations": frame["Educations"].fillna("").astype(str).tolist(),
+        "records": load_candidates(csv_path, SCORING_COLUMNS),
+    }
+
+def benchmarks(data: dict) -> dict:
+    """
+    The functions to time, by name, each scoring the whole pool once.
+    """
+    snapshot = data["snapshot"]
+    loaded = {"candidate_data": snapshot.candidate_data, "features": snapshot.features}
+    filtered = snapshot.filter_index.rows(FILTERS)
+
+    def score_candidates_for_job():
+        return asyncio.run(scoring_service.score_candidates_for_job(JOB_DESCRIPTION))
+
+    return {
+        "experience_scores": lambda: experience_scores(data["experiences"]),
+        "education_scores": lambda: education_scores(data["educations"]),
+        "skills_scores": lambda: snapshot.features.matcher.scores([JOB_DESCRIPTION]),
+        "predict_scores[neural_network]": lambda: neural_network_model.predict_scores(JOB_DESCRIPTION, artifacts=snapshot.artifacts("neural_network"), **loaded),
+        "predict_scores[xgboost]": lambda: xgboost_model.predict_scores(JOB_DESCRIPTION, artifacts=snapshot.artifacts("xgboost"), **loaded),
+        "score_rows[xgboost, filtered]": lambda: score_rows(JOB_DESCRIPTION, snapshot, "xgboost", filtered),
+        "calculate_similarity": lambda: calculate_similarity(JOB_DESCRIPTION, candidate_data=snapshot.candidate_data, candidate_vectors=snapshot.candidate_vectors),
+        "score_candidates_for_job": score_candidates_for_job,
+    }
+
+def measure(function, rows: int, repeat: int) -> dict:
+    """
+    Latency percentiles of `repeat` calls after a warm-up call, and the candidates and calls per second at the median.
+    """
+    function()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    median = float(np.median(latencies))
+    return {**percentiles(latencies), "calls_per_second": 1 / median, "rows_per_second": rows / median}
+
+def run(sizes=DEFAULT_SIZES, repeat=10, only=None) -> dict:
+    """
+    Time every function on pools of each size.
+
+    Args:
+        sizes (list[int]): Pool sizes (candidates).
+        repeat (int): Timed calls per function and size.
+        only (list[str], optional): Only time these functions.
+
+    Returns:
+        dict: The run's "metadata" and one "results" row per (function, size).
+    """
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            data = prepare(rows, directory)
+            # score_candidates_for_job reads the module's candidates; point them at the synthetic pool for this size
+            saved = scoring_service.CANDIDATES, scoring_service.TFIDF_INDEX
+            scoring_service.CANDIDATES = LazyResource(lambda: data["records"], name="candidates")
+            scoring_service.TFIDF_INDEX = LazyResource(lambda: TfidfIndex.fit([scoring_service.resume_text(candidate) for candidate in data["records"]]), name="tfidf_index")
+            try:
+                for name, function in benchmarks(data).items():
+                    if only and name not in only:
+                        continue
+                    results.append({"function": name, "rows": rows, **measure(function, rows, repeat)})
+                    print(f"{name} on {rows} candidates: {results[-1]['p50_ms']:.2f} ms")
+            finally:
+                scoring_service.CANDIDATES, scoring_service.TFIDF_INDEX = saved
+    return {"metadata": {**run_metadata(), "repeat": repeat}, "results": results}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the feature extractors and scoring functions on synthetic pools of each size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Pool sizes (candidates), up to 1000000.")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed calls per function and size.")
+    parser.add_argument("--only", nargs="+", help="Only time these functions.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file, for benchmarks/compare.py.")
+    args = parser.parse_args()
+
+    study = run(args.sizes, args.repeat, args.only)
+
+    print(f"{'function':<32} {'rows':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'candidates/s':>14}")
+    for result in study["results"]:
+        print(f"{result['function']:<32} {result['rows']:>9} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['rows_per_second']:>14,.0f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(study, f, indent=2)
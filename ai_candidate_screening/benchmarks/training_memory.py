@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.training_memory [--sizes 100000 500000 1000000] [--models xgboost neural_network] [--json results.json]
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+REFINED_CSV = os.path.join(PROJECT_ROOT, "app/data/refined_training_data.csv")
+
+DEFAULT_SIZES = [100_000, 500_000, 1_000_000]
+PART_ROWS = 100_000
+
+# Each run trains in a fresh interpreter and reports its peak RSS (ru_maxrss), so the
+# in-memory and streaming paths are measured on the same data without sharing any state.
+TRAIN_SNIPPETS = {
+    ("xgboost", "memory"): "from app.services.XGboost.train_model import train_xgboost_model as train\ntrain({csv!r}, {out!r}, num_boost_round={rounds})",
+    ("xgboost", "streaming"): "from app.services.XGboost.train_model import train_xgboost_streaming as train\ntrain({parquet!r}, {out!r}, chunk_rows={chunk_rows}, num_boost_round={rounds})",
+    ("neural_network", "memory"): "from app.services.neural_network.train_model import train_neural_network as train\ntrain({csv!r}, {out!r}, epochs={epochs})",
+    ("neural_network", "streaming"): "from app.services.neural_network.train_model import train_neural_network_streaming as train\ntrain({parquet!r}, {out!r}, chunk_rows={chunk_rows}, epochs={epochs})",
+}
+
+MEASURE_SNIPPET = """
+import json, resource, time
+start = time.perf_counter()
+{train}
+print(json.dumps({{"seconds": time.perf_counter() - start, "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}}))
+"""
+
+def make_dataset(rows: int, directory: str) -> dict:
+    """
+    Write `rows` rows resampled from refined_training_data.csv, as one CSV and as Parquet parts.
+    """
+    source = pd.read_csv(REFINED_CSV)
+    rng = np.random.default_rng(0)
+    parquet_dir = os.path.join(directory, "parquet")
+    os.makedirs(parquet_dir, exist_ok=True)
+    csv_path = os.path.join(directory, "refined.csv")
+    for part, start in enumerate(range(0, rows, PART_ROWS)):
+        chunk = source.iloc[rng.integers(0, len(source), min(PART_ROWS, rows - start))]
+        chunk.to_parquet(os.path.join(parquet_dir, f"part-{part:05d}.parquet"), index=False)
+        chunk.to_csv(csv_path, mode="a", header=part == 0, index=False)
+    return {"csv": csv_path, "parquet": parquet_dir}
+
+def run_training(model: str, mode: str, dataset: dict, out: str, rounds: int, epochs: int, chunk_rows: int) -> dict:
+    train = TRAIN_SNIPPETS[(model, mode)].format(csv=dataset["csv"], parquet=dataset["parquet"], out=out, rounds=rounds, epochs=epochs, chunk_rows=chunk_rows)
+    result = subprocess.run([sys.executable, "-c", MEASURE_SNIPPET.format(train=train)], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(sizes=DEFAULT_SIZES, models=("xgboost",), rounds=20, epochs=1, chunk_rows=100_000) -> list:
+    """
+    Train every model in memory and streaming on datasets of each size.
+
+    Returns:
+        list[dict]: One row per (model, mode, size) with the wall time and peak RSS.
+    """
+    results = []
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = make_dataset(rows, directory)
+            for model in models:
+                for mode in ("memory", "streaming"):
+                    out = os.path.join(directory, f"{model}-{mode}")
+                    results.append({"model": model, "mode": mode, "rows": rows, **run_training(model, mode, dataset, out, rounds, epochs, chunk_rows)})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS and wall time of in-memory vs streaming training, by dataset size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Dataset sizes (rows).")
+    parser.add_argument("--models", nargs="+", default=["xgboost"], choices=["xgboost", "neural_network"], help="Models to train.")
+    parser.add_argument("--rounds", type=int, default=20, help="XGBoost boosting rounds.")
+    parser.add_argument("--epochs", type=int, default=1, help="Neural network epochs.")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per chunk when streaming.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.models, args.rounds, args.epochs, args.chunk_rows)
+
+    print(f"{'model':<15} {'mode':<10} {'rows':>9} {'seconds':>8} {'peak RSS (MB)':>14}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['model']:<15} {result['mode']:<10} {result['rows']:>9} {result['error']}")
+            continue
+        print(f"{result['model']:<15} {result['mode']:<10} {result['rows']:>9} {result['seconds']:>8.2f} {result['peak_rss_bytes'] / 2**20:>14.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,78 @@
+import argparse
+import json
+import time
+import numpy as np
+import xgboost as xgb
+from app.services.XGboost.predictors import MODEL_PATH, load_predictor
+
+# Command to run the benchmark (from ai_candidate_screening/): python -m benchmarks.xgb_predictor [--sizes 100 1000 10000 100000] [--threads 1 2 4] [--json results.json]
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_THREADS = [1, 2, 4]
+
+class DMatrixPredictor:
+    """
+    The previous serving path, for reference: a DMatrix built on every call, then Booster.predict.
+    """
+
+    def __init__(self, nthread: int):
+        self.booster = xgb.Booster(model_file=MODEL_PATH)
+        self.booster.set_param({"nthread": nthread})
+
+    def predict(self, X):
+        return self.booster.predict(xgb.DMatrix(X))
+
+def time_calls(predictor, X, repeat: int) -> dict:
+    """
+    Median and p95 latency of predictor.predict(X) over `repeat` calls, after one warm-up call.
+    """
+    predictor.predict(X)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.predict(X)
+        latencies.append(time.perf_counter() - start)
+    return {"p50_ms": float(np.percentile(latencies, 50)) * 1000, "p95_ms": float(np.percentile(latencies, 95)) * 1000}
+
+def load_predictors(nthread: int) -> dict:
+    predictors = {"dmatrix": DMatrixPredictor(nthread), "inplace": load_predictor(predictor="booster", nthread=nthread)}
+    try:
+        predictors["compiled"] = load_predictor(predictor="compiled", nthread=nthread)
+    except ImportError:
+        # treelite and tl2cgen are optional
+        pass
+    return predictors
+
+def run(sizes=DEFAULT_SIZES, threads=DEFAULT_THREADS, repeat=20) -> list:
+    """
+    Time every predictor on pools of each size, with each thread count.
+
+    Returns:
+        list[dict]: One row per (predictor, threads, pool size).
+    """
+    rng = np.random.default_rng(0)
+    pools = {size: rng.normal(size=(size, 3)) for size in sizes}
+    results = []
+    for nthread in threads:
+        for name, predictor in load_predictors(nthread).items():
+            for size, X in pools.items():
+                results.append({"predictor": name, "threads": nthread, "candidates": size, **time_calls(predictor, X, repeat)})
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-call latency of the XGBoost predictors across candidate pool sizes and thread counts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Candidate pool sizes (rows per call).")
+    parser.add_argument("--threads", type=int, nargs="+", default=DEFAULT_THREADS, help="nthread values to compare.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per configuration.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.threads, args.repeat)
+
+    print(f"{'predictor':<10} {'threads':>7} {'candidates':>10} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for result in results:
+        print(f"{result['predictor']:<10} {result['threads']:>7} {result['candidates']:>10} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
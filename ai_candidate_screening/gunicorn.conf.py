@@ -0,0 +1,37 @@
+import os
+# Imported by name: gunicorn reads every module-level name here as a setting, and `config` is one
+from app.config import PRELOAD_APP, SHARED_ARRAYS_DIR
+
+# gunicorn settings for the Procfile. Command (from ai_candidate_screening/): gunicorn -c gunicorn.conf.py app.main:app
+
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master. TensorFlow, XGBoost and the models are imported lazily,
+# so nothing fork-unsafe is loaded before the workers are forked; each worker loads its own
+# models in the lifespan.
+preload_app = bool(PRELOAD_APP)
+
+def when_ready(server):
+    """
+    Publish the candidate feature, vector and filter arrays before the workers start. Each
+    worker finds them through the manifest of the candidate files' fingerprint and maps them,
+    without decoding the pool or computing anything.
+
+    Local shard processes (SHARDS) are started here too, once: the workers inherit their
+    addresses instead of each starting SHARDS processes of its own.
+    """
+    if not preload_app:
+        return
+    from app.main import app
+    if SHARED_ARRAYS_DIR:
+        app.state.registry.publish_shared_arrays()
+        server.log.info(f"Shared arrays published in {app.state.registry.shared_dir}")
+    if app.state.shards is not None:
+        app.state.shards.start()
+
+def on_exit(server):
+    if preload_app:
+        from app.main import app
+        if app.state.shards is not None:
+            app.state.shards.shutdown()
@@ -0,0 +1,39 @@
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+from app.routes.candidate_routes import stream_rankings
+from app.services.executor import ExecutorSaturated
+from app.services.ranking import rank_candidates
+
+CANDIDATES = pd.DataFrame({"Name": ["Ana", "Ben", "Cleo"]})
+
+def collect(lines) -> list:
+    async def consume():
+        return [json.loads(line) async for line in lines]
+    return asyncio.run(consume())
+
+def test_one_line_per_job_in_order():
+    chunks = []
+
+    async def score_chunk(chunk):
+        chunks.append(chunk)
+        return np.array([[len(job), 0, 2] for job in chunk], dtype=float)
+
+    lines = collect(stream_rankings(["a", "bbb", "c", "dddd", "e"], score_chunk, lambda scores: rank_candidates(CANDIDATES, scores), chunk_size=2))
+
+    assert chunks == [["a", "bbb"], ["c", "dddd"], ["e"]]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4]
+    assert [candidate["Name"] for candidate in lines[1]["topCandidates"]] == ["Ana", "Cleo", "Ben"]
+    assert [candidate["Name"] for candidate in lines[0]["topCandidates"]] == ["Cleo", "Ana", "Ben"]
+
+def test_failed_chunk_is_reported_in_band():
+    async def score_chunk(chunk):
+        if "busy" in chunk:
+            raise ExecutorSaturated("saturated")
+        return np.zeros((len(chunk), 3))
+
+    lines = collect(stream_rankings(["busy", "x", "y"], score_chunk, lambda scores: rank_candidates(CANDIDATES, scores), chunk_size=2))
+
+    assert [line.get("status") for line in lines] == [503, 503, None]
+    assert len(lines[2]["topCandidates"]) == 3
@@ -0,0 +1,68 @@
+import asyncio
+import numpy as np
+import pytest
+from app.services.batching import MicroBatcher
+from app.services.executor import InferenceExecutor
+
+class FakeSnapshot:
+    def __init__(self, version):
+        self.version = version
+
+def make_batcher(calls, max_batch_size=8, max_wait_ms=20.0):
+    def predict_batch(job_descriptions, snapshot):
+        calls.append((list(job_descriptions), snapshot.version))
+        # One row per job, the candidates' score is the job's length
+        return np.array([[len(job)] * 3 for job in job_descriptions], dtype=float)
+    executor = InferenceExecutor("test", kind="thread", max_workers=2, max_pending=4, timeout=5.0)
+    return MicroBatcher("test", predict_batch, executor, max_batch_size, max_wait_ms)
+
+def test_concurrent_requests_share_one_predict_call():
+    calls = []
+    batcher = make_batcher(calls)
+    snapshot = FakeSnapshot(1)
+
+    async def submit_all():
+        return await asyncio.gather(*(batcher.submit("x" * n, snapshot) for n in range(1, 6)))
+
+    rows = asyncio.run(submit_all())
+
+    assert len(calls) == 1
+    assert [row.tolist() for row in rows] == [[n] * 3 for n in range(1, 6)]
+    stats = batcher.stats()
+    assert stats["batchSize"]["count"] == 1
+    assert stats["batchSize"]["buckets"]["4"] == 0
+    assert stats["batchSize"]["buckets"]["8"] == 1
+    assert stats["waitSeconds"]["count"] == 5
+
+def test_full_batch_is_flushed_without_waiting():
+    calls = []
+    batcher = make_batcher(calls, max_batch_size=2, max_wait_ms=10_000)
+    snapshot = FakeSnapshot(1)
+
+    async def submit_all():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(job, snapshot) for job in ["a", "bb", "ccc", "dddd"])), 2)
+
+    asyncio.run(submit_all())
+    assert [jobs for jobs, _ in calls] == [["a", "bb"], ["ccc", "dddd"]]
+
+def test_snapshots_are_not_mixed_in_a_batch():
+    calls = []
+    batcher = make_batcher(calls)
+
+    async def submit_all():
+        return await asyncio.gather(batcher.submit("a", FakeSnapshot(1)), batcher.submit("b", FakeSnapshot(2)))
+
+    asyncio.run(submit_all())
+    assert sorted(calls, key=lambda call: call[1]) == [(["a"], 1), (["b"], 2)]
+
+def test_errors_reach_every_request_of_the_batch():
+    def predict_batch(job_descriptions, snapshot):
+        raise ValueError("broken model")
+    executor = InferenceExecutor("test", kind="thread", max_workers=1, max_pending=4, timeout=5.0)
+    batcher = MicroBatcher("test", predict_batch, executor, max_batch_size=8, max_wait_ms=1.0)
+
+    async def submit_all():
+        return await asyncio.gather(batcher.submit("a", FakeSnapshot(1)), batcher.submit("b", FakeSnapshot(1)), return_exceptions=True)
+
+    results = asyncio.run(submit_all())
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,172 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models.candidate_model import CandidateRecord
+from app.services.candidate_log import CandidateExists, CandidateLog, apply_operations, compact_log, delete, upsert
+from app.services.model_registry import ModelRegistry
+
+CANDIDATES_FILE = "app/data/candidates.csv"
+
+def pool(*names):
+    return pd.DataFrame({"Name": list(names), "Skills": [f"{name} skills" for name in names]})
+
+def test_apply_operations_replaces_in_place_appends_and_deletes():
+    operations = [
+        upsert({"Name": "b", "Skills": "new b"}),
+        upsert({"Name": "d", "Skills": "d"}),
+        delete("a"),
+        upsert({"Name": "e", "Skills": "e"}),
+        upsert({"Name": "d", "Skills": "new d"}),
+        delete("e"),
+    ]
+    result = apply_operations(pool("a", "b", "c"), operations)
+    assert result["Name"].tolist() == ["b", "c", "d"]
+    assert result["Skills"].tolist() == ["new b", "c skills", "new d"]
+    # Replaying on a pool that already has the operations applied changes nothing
+    assert apply_operations(result, operations).equals(result)
+
+def test_replaying_a_delete_and_re_add_is_idempotent():
+    # A process reading the log before the CSV replays it on the compacted CSV when a compaction lands in between
+    operations = [delete("a"), upsert({"Name": "a", "Skills": "new a"}), upsert({"Name": "d", "Skills": "d"})]
+    result = apply_operations(pool("a", "b"), operations)
+    assert result["Name"].tolist() == ["a", "b", "d"]
+    assert apply_operations(result, operations).equals(result)
+
+def test_log_reads_complete_lines_up_to_a_position(tmp_path):
+    log = CandidateLog(str(tmp_path / "candidates_log.ndjson"))
+    assert log.read() == ([], (None, 0))
+    position = log.append([upsert({"Name": "a"})])
+    log.append([delete("a")])
+    # A line cut short by a crash is ignored
+    with open(log.path, "a") as f:
+        f.write('{"op": "upsert", "candid')
+    operations, _ = log.read()
+    assert [operation["op"] for operation in operations] == ["upsert", "delete"]
+    assert log.read(until=position)[0] == [upsert({"Name": "a"})]
+    assert log.read(since=position)[0] == [delete("a")]
+
+def test_compaction_folds_the_log_into_the_csv(tmp_path):
+    csv_path = str(tmp_path / "candidates.csv")
+    pool("a", "b").to_csv(csv_path, index=False)
+    log = CandidateLog(str(tmp_path / "candidates_log.ndjson"))
+    log.append([upsert({"Name": "c", "Skills": "c"}), delete("a")])
+    before = log.position()
+    assert compact_log(csv_path, log.path, str(tmp_path / "store")) == 2
+    assert pd.read_csv(csv_path)["Name"].tolist() == ["b", "c"]
+    assert log.read() == ([], (log.position()[0], 0))
+    assert log.position() != before
+
+def test_candidate_record_uses_csv_columns():
+    record = CandidateRecord.model_validate({"Name": " Ada ", "Job title": "Engineer", "Answer 1": 42, "Summary": ""})
+    row = record.row()
+    assert row["Name"] == "Ada"
+    assert row["Answer 1"] == "42"
+    assert row["Summary"] is None
+    with pytest.raises(ValueError):
+        CandidateRecord.model_validate({"Name": "Ada", "Unknown column": "x"})
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "candidates.csv")
+    pd.read_csv(CANDIDATES_FILE, nrows=20).to_csv(csv_path, index=False)
+    registry = ModelRegistry(
+        candidates_file=csv_path, feature_store_path=str(tmp_path / "features.npz"), vectors_path=str(tmp_path / "vectors.npz"),
+        index_dir=str(tmp_path / "vector_index"), store_dir=str(tmp_path / "store"), shared_dir="", loaders={"fake": lambda: {}},
+    )
+    monkeypatch.setattr(app.state, "registry", registry)
+    return TestClient(app)
+
+def test_candidates_api_writes_through_the_log(client):
+    registry = app.state.registry
+    size = len(registry.snapshot.candidate_data)
+    existing = registry.snapshot.candidate_data["Name"].to_numpy()[0]
+
+    response = client.post("/api/candidates", json={"Name": "New Candidate", "Skills": "Python|SQL"})
+    assert response.status_code == 201
+    assert response.json()["candidates"] == size + 1
+    snapshot = registry.snapshot
+    assert registry.has_candidate("New Candidate")
+    assert len(snapshot.features) == len(snapshot.candidate_vectors) == size + 1
+
+    assert client.post("/api/candidates", json={"Name": existing}).status_code == 409
+    assert client.put("/api/candidates/Other", json={"Name": "New Candidate"}).status_code == 422
+    assert client.put(f"/api/candidates/{existing}", json={"Name": existing, "Skills": "Go"}).json()["candidates"] == size + 1
+    assert client.delete(f"/api/candidates/{existing}").json()["candidates"] == size
+    assert client.delete(f"/api/candidates/{existing}").status_code == 404
+
+    assert client.post("/api/admin/compact").json()["compacted"] == 3
+    assert registry.snapshot.log_operations == 0
+    assert registry.has_candidate("New Candidate")
+    assert not registry.has_candidate(existing)
+
+def test_bulk_upload_is_all_or_nothing(client):
+    registry = app.state.registry
+    size = len(registry.snapshot.candidate_data)
+    lines = [json.dumps({"Name": f"Bulk {i}", "Skills": "Python"}) for i in range(3)]
+
+    response = client.post("/api/candidates/bulk", content="\n".join(lines + ['{"Skills": "no name"}', "not json"]))
+    assert response.status_code == 422
+    assert [error["line"] for error in response.json()["detail"]] == [4, 5]
+    assert registry.log.read()[0] == []
+
+    response = client.post("/api/candidates/bulk", content="\n".join(lines) + "\n")
+    assert response.json() == {"version": registry.snapshot.version, "candidates": size + 3, "upserted": 3}
+
+def test_log_deltas_give_the_pool_of_a_full_rebuild(client):
+    registry = app.state.registry
+    names = registry.snapshot.candidate_data["Name"].to_numpy()
+    registry.log.append([delete(names[0]), upsert({"Name": names[1], "Skills": "Go|Rust", "Job location": "Chile"})])
+    registry.apply_log()
+    registry.log.append([upsert({"Name": "New Candidate", "Skills": "Python"}), upsert({"Name": names[0], "Summary": "Back"})])
+    delta = registry.apply_log()
+    # Rebuilt from the CSV with the log folded in
+    registry.compact()
+    rebuilt = registry.snapshot
+    assert rebuilt.log_operations == 0
+
+    assert delta.candidate_data["Name"].to_numpy().tolist() == rebuilt.candidate_data["Name"].to_numpy().tolist()
+    assert delta.candidate_data["Skills"].to_numpy().tolist()[:3] == rebuilt.candidate_data["Skills"].to_numpy().tolist()[:3]
+    for name in ("hashes", "experience_scores", "education_scores", "keywords", "offsets"):
+        np.testing.assert_array_equal(getattr(delta.features, name), getattr(rebuilt.features, name))
+    np.testing.assert_array_equal(delta.candidate_vectors.hashes, rebuilt.candidate_vectors.hashes)
+    np.testing.assert_allclose(delta.candidate_vectors.vectors, rebuilt.candidate_vectors.vectors)
+    for filters in [{"Job location": ["Chile"]}, {"Disqualified": ["No"]}]:
+        np.testing.assert_array_equal(delta.filter_index.rows(filters), rebuilt.filter_index.rows(filters))
+    np.testing.assert_array_equal(delta.features.matcher.score("python go"), rebuilt.features.matcher.score("python go"))
+
+def test_adding_checks_names_against_the_log_of_every_worker(client, tmp_path):
+    registry = app.state.registry
+    registry.snapshot
+    # Another worker sharing the candidates file, which hasn't applied the log yet
+    other = ModelRegistry(
+        candidates_file=registry.candidates_file, feature_store_path=registry.feature_store_path, vectors_path=registry.vectors_path,
+        index_dir=registry.index_dir, store_dir=registry.store_dir, shared_dir="", loaders={"fake": lambda: {}},
+    )
+    other.snapshot
+    registry.add_candidates([{"Name": "New Candidate"}])
+    with pytest.raises(CandidateExists):
+        other.add_candidates([{"Name": "New Candidate"}])
+    assert len(registry.log.read()[0]) == 1
+
+def test_tfidf_scoring_sees_logged_candidates(tmp_path, monkeypatch):
+    from app.services import scoring_service
+
+    csv_path = str(tmp_path / "candidates.csv")
+    pool("a", "b").reindex(columns=scoring_service.SCORING_COLUMNS).to_csv(csv_path, index=False)
+    monkeypatch.setattr(scoring_service, "CANDIDATES_FILE", csv_path)
+    monkeypatch.setattr(scoring_service, "TFIDF_INDEX", scoring_service.LazyResource(
+        lambda: scoring_service.TfidfIndex.fit([scoring_service.resume_text(candidate) for candidate in scoring_service.get_candidates()]),
+    ))
+    scoring_service.CANDIDATES.reset()
+    try:
+        candidates, _ = scoring_service.current_pool(check_seconds=0)
+        assert [candidate["Name"] for candidate in candidates] == ["a", "b"]
+        CandidateLog(str(tmp_path / "candidates_log.ndjson")).append([upsert({"Name": "c", "Skills": "golang"}), delete("a")])
+        candidates, tfidf_index = scoring_service.current_pool(check_seconds=0)
+        assert [candidate["Name"] for candidate in candidates] == ["b", "c"]
+        assert np.argmax(tfidf_index.similarity("golang")) == 1
+    finally:
+        scoring_service.CANDIDATES.reset()
@@ -0,0 +1,80 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.candidate_store import CandidateStore, StringColumn, load_candidate_store
+
+CANDIDATES = pd.DataFrame({
+    "Name": ["Ana", "Ben", "Cleo"],
+    "Skills": ["ruby,postgresql", None, "réact,typescript"],
+    "Answer 1": [1.5, np.nan, 3.0],
+})
+
+def test_round_trip_matches_read_csv(tmp_path):
+    csv_path = str(tmp_path / "candidates.csv")
+    CANDIDATES.to_csv(csv_path, index=False)
+
+    store = load_candidate_store(csv_path)
+    assert isinstance(store["Name"], StringColumn) and isinstance(store["Name"].data, np.memmap)
+    pd.testing.assert_frame_equal(store.frame(), pd.read_csv(csv_path), check_dtype=False)
+    assert store["Skills"].take([2, 1])[0] == "réact,typescript"
+    assert pd.isna(store["Skills"].take([1])[0])
+
+def test_column_projection(tmp_path):
+    CandidateStore.from_frame(CANDIDATES).save(str(tmp_path / "store"))
+    store = CandidateStore.open(str(tmp_path / "store"), columns=["Name"])
+    assert store.columns == ["Name"]
+    assert store.frame()["Name"].tolist() == ["Ana", "Ben", "Cleo"]
+    with pytest.raises(KeyError):
+        CandidateStore.open(str(tmp_path / "store"), columns=["Missing"])
+
+def test_store_is_rebuilt_when_the_csv_changes(tmp_path, capsys):
+    csv_path = str(tmp_path / "candidates.csv")
+    CANDIDATES.to_csv(csv_path, index=False)
+    load_candidate_store(csv_path)
+    load_candidate_store(csv_path)
+    assert capsys.readouterr().out.count("Candidate store written") == 1
+
+    pd.concat([CANDIDATES, CANDIDATES.head(1)]).to_csv(csv_path, index=False)
+    os.utime(csv_path, ns=(0, 0))
+    assert len(load_candidate_store(csv_path)) == 4
+
+def test_saving_never_leaves_readers_without_a_store(tmp_path, monkeypatch):
+    store_dir = str(tmp_path / "store")
+    # A store written before saves were versioned becomes a version
+    os.makedirs(store_dir)
+    with open(os.path.join(store_dir, "meta.json"), "w") as f:
+        f.write("{}")
+    CandidateStore.from_frame(CANDIDATES).save(store_dir)
+    assert os.path.islink(store_dir) and len(CandidateStore.open(store_dir)) == 3
+    errors = []
+
+    def write(size):
+        frame = pd.concat([CANDIDATES] * size, ignore_index=True)
+        for _ in range(20):
+            try:
+                CandidateStore.from_frame(frame).save(store_dir)
+            except Exception as e:
+                errors.append(e)
+
+    def read():
+        for _ in range(200):
+            try:
+                store = CandidateStore.open(store_dir)
+                # Every column comes from the same save
+                assert len(store["Name"]) == len(store["Answer 1"]) and len(store["Name"]) in (3, 6)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(size,)) for size in (1, 2)] + [threading.Thread(target=read) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    # Replaced versions are removed once the grace period is over
+    monkeypatch.setattr("app.utils.storage.VERSION_GRACE_SECONDS", 0)
+    CandidateStore.from_frame(CANDIDATES).save(store_dir)
+    assert [entry for entry in os.listdir(tmp_path) if entry.startswith("store.v")] == [os.path.basename(os.path.realpath(store_dir))]
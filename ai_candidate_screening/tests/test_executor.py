@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import pytest
+from app.services.executor import ExecutorSaturated, InferenceExecutor, InferenceTimeout
+
+def test_run_returns_result():
+    executor = InferenceExecutor("test", max_workers=2)
+    assert asyncio.run(executor.run(sum, [1, 2, 3])) == 6
+    executor.shutdown()
+
+def test_saturated_executor_rejects_requests():
+    executor = InferenceExecutor("test", max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(sum, [1])
+        release.set()
+        await blocked
+        # The slot is given back once the blocking work has finished
+        assert await executor.run(sum, [1]) == 1
+
+    asyncio.run(scenario())
+    executor.shutdown()
+
+def test_slow_request_times_out():
+    executor = InferenceExecutor("test", max_workers=1, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(InferenceTimeout):
+        asyncio.run(executor.run(release.wait))
+    release.set()
+    executor.shutdown()
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from app.services.feature_store import CandidateFeatures, load_feature_store
+from app.services.refine_training_data import calculate_experience_score, assign_education_score, calculate_skills_score
+
+CANDIDATES = pd.DataFrame({
+    "Name": ["Ana", "Ben", "Cleo"],
+    "Experiences": ["Backend at Acme (2015 to 2020)", "golang developer 2018 2021", None],
+    "Skills": ["python,golang,sql", "", "react, typescript"],
+    "Educations": ["Master of Science", "Bachelor", None],
+})
+
+def test_features_match_row_wise_functions():
+    features = CandidateFeatures.from_frame(CANDIDATES)
+    experiences = CANDIDATES["Experiences"].fillna("")
+    skills = CANDIDATES["Skills"].fillna("")
+    educations = CANDIDATES["Educations"].fillna("")
+    assert features.experience_scores.tolist() == [calculate_experience_score(e) for e in experiences]
+    assert features.education_scores.tolist() == [assign_education_score(e) for e in educations]
+    for job in ["Golang developer", "python sql", ""]:
+        expected = [calculate_skills_score(s, e, job) for s, e in zip(skills, experiences)]
+        assert features.skills_scores(job).tolist() == expected
+
+def test_only_changed_rows_are_recomputed(tmp_path, capsys):
+    path = str(tmp_path / "features.npz")
+    load_feature_store(CANDIDATES, path)
+    capsys.readouterr()
+
+    changed = CANDIDATES.copy()
+    changed.loc[1, "Skills"] = "golang,kubernetes"
+    changed = changed.iloc[::-1].reset_index(drop=True)
+    features = load_feature_store(changed, path)
+
+    assert "1 of 3 candidates recomputed" in capsys.readouterr().out
+    expected = CandidateFeatures.from_frame(changed)
+    for name in ["hashes", "experience_scores", "education_scores", "keywords", "offsets"]:
+        assert np.array_equal(getattr(features, name), getattr(expected, name))
+
+def test_empty_pool_without_a_store(tmp_path):
+    features = load_feature_store(CANDIDATES.iloc[:0], str(tmp_path / "features.npz"))
+    assert len(features) == 0
+    assert features.hashes.dtype == np.uint64 and features.experience_scores.dtype == np.int64
+    assert features.offsets.tolist() == [0]
+    assert features.feature_frame(features.skills_scores("python")).empty
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from app.routes.candidate_routes import CandidateFilters
+from app.services.filter_index import FilterIndex
+from app.services.model_registry import ModelRegistry
+from app.services.reranking import SCORE_MATRIX_FUNCTIONS, score_rows
+from app.services.XGboost import predict_model as xgboost_model
+
+CANDIDATES_FILE = "app/data/candidates.csv"
+
+def expected_rows(frame, filters):
+    passing = np.ones(len(frame), dtype=bool)
+    for column, values in filters.items():
+        wanted = {value.strip().lower() for value in values}
+        passing &= frame[column].map(lambda cell: pd.notna(cell) and bool(wanted & {item.strip().lower() for item in str(cell).split(",")})).to_numpy()
+    return np.flatnonzero(passing)
+
+def test_filters_match_a_scan_of_the_pool():
+    rng = np.random.default_rng(0)
+    size = 5000
+    frame = pd.DataFrame({
+        # "Rare" is held by few enough rows to be stored as rows rather than a bitmap
+        "Job location": rng.choice(["Chile", "Colombia", "Rare", None], size, p=[0.5, 0.45, 0.01, 0.04]),
+        "Tags": rng.choice(["sourced", "applied, referrals", "Referrals", None], size),
+        "Disqualified": rng.choice(["Yes", "No"], size),
+    })
+    index = FilterIndex.build(frame)
+    assert index.postings["Job location"]["rare"].dtype == np.int32
+    assert index.postings["Job location"]["chile"].dtype == np.uint8
+    for filters in [
+        {"Job location": ["chile", "RARE"]},
+        {"Tags": ["referrals"], "Disqualified": ["No"]},
+        {"Job location": ["Rare"], "Tags": ["applied"], "Disqualified": ["yes"]},
+        {"Job location": ["Nowhere"]},
+    ]:
+        np.testing.assert_array_equal(index.rows(filters), expected_rows(frame, filters))
+    assert index.rows({}) is None
+    assert index.values()["Tags"]["referrals"] == int((frame["Tags"].isin(["applied, referrals", "Referrals"])).sum())
+
+def test_request_filters_map_to_columns():
+    filters = CandidateFilters(jobLocation=["Chile"], disqualified=False)
+    assert filters.columns() == {"Job location": ["Chile"], "Disqualified": ["No"]}
+
+def test_score_rows_only_scores_the_filtered_candidates(tmp_path):
+    registry = ModelRegistry(
+        candidates_file=CANDIDATES_FILE, feature_store_path=str(tmp_path / "features.npz"), vectors_path=str(tmp_path / "vectors.npz"),
+        index_dir=str(tmp_path / "vector_index"), store_dir=str(tmp_path / "store"), shared_dir="", loaders={"xgboost": xgboost_model.load_artifacts},
+    )
+    snapshot = registry.snapshot
+    job_description = "Senior Python engineer with PostgreSQL experience"
+    rows = snapshot.filter_index.rows({"Job location": ["Chile"], "Disqualified": ["No"]})
+    assert 0 < len(rows) < len(snapshot.candidate_data)
+
+    top = score_rows(job_description, snapshot, "xgboost", rows, k=len(rows))
+    scores = SCORE_MATRIX_FUNCTIONS["xgboost"]([job_description], snapshot.artifacts("xgboost"), snapshot.features)[0]
+    names = snapshot.candidate_data["Name"].to_numpy()
+    assert set(top["Name"]) == set(names[rows])
+    np.testing.assert_allclose(np.sort(top["Score"].to_numpy()), np.sort(scores[rows]), rtol=1e-5)
+    assert score_rows(job_description, snapshot, "xgboost", rows[:0]).empty
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.lazy import LazyResource
+
+def test_factory_runs_once_across_threads():
+    calls = []
+    resource = LazyResource(lambda: calls.append(1) or object())
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: resource.get(), range(32)))
+    assert len(calls) == 1
+    assert all(value is values[0] for value in values)
+
+def test_importing_scoring_service_does_no_work():
+    # Checked in a fresh interpreter so other tests can't have loaded anything yet
+    code = (
+        "import sys\n"
+        "from app.services import scoring_service\n"
+        "assert not scoring_service.CANDIDATES.loaded\n"
+        "assert not scoring_service.TFIDF_INDEX.loaded\n"
+        "assert 'tensorflow' not in sys.modules and 'spacy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
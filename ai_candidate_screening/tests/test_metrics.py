@@ -0,0 +1,68 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.metrics import Histogram, StageTimings, format_labels
+from app.utils.profiling import ProfileStore, SamplingProfiler
+
+def test_stage_timer_and_decorator_record_calls():
+    stages = StageTimings(buckets=[0.001, 1.0])
+
+    @stages.timed("xgboost", "predict")
+    def predict():
+        return 1
+
+    @stages.timed("scoring_service", "total")
+    async def score():
+        return 2
+
+    assert predict() == 1
+    assert asyncio.run(score()) == 2
+    with pytest.raises(ValueError):
+        with stages.time("xgboost", "rank"):
+            raise ValueError("failed stages are timed too")
+
+    stats = stages.stats()
+    assert stats["xgboost"]["predict"]["count"] == 1
+    assert stats["xgboost"]["rank"]["count"] == 1
+    assert stats["scoring_service"]["total"]["buckets"]["+Inf"] == 1
+
+def test_histogram_prometheus_lines():
+    histogram = Histogram("test", [1, 5])
+    for value in (0.5, 3, 10):
+        histogram.observe(value)
+
+    assert histogram.to_prometheus("latency_seconds", {"backend": "spacy"}) == [
+        'latency_seconds_bucket{backend="spacy",le="1"} 1',
+        'latency_seconds_bucket{backend="spacy",le="5"} 2',
+        'latency_seconds_bucket{backend="spacy",le="+Inf"} 3',
+        'latency_seconds_sum{backend="spacy"} 13.5',
+        'latency_seconds_count{backend="spacy"} 3',
+    ]
+    assert format_labels({"stage": 'a"b\\c'}) == '{stage="a\\"b\\\\c"}'
+
+def test_metrics_endpoint():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE candidate_screening_stage_seconds histogram" in response.text
+    assert 'candidate_screening_batch_size_count{backend="xgboost"}' in response.text
+    assert 'candidate_screening_result_cache_events_total{event="hits"}' in response.text
+
+def test_sampling_profiler_sees_other_threads():
+    profiler = SamplingProfiler(interval_ms=1.0).start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    report = profiler.stop().report()
+
+    assert report["samples"] > 0
+    assert any("test_sampling_profiler_sees_other_threads" in stack["stack"] for stack in report["stacks"])
+
+    profiles = ProfileStore(max_profiles=1)
+    first = profiles.add(report)
+    second = profiles.add(report)
+    assert profiles.get(first) is None
+    assert profiles.get(second) == report
@@ -0,0 +1,98 @@
+import os
+import shutil
+import numpy as np
+from app.services import model_registry, spacy_similarity
+from app.services.candidate_log import delete, upsert
+from app.services.filter_index import FilterIndex
+from app.services.model_registry import ModelRegistry
+
+CANDIDATES_FILE = "app/data/candidates.csv"
+
+def make_registry(calls, tmp_path, candidates_file=CANDIDATES_FILE, shared=True):
+    def loader():
+        calls.append(len(calls) + 1)
+        return {"model": calls[-1], "scaler": None, "encoder": None}
+    return ModelRegistry(candidates_file=candidates_file, feature_store_path=str(tmp_path / "features.npz"), vectors_path=str(tmp_path / "vectors.npz"), index_dir=str(tmp_path / "vector_index"), store_dir=str(tmp_path / "candidates_store"), shared_dir=str(tmp_path / "shared") if shared else "", loaders={"fake": loader})
+
+def test_artifacts_are_loaded_once(tmp_path):
+    calls = []
+    registry = make_registry(calls, tmp_path)
+    first = registry.snapshot
+    second = registry.snapshot
+    assert first is second
+    assert calls == [1]
+    assert len(first.candidate_data) > 0
+    assert len(first.features) == len(first.candidate_data)
+
+def test_reload_swaps_snapshot_and_keeps_old_one_intact(tmp_path):
+    calls = []
+    registry = make_registry(calls, tmp_path)
+    old = registry.snapshot
+    new = registry.reload()
+    assert registry.snapshot is new
+    assert new.version == old.version + 1
+    assert old.artifacts("fake")["model"] == 1
+    assert new.artifacts("fake")["model"] == 2
+
+def test_failed_reload_keeps_current_snapshot(tmp_path):
+    calls = []
+    registry = make_registry(calls, tmp_path)
+    current = registry.snapshot
+    registry.candidates_file = "does/not/exist.csv"
+    try:
+        registry.reload()
+    except FileNotFoundError:
+        pass
+    assert registry.snapshot is current
+
+def test_workers_map_the_published_arrays_without_computing_them(tmp_path, monkeypatch):
+    master = make_registry([], tmp_path)
+    master.publish_shared_arrays()
+    expected = make_registry([], tmp_path, shared=False).snapshot
+
+    def fail(*args, **kwargs):
+        raise AssertionError("computed instead of mapped")
+    monkeypatch.setattr(model_registry, "load_feature_store", fail)
+    monkeypatch.setattr(model_registry, "load_candidate_vectors", fail)
+    monkeypatch.setattr(FilterIndex, "build", fail)
+    snapshot = make_registry([], tmp_path).snapshot
+
+    assert isinstance(snapshot.features.hashes, np.memmap)
+    assert isinstance(snapshot.candidate_vectors.vectors, np.memmap)
+    jobs = ["Senior Python engineer", "React developer"]
+    assert np.array_equal(snapshot.features.matcher.scores(jobs), expected.features.matcher.scores(jobs))
+    filters = {"Disqualified": ["No"]}
+    assert np.array_equal(snapshot.filter_index.rows(filters), expected.filter_index.rows(filters))
+
+def test_deployments_keep_their_own_publications(tmp_path):
+    other_file = str(tmp_path / "candidates.csv")
+    shutil.copy(CANDIDATES_FILE, other_file)
+    first = make_registry([], tmp_path)
+    second = make_registry([], tmp_path / "other", candidates_file=other_file)
+    first.snapshot, second.snapshot
+    assert first.shared_dir != second.shared_dir
+    assert sorted(os.listdir(tmp_path / "shared")) == sorted([os.path.basename(first.shared_dir)])
+    for registry in (first, second):
+        assert sum(entry.startswith("features-") for entry in os.listdir(registry.shared_dir)) == 1
+
+def test_spacy_process_workers_map_the_published_vectors_and_write_nothing(tmp_path, monkeypatch):
+    candidates_file = str(tmp_path / "candidates.csv")
+    shutil.copy(CANDIDATES_FILE, candidates_file)
+    registry = make_registry([], tmp_path, candidates_file=candidates_file)
+    snapshot = registry.snapshot
+    written = {path: os.stat(path).st_mtime_ns for path in (registry.vectors_path, registry.feature_store_path)}
+    def fail(*args, **kwargs):
+        raise AssertionError("read a private copy instead of mapping the published vectors")
+    monkeypatch.setattr(spacy_similarity, "load_candidate_vectors", fail)
+    monkeypatch.setattr(spacy_similarity, "_worker_state", {})
+    state = spacy_similarity._load_worker_state(snapshot.version, **snapshot.sources)
+    assert isinstance(state["candidate_vectors"].vectors, np.memmap)
+
+    names = snapshot.candidate_data["Name"].to_numpy()
+    registry.log.append([delete(names[0]), upsert({"Name": "New Candidate", "Skills": "Python"})])
+    snapshot = registry.apply_log()
+    state = spacy_similarity._load_worker_state(snapshot.version, **snapshot.sources)
+    assert state["candidate_data"]["Name"].to_numpy().tolist() == snapshot.candidate_data["Name"].to_numpy().tolist()
+    np.testing.assert_array_equal(state["candidate_vectors"].hashes, snapshot.candidate_vectors.hashes)
+    np.testing.assert_allclose(state["candidate_vectors"].vectors, snapshot.candidate_vectors.vectors, rtol=1e-5)
+    assert {path: os.stat(path).st_mtime_ns for path in written} == written
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import numpy as np
+import pytest
+from app.services.neural_network import predict_model
+from app.services.neural_network.numpy_model import DenseNetwork, export_weights
+
+def test_numpy_network_matches_keras(tmp_path):
+    pytest.importorskip("tensorflow")
+    keras = predict_model.load_artifacts(runtime="keras")
+    numpy = predict_model.load_artifacts(runtime="numpy", weights_path=str(tmp_path / "weights.npz"))
+
+    X = np.random.default_rng(0).normal(size=(5000, 3)) * [1.0, 3.0, 2.0]
+    expected = keras["model"].predict(keras["scaler"].transform(X), batch_size=1024, verbose=0)
+    actual = numpy["model"].predict(numpy["scaler"].transform(X), batch_size=1024)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-5)
+
+def test_export_is_refreshed_when_the_model_changes(tmp_path):
+    weights_path = str(tmp_path / "weights.npz")
+    export_weights(weights_path=weights_path)
+    network = DenseNetwork.load(weights_path)
+    assert [kernel.shape for kernel, _, _ in network.layers] == [(3, 64), (64, 32), (32, 1)]
+
+    # An export from other files is outdated, so loading exports again
+    network.source = "outdated"
+    network.save(weights_path)
+    artifacts = predict_model.load_artifacts(runtime="numpy", weights_path=weights_path)
+    assert artifacts["model"].source != "outdated"
+    assert DenseNetwork.load(weights_path).source == artifacts["model"].source
+
+def test_numpy_runtime_does_not_import_tensorflow():
+    code = (
+        "import sys\n"
+        "from app.services.neural_network import predict_model\n"
+        "predict_model.load_artifacts(runtime='numpy')\n"
+        "assert 'tensorflow' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from app.services.ranking import rank_candidates, top_k_indices
+
+def full_sort(scores):
+    # Reference ranking: descending score, ties by position
+    return np.lexsort((np.arange(len(scores)), -scores))
+
+def test_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    # Rounded so there are plenty of ties
+    scores = np.round(rng.random(5000) * 50)
+    for k, offset in [(1, 0), (30, 0), (30, 60), (5000, 0), (10, 4995)]:
+        assert np.array_equal(top_k_indices(scores, k, offset), full_sort(scores)[offset:offset + k])
+
+def test_pages_do_not_overlap():
+    scores = np.array([3.0, 1.0, 3.0, 2.0, 3.0, 3.0])
+    pages = [top_k_indices(scores, 2, offset).tolist() for offset in (0, 2, 4)]
+    assert pages == [[0, 2], [4, 5], [3, 1]]
+
+def test_min_score_and_edge_cases():
+    scores = np.array([10.0, 50.0, np.nan, 30.0])
+    assert top_k_indices(scores, 3, min_score=20).tolist() == [1, 3]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 0, 2]
+    assert top_k_indices(scores, 2, offset=10).tolist() == []
+    assert top_k_indices(np.array([]), 5).tolist() == []
+
+def test_rank_candidates_returns_names_and_scores():
+    candidates = pd.DataFrame({"Name": ["Ana", "Ben", "Cleo"], "Skills": ["a", "b", "c"]})
+    top_candidates = rank_candidates(candidates, np.array([0.2, 0.9, 0.5]), k=2)
+    assert top_candidates.to_dict(orient="records") == [{"Name": "Ben", "Score": 0.9}, {"Name": "Cleo", "Score": 0.5}]
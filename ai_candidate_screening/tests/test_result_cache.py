@@ -0,0 +1,88 @@
+import asyncio
+import numpy as np
+from app.services.model_registry import ModelRegistry
+from app.services.result_cache import ResultCache, normalize_job_description
+from app.services.reranking import SCORE_MATRIX_FUNCTIONS
+from app.services.spacy_similarity import embed_texts
+from app.services.XGboost import predict_model as xgboost_model
+
+CANDIDATES_FILE = "app/data/candidates.csv"
+
+class FakeSnapshot:
+    def __init__(self, artifact_stamp):
+        self.artifact_stamp = artifact_stamp
+
+def lookup(cache, key):
+    return asyncio.run(cache.get(key))
+
+def store(cache, key, value):
+    asyncio.run(cache.set(key, value))
+
+def test_trivially_different_job_descriptions_share_a_key():
+    cache = ResultCache(lambda: "v1", db_path="")
+    snapshot = FakeSnapshot("v1")
+    assert normalize_job_description("  Senior  Ruby engineer ruby\n", "xgboost") == "engineer ruby senior"
+    assert cache.key("xgboost", "Senior Ruby engineer", snapshot, k=30) == cache.key("xgboost", "ruby senior   ENGINEER", snapshot, k=30)
+    assert cache.key("xgboost", "Senior Ruby engineer", snapshot, k=30) != cache.key("spacy", "Senior Ruby engineer", snapshot, k=30)
+    assert cache.key("xgboost", "Senior Ruby engineer", snapshot, k=30) != cache.key("xgboost", "Senior Ruby engineer", snapshot, k=10)
+
+def test_descriptions_sharing_a_key_score_the_same(tmp_path):
+    registry = ModelRegistry(
+        candidates_file=CANDIDATES_FILE, feature_store_path=str(tmp_path / "features.npz"), vectors_path=str(tmp_path / "vectors.npz"),
+        index_dir=str(tmp_path / "vector_index"), store_dir=str(tmp_path / "store"), shared_dir="", loaders={"xgboost": xgboost_model.load_artifacts},
+    )
+    snapshot = registry.snapshot
+    cache = ResultCache(lambda: snapshot.artifact_stamp, db_path="")
+    scorers = {
+        "xgboost": lambda description: SCORE_MATRIX_FUNCTIONS["xgboost"]([description], snapshot.artifacts("xgboost"), snapshot.features)[0],
+        "spacy": lambda description: snapshot.candidate_vectors.similarities(embed_texts([description])[0]),
+    }
+    pairs = [
+        ("C++ engineer", "C engineer"),
+        ("Unity developer, C#.", "Unity developer C"),
+        ("Backend developer: java, python", "Backend developer java python"),
+        ("Backend developer java python", "python  JAVA backend developer\n"),
+        ("Senior Python engineer", "Senior Python engineer"),
+    ]
+    for backend, score in scorers.items():
+        for first, second in pairs:
+            if cache.key(backend, first, snapshot) == cache.key(backend, second, snapshot):
+                np.testing.assert_array_equal(score(first), score(second))
+        assert cache.key(backend, "C++ engineer", snapshot) != cache.key(backend, "C engineer", snapshot)
+    assert cache.key("xgboost", pairs[3][0], snapshot) == cache.key("xgboost", pairs[3][1], snapshot)
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(lambda: "v1", max_entries=2, db_path="")
+    for key in ["a", "b", "c"]:
+        store(cache, key, {"key": key})
+    assert lookup(cache, "a") is None
+    assert lookup(cache, "c") == {"key": "c"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["entries"]) == (1, 1, 1, 2)
+
+def test_expired_entries_are_not_served():
+    cache = ResultCache(lambda: "v1", ttl_seconds=-1, db_path="")
+    store(cache, "a", {"key": "a"})
+    assert lookup(cache, "a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_changed_files_bypass_and_clear_the_cache():
+    stamps = ["v1"]
+    cache = ResultCache(lambda: stamps[0], check_seconds=0, db_path="")
+    snapshot = FakeSnapshot("v1")
+    key = cache.key("xgboost", "ruby", snapshot)
+    store(cache, key, {"topCandidates": []})
+
+    # model.xgb was retrained but the worker hasn't reloaded yet
+    stamps[0] = "v2"
+    assert cache.key("xgboost", "ruby", snapshot) is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["invalidations"] == 1
+    assert cache.key("xgboost", "ruby", FakeSnapshot("v2")) not in (None, key)
+
+def test_disk_tier_is_shared_between_workers(tmp_path):
+    db_path = str(tmp_path / "results.sqlite")
+    first = ResultCache(lambda: "v1", db_path=db_path)
+    second = ResultCache(lambda: "v1", db_path=db_path)
+    store(first, "a", {"key": "a"})
+    assert lookup(second, "a") == {"key": "a"}
+    assert second.stats()["diskHits"] == 1
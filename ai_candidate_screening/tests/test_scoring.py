@@ -1,8 +1,9 @@
+import asyncio
 from app.services.scoring_service import score_candidates_for_job
 
 def test_score_candidates():
     job_description = "Looking for a Golang Developer with 3+ years experience."
-    results = score_candidates_for_job(job_description)
+    results = asyncio.run(score_candidates_for_job(job_description))
     assert isinstance(results, list)
     assert len(results) > 0
-    assert all("name" in candidate and "score" in candidate for candidate in results)
+    assert all("Name" in candidate and "Score" in candidate for candidate in results)
@@ -0,0 +1,141 @@
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.executor import InferenceExecutors
+from app.services.feature_store import CandidateFeatures
+from app.services.model_registry import ModelRegistry
+from app.services.ranking import rank_candidates, top_k_indices
+from app.services.reranking import SCORE_MATRIX_FUNCTIONS
+from app.services.result_cache import ResultCache
+from app.services.sharding import ShardCoordinator, ShardState, merge_top_k, partition, shard_key
+from app.services.spacy_similarity import embed_texts
+from app.services.XGboost import predict_model as xgboost_model
+
+CANDIDATES_FILE = "app/data/candidates.csv"
+JOB_DESCRIPTION = "Senior Python engineer with PostgreSQL experience"
+
+def test_partition_is_contiguous_and_balanced():
+    ranges = partition(10, 3)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 10
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+    assert max(stop - start for start, stop in ranges) - min(stop - start for start, stop in ranges) <= 1
+    assert partition(2, 4) == [(0, 0), (0, 1), (1, 1), (1, 2)]
+
+def test_merge_matches_ranking_the_whole_pool():
+    rng = np.random.default_rng(0)
+    # Many ties and a NaN, which must be ranked like top_k_indices ranks them
+    scores = rng.integers(0, 20, 1000).astype(np.float64)
+    scores[17] = np.nan
+    for k, offset, min_score in [(10, 0, None), (25, 40, None), (30, 0, 15.0), (2000, 0, None)]:
+        results = []
+        for start, stop in partition(len(scores), 4):
+            winners = top_k_indices(scores[start:stop], offset + k, 0, min_score)
+            results.append((scores[start:stop][winners], winners + start))
+        merged_scores, rows = merge_top_k(results, k, offset)
+        expected = top_k_indices(scores, k, offset, min_score)
+        np.testing.assert_array_equal(rows, expected)
+        np.testing.assert_array_equal(merged_scores, scores[expected])
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("sharding")
+    return ModelRegistry(
+        candidates_file=CANDIDATES_FILE, feature_store_path=str(tmp_path / "features.npz"), vectors_path=str(tmp_path / "vectors.npz"),
+        index_dir=str(tmp_path / "vector_index"), store_dir=str(tmp_path / "store"), shared_dir="", loaders={"xgboost": xgboost_model.load_artifacts},
+    )
+
+@pytest.fixture(scope="module")
+def snapshot(registry):
+    return registry.snapshot
+
+def test_shard_processes_rank_like_a_single_process(snapshot):
+    scores = {
+        "xgboost": SCORE_MATRIX_FUNCTIONS["xgboost"]([JOB_DESCRIPTION], snapshot.artifacts("xgboost"), snapshot.features)[0],
+        "spacy": snapshot.candidate_vectors.similarities(embed_texts([JOB_DESCRIPTION])[0]) * 100,
+    }
+    rows = snapshot.filter_index.rows({"Disqualified": ["No"]})
+    coordinator = ShardCoordinator(3, loaders={"xgboost": xgboost_model.load_artifacts}).start()
+    try:
+        for backend in ("xgboost", "spacy"):
+            expected = rank_candidates(snapshot.candidate_data, scores[backend], k=20, offset=5)
+            top = coordinator.rank(snapshot, backend, JOB_DESCRIPTION, k=20, offset=5)
+            assert top["Name"].tolist() == expected["Name"].tolist()
+            np.testing.assert_allclose(top["Score"], expected["Score"], rtol=1e-5)
+
+            filtered = rank_candidates(snapshot.candidate_data, scores[backend][rows], k=10, rows=rows)
+            top = coordinator.rank(snapshot, backend, JOB_DESCRIPTION, k=10, rows=rows)
+            assert top["Name"].tolist() == filtered["Name"].tolist()
+    finally:
+        coordinator.shutdown()
+
+def test_workers_serving_the_same_pool_share_the_shards_rows(snapshot):
+    # Another worker numbers its snapshot of the same pool differently
+    other = copy.copy(snapshot)
+    other.version = snapshot.version + 7
+    assert shard_key(other, 0, 10) == shard_key(snapshot, 0, 10)
+    assert shard_key(snapshot, 0, 10) != shard_key(snapshot, 0, 11)
+    changed = copy.copy(snapshot)
+    changed.sources = {**snapshot.sources, "log_position": (1, 100)}
+    assert shard_key(changed, 0, 10) != shard_key(snapshot, 0, 10)
+
+    coordinator = ShardCoordinator(2, loaders={"xgboost": xgboost_model.load_artifacts}).start()
+    try:
+        coordinator.rank(snapshot, "spacy", JOB_DESCRIPTION, k=5)
+        # The shards answer the other worker's snapshot with the rows they already hold
+        job_vector = embed_texts([JOB_DESCRIPTION])[0]
+        for shard, (start, stop) in enumerate(partition(len(snapshot.candidate_data), 2)):
+            assert coordinator.call(shard, "score", key=shard_key(other, start, stop), backend="spacy", job_vector=job_vector, n=5) is not None
+            assert coordinator.call(shard, "score", key=shard_key(changed, start, stop), backend="spacy", job_vector=job_vector, n=5) is None
+    finally:
+        coordinator.shutdown()
+
+def test_shards_keep_the_rows_of_several_pools():
+    def arrays(size, seed):
+        features = CandidateFeatures.from_frame(pd.DataFrame({"Experiences": "", "Educations": "", "Skills": [f"python {seed} {i}" for i in range(size)]}))
+        return {name: np.asarray(getattr(features, name)) for name in ("hashes", "experience_scores", "education_scores", "keywords", "offsets")}
+
+    vector = np.ones(4, dtype=np.float32) / 2
+    state = ShardState(loaders={}, max_pools=2)
+    state.load("a", 0, arrays(3, 0), np.tile(vector, (3, 1)))
+    state.load("b", 10, arrays(5, 1), np.tile(vector, (5, 1)))
+    assert state.score("b", "spacy", job_vector=vector, n=2, rows=np.array([2, 12, 14]))[1].tolist() == [12, 14]
+    assert state.score("a", "spacy", job_vector=vector, n=2)[1].tolist() == [0, 1]
+    # "b" is now the least recently used
+    state.load("c", 0, arrays(1, 2), vector[None])
+    assert state.score("b", "spacy", job_vector=vector) is None
+    assert state.score("a", "spacy", job_vector=vector) is not None
+
+def test_coordinator_scores_locally_when_a_shard_lost_its_rows(snapshot):
+    coordinator = ShardCoordinator(2, loaders={"xgboost": xgboost_model.load_artifacts}).start()
+    try:
+        expected = coordinator.rank(snapshot, "spacy", JOB_DESCRIPTION, k=10)
+        # Every load is evicted before the shard is asked to score, as when many pools compete for it
+        coordinator.load = lambda shard, *args: None
+        coordinator._loaded = [None] * 2
+        other = copy.copy(snapshot)
+        other.sources = {**snapshot.sources, "log_position": (2, 200)}
+        top = coordinator.rank(other, "spacy", JOB_DESCRIPTION, k=10)
+        assert top["Name"].tolist() == expected["Name"].tolist()
+        np.testing.assert_allclose(top["Score"], expected["Score"], rtol=1e-5)
+    finally:
+        coordinator.shutdown()
+
+def test_spacy_endpoint_ranks_on_shards_with_the_default_executors(registry, monkeypatch):
+    coordinator = ShardCoordinator(2, loaders={"xgboost": xgboost_model.load_artifacts}).start()
+    executors = InferenceExecutors()
+    monkeypatch.setattr(app.state, "registry", registry)
+    monkeypatch.setattr(app.state, "shards", coordinator)
+    monkeypatch.setattr(app.state, "executors", executors)
+    monkeypatch.setattr(app.state, "result_cache", ResultCache(registry.artifact_stamp, max_entries=0, db_path=""))
+    try:
+        assert executors.spacy.kind == "process"
+        response = TestClient(app).post("/api/predict-candidates/spacy", json={"jobDescription": JOB_DESCRIPTION})
+        assert response.status_code == 200, response.text
+        expected = coordinator.rank(registry.snapshot, "spacy", JOB_DESCRIPTION)
+        assert [candidate["Name"] for candidate in response.json()["topCandidates"]] == expected["Name"].tolist()
+    finally:
+        executors.shutdown(wait=False)
+        coordinator.shutdown()
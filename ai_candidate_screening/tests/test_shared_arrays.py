@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pandas as pd
+from app.services.feature_store import CandidateFeatures
+from app.utils.memory import memory_usage
+from app.utils.shared_arrays import share_arrays
+
+def test_same_content_maps_the_same_files(tmp_path):
+    directory = str(tmp_path)
+    first = share_arrays("test", {"values": np.arange(10)}, directory)
+    second = share_arrays("test", {"values": np.arange(10)}, directory)
+    assert isinstance(first["values"], np.memmap)
+    assert first["values"].filename == second["values"].filename
+    assert not first["values"].flags.writeable
+
+def test_new_content_replaces_the_old_publication(tmp_path):
+    directory = str(tmp_path)
+    old = share_arrays("test", {"values": np.arange(10)}, directory)
+    share_arrays("test", {"values": np.arange(11)}, directory)
+    assert len(os.listdir(directory)) == 1
+    # Views mapped before the swap keep working
+    assert old["values"].sum() == 45
+
+def test_shared_features_score_like_private_ones(tmp_path):
+    candidates = pd.DataFrame({
+        "Experiences": ["5 years python", "junior"],
+        "Skills": ["python,django", ""],
+        "Educations": ["Bachelor degree", None],
+    })
+    features = CandidateFeatures.from_frame(candidates)
+    shared = features.share(str(tmp_path))
+    assert isinstance(shared.experience_scores, np.memmap)
+    jobs = ["python developer", "junior"]
+    assert np.array_equal(shared.matcher.scores(jobs), features.matcher.scores(jobs))
+
+def test_memory_usage_reports_private_and_shared():
+    usage = memory_usage()
+    if usage:
+        assert usage["Rss"] >= usage["Private"] > 0
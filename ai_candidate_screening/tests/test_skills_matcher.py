@@ -0,0 +1,21 @@
+import numpy as np
+from app.services.skills_matcher import SkillsMatcher
+from app.services.refine_training_data import calculate_skills_score, extract_candidate_keywords
+
+SKILLS = ["python,golang,sql", "", "React, TypeScript", "", "golang"]
+EXPERIENCES = ["Backend at Acme", "Golang developer, backend and scalability", "", "", "python"]
+JOBS = [
+    "Looking for a Golang developer with backend experience and scalability expertise.",
+    "python sql golang",
+    "react",
+    "",
+]
+
+def test_scores_match_calculate_skills_score():
+    matcher = SkillsMatcher.from_keyword_sets(extract_candidate_keywords(s, e) for s, e in zip(SKILLS, EXPERIENCES))
+    scores = matcher.scores(JOBS)
+    assert scores.shape == (len(SKILLS), len(JOBS))
+    for j, job in enumerate(JOBS):
+        expected = [calculate_skills_score(s, e, job) for s, e in zip(SKILLS, EXPERIENCES)]
+        assert scores[:, j].tolist() == expected
+        assert np.array_equal(matcher.score(job), scores[:, j])
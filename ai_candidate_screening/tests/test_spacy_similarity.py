@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from app.services.spacy_similarity import calculate_similarity, candidate_texts, load_candidate_vectors, get_nlp, similarity_matrix
+from app.services.vector_index import FlatIndex
+
+CANDIDATES = pd.DataFrame({
+    "Name": ["Ana", "Ben", "Cleo"],
+    "Skills": ["ruby,postgresql", None, "react,typescript"],
+    "Summary": ["Backend engineer", "Golang developer", "Frontend developer"],
+})
+
+def test_scores_match_doc_similarity(tmp_path):
+    job_description = "Senior Ruby engineer with PostgreSQL experience"
+    vectors = load_candidate_vectors(CANDIDATES, str(tmp_path / "vectors.npz"))
+    top_candidates = calculate_similarity(job_description, candidate_data=CANDIDATES, candidate_vectors=vectors)
+
+    nlp = get_nlp()
+    job_doc = nlp(job_description)
+    expected = {name: job_doc.similarity(nlp(text)) * 100 for name, text in zip(CANDIDATES["Name"], candidate_texts(CANDIDATES))}
+    assert top_candidates["Name"].tolist() == sorted(expected, key=expected.get, reverse=True)
+    assert np.allclose(top_candidates["Score"], [expected[name] for name in top_candidates["Name"]], atol=1e-3)
+
+def test_only_new_rows_are_embedded(tmp_path, capsys):
+    path = str(tmp_path / "vectors.npz")
+    first = load_candidate_vectors(CANDIDATES, path)
+    capsys.readouterr()
+
+    grown = pd.concat([CANDIDATES, pd.DataFrame({"Name": ["Dan"], "Skills": ["golang"], "Summary": ["Backend"]})], ignore_index=True)
+    vectors = load_candidate_vectors(grown, path)
+
+    assert "1 of 4 candidates embedded" in capsys.readouterr().out
+    assert np.array_equal(vectors.vectors[:3], first.vectors)
+
+def test_similarity_matrix_matches_single_jobs(tmp_path):
+    job_descriptions = ["Senior Ruby engineer", "React developer", "Golang backend"]
+    vectors = load_candidate_vectors(CANDIDATES, str(tmp_path / "vectors.npz"))
+    matrix = similarity_matrix(job_descriptions, vectors)
+
+    assert matrix.shape == (3, 3)
+    for row, job_description in zip(matrix, job_descriptions):
+        top_candidates = calculate_similarity(job_description, candidate_data=CANDIDATES, candidate_vectors=vectors)
+        assert np.allclose(np.sort(row)[::-1], top_candidates["Score"], atol=1e-4)
+
+def test_index_search_returns_identical_candidates_once(tmp_path):
+    # Two rows with identical content share a content hash, and so an id in the index
+    twins = pd.concat([CANDIDATES, CANDIDATES.iloc[[0]]], ignore_index=True)
+    vectors = load_candidate_vectors(twins, str(tmp_path / "vectors.npz"))
+    index = FlatIndex(vectors.hashes, vectors.vectors)
+    # Renaming the copy tells the two rows apart in the results
+    candidate_data = twins.assign(Name=["Ana", "Ben", "Cleo", "Ana (copy)"])
+
+    job_description = "Senior Ruby engineer with PostgreSQL experience"
+    expected = calculate_similarity(job_description, candidate_data=candidate_data, candidate_vectors=vectors, k=3)
+    top_candidates = calculate_similarity(job_description, candidate_data=candidate_data, candidate_vectors=vectors, k=3, vector_index=index)
+    assert top_candidates["Name"].tolist() == expected["Name"].tolist() == ["Ana", "Ana (copy)", expected["Name"][2]]
+    assert np.allclose(top_candidates["Score"], expected["Score"], atol=1e-4)
@@ -0,0 +1,31 @@
+import pandas as pd
+from app.services.refine_training_data import assign_education_score, calculate_experience_score
+from app.services.text_features import education_scores, experience_scores
+
+EXPERIENCES = [
+    "",
+    "Engineer at Acme (Jan 2015 to Mar 2019) | Intern at Initech (2013 to 2014)",
+    "2010 2009 1999 2005 2020",
+    "12345678 and 2020",
+    "٢٠١٠ to ٢٠١٥",
+    "１９９９-２００１ and 2003",
+    "only 2020",
+    "a\x002001 2003",
+]
+
+EDUCATIONS = ["", "PhD in Physics", "Master's degree", "BACHELOR of Arts", "Diploma", "Certificate", "İPHD", "High school", "phd and master", "\x00PhD", "PhD"]
+
+def test_matches_the_per_row_functions():
+    assert experience_scores(EXPERIENCES).tolist() == [calculate_experience_score(e) for e in EXPERIENCES]
+    assert education_scores(EDUCATIONS).tolist() == [assign_education_score(e) for e in EDUCATIONS]
+
+def test_matches_on_the_candidate_pool():
+    candidates = pd.read_csv("app/data/candidates.csv")
+    experiences = candidates["Experiences"].fillna("").astype(str).tolist()
+    educations = candidates["Educations"].fillna("").astype(str).tolist()
+    assert experience_scores(experiences).tolist() == [calculate_experience_score(e) for e in experiences]
+    assert education_scores(educations).tolist() == [assign_education_score(e) for e in educations]
+
+def test_empty_column():
+    assert experience_scores([]).tolist() == []
+    assert education_scores([]).tolist() == []
@@ -0,0 +1,23 @@
+import pytest
+from app.services.refine_training_data import assign_education_score, calculate_experience_score
+from app.services.text_features import education_scores, experience_scores
+
+hypothesis = pytest.importorskip("hypothesis")
+from hypothesis import given, strategies as st
+
+# Text biased towards what the features look for: years, digit runs of other lengths
+# (including non-ASCII digits), education keywords in any case, and arbitrary characters
+fragments = st.one_of(
+    st.integers(min_value=0, max_value=99999).map(str),
+    st.sampled_from(["PhD", "master", "BACHELOR", "Certificate", "diploma", "İ", "٢٠١٥", "１９９９", " to ", "\x00", "|"]),
+    st.text(max_size=8),
+)
+texts = st.lists(fragments, max_size=12).map("".join)
+
+@given(st.lists(texts, max_size=20))
+def test_experience_scores_match_calculate_experience_score(column):
+    assert experience_scores(column).tolist() == [calculate_experience_score(text) for text in column]
+
+@given(st.lists(texts, max_size=20))
+def test_education_scores_match_assign_education_score(column):
+    assert education_scores(column).tolist() == [assign_education_score(text) for text in column]
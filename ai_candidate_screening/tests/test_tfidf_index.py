@@ -0,0 +1,61 @@
+import os
+import shutil
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from app.services.tfidf_index import MATRIX_FILE, TfidfIndex, load_tfidf_index
+
+RESUMES = [
+    "golang backend developer scalability",
+    "ruby on rails engineer postgresql",
+    "qa engineer selenium automation testing",
+    "react typescript frontend developer",
+    "python tensorflow machine learning engineer",
+]
+JOB = "backend golang engineer"
+
+def test_similarity_matches_fitted_vectorizer():
+    index = TfidfIndex.fit(RESUMES)
+    vectorizer = TfidfVectorizer().fit(RESUMES)
+    expected = cosine_similarity(vectorizer.transform(RESUMES), vectorizer.transform([JOB])).ravel()
+    assert np.allclose(index.similarity(JOB), expected)
+
+def test_sync_adds_and_removes_rows_incrementally():
+    index = TfidfIndex.fit(RESUMES, refit_threshold=1.0)
+    documents = RESUMES[1:] + ["golang kubernetes engineer"]
+    synced = index.sync(documents)
+
+    assert synced is index
+    assert synced.changes == 2
+    assert synced.fitted_size == len(RESUMES)
+    assert np.allclose(synced.matrix.toarray(), index.transform(documents).toarray())
+
+def test_sync_refits_past_threshold():
+    index = TfidfIndex.fit(RESUMES, refit_threshold=0.2)
+    documents = RESUMES[2:] + ["golang kubernetes engineer"]
+    synced = index.sync(documents)
+
+    assert synced is not index
+    assert synced.changes == 0
+    assert synced.fitted_size == len(documents)
+
+def test_saved_index_is_reused(tmp_path):
+    fitted = load_tfidf_index(RESUMES, str(tmp_path))
+    loaded = load_tfidf_index(RESUMES, str(tmp_path))
+    assert loaded.vocabulary == fitted.vocabulary
+    assert np.array_equal(loaded.hashes, fitted.hashes)
+    assert np.allclose(loaded.similarity(JOB), fitted.similarity(JOB))
+
+def test_files_of_different_saves_are_not_loaded_as_a_pair(tmp_path):
+    load_tfidf_index(RESUMES, str(tmp_path / "old"))
+    load_tfidf_index(RESUMES[1:], str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["old", MATRIX_FILE, "tfidf_vocabulary.json"]
+    # A reader landing between the two renames of a save sees the new matrix with the old vocabulary
+    shutil.copy(tmp_path / "old" / MATRIX_FILE, tmp_path / MATRIX_FILE)
+    with pytest.raises(ValueError):
+        TfidfIndex.load(str(tmp_path), attempts=1)
+
+    index = load_tfidf_index(RESUMES[1:], str(tmp_path))
+    assert np.allclose(index.similarity(JOB), TfidfIndex.fit(RESUMES[1:]).similarity(JOB))
+    assert TfidfIndex.load(str(tmp_path)).fingerprint() == index.fingerprint()
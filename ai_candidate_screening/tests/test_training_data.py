@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from app.services.training_data import FEATURE_COLUMNS, REFINED_CSV, ChunkedTrainingData
+from app.services.XGboost.train_model import train_xgboost_streaming
+
+def test_chunked_preprocessors_match_in_memory_fit():
+    data = ChunkedTrainingData(REFINED_CSV, chunk_rows=700).fit()
+
+    # What the training scripts compute with the whole file in memory
+    X = pd.read_csv(REFINED_CSV)[FEATURE_COLUMNS]
+    encoder = LabelEncoder()
+    for column in ["Skills_Score", "Education_Score"]:
+        X[column] = encoder.fit_transform(X[column].astype(str))
+    scaler = StandardScaler().fit(X)
+
+    assert data.rows == len(X)
+    np.testing.assert_array_equal(data.encoder.classes_, encoder.classes_)
+    np.testing.assert_allclose(data.scaler.mean_, scaler.mean_)
+    np.testing.assert_allclose(data.scaler.scale_, scaler.scale_)
+    streamed = np.concatenate([X_chunk for X_chunk, _ in data.batches("all")])
+    np.testing.assert_allclose(streamed, scaler.transform(X), atol=1e-6)
+
+def test_splits_are_disjoint_and_stable():
+    data = ChunkedTrainingData(REFINED_CSV, chunk_rows=500).fit()
+    train = sum(len(y) for _, y in data.batches("train"))
+    test = sum(len(y) for _, y in data.batches("test"))
+    assert train + test == data.rows
+    assert 0.1 < test / data.rows < 0.3
+    assert test == sum(len(y) for _, y in data.batches("test"))
+
+def test_xgboost_trains_from_chunks(tmp_path):
+    model = train_xgboost_streaming(REFINED_CSV, str(tmp_path), chunk_rows=1000, num_boost_round=5)
+    assert model.num_boosted_rounds() == 5
+    assert (tmp_path / "model.xgb").exists() and (tmp_path / "preprocessors.pkl").exists()
+    loaded = xgb.Booster(model_file=str(tmp_path / "model.xgb"))
+    assert loaded.inplace_predict(np.zeros((2, 3), dtype=np.float32)).shape == (2,)
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.scoring_service import JOB_DESCRIPTIONS, generate_training_data
+from app.services.refine_training_data import preprocess_training_data
+from app.services.training_pipeline import MANIFEST_FILE, clear_outputs, refined_files, run_pipeline
+
+JOBS = JOB_DESCRIPTIONS[:3]
+
+def test_pipeline_matches_generate_then_refine(tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "pipeline")
+    manifest = run_pipeline(JOBS, output_dir, shard_size=2, workers=2, csv_path=str(tmp_path / "refined.csv"))
+    assert manifest["rows"] > 0 and len(manifest["shards"]) == 2
+
+    monkeypatch.setattr("app.services.scoring_service.JOB_DESCRIPTIONS", JOBS)
+    asyncio.run(generate_training_data(str(tmp_path / "training.csv"), force=True))
+    expected = preprocess_training_data(str(tmp_path / "training.csv"), JOBS[0], save_path=str(tmp_path / "expected.csv"))
+
+    parquet = pd.concat([pd.read_parquet(path) for path in refined_files(output_dir)], ignore_index=True)
+    for actual in (parquet, pd.read_csv(tmp_path / "refined.csv")):
+        assert list(actual.columns) == list(expected.columns)
+        np.testing.assert_allclose(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float), atol=1e-12)
+
+def test_rerun_only_scores_unfinished_shards(tmp_path):
+    output_dir = str(tmp_path / "pipeline")
+    run_pipeline(JOBS, output_dir, shard_size=1, workers=1)
+    raw = [os.path.join(output_dir, "raw", f"part-0000{shard}.parquet") for shard in range(3)]
+    written = [os.stat(path).st_mtime_ns for path in raw]
+
+    # Simulate a run interrupted before shard 1 was checkpointed
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    del manifest["shards"]["1"]
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+
+    resumed = run_pipeline(JOBS, output_dir, shard_size=1, workers=1)
+    assert sorted(resumed["shards"]) == ["0", "1", "2"]
+    assert [os.stat(path).st_mtime_ns for path in raw] != written
+    assert os.stat(raw[0]).st_mtime_ns == written[0] and os.stat(raw[2]).st_mtime_ns == written[2]
+
+def test_only_pipeline_outputs_are_deleted(tmp_path):
+    (tmp_path / "notes.txt").write_text("keep me")
+    # Not a pipeline output directory: refused rather than emptied
+    with pytest.raises(ValueError):
+        run_pipeline(JOBS, str(tmp_path), shard_size=1, workers=1)
+    assert (tmp_path / "notes.txt").exists()
+
+    (tmp_path / "raw").mkdir()
+    (tmp_path / "raw" / "part-00000.parquet").write_bytes(b"")
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps({"fingerprint": "outdated", "shards": {}}))
+    clear_outputs(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt"]
@@ -0,0 +1,31 @@
+from app.services.tuning import XGBOOST_SPACE, MedianPruner, pareto_front, sample_trials, tune
+
+def test_pruner_stops_trials_worse_than_the_median():
+    pruner = MedianPruner(warmup_steps=2, interval=1, min_trials=2)
+    for trial, value in enumerate([1.0, 2.0, 3.0]):
+        assert not pruner.report(trial, 1, value)  # Still warming up
+        pruner.report(trial, 2, value)
+    assert pruner.report(3, 2, 2.5)
+    assert not pruner.report(4, 2, 1.5)
+
+def test_pareto_front_keeps_non_dominated_trials():
+    trials = [
+        {"trial": 0, "rmse": 0.10, "latency_ms": 5.0, "size_bytes": 100},
+        {"trial": 1, "rmse": 0.12, "latency_ms": 1.0, "size_bytes": 100},
+        {"trial": 2, "rmse": 0.12, "latency_ms": 6.0, "size_bytes": 200},
+        {"trial": 3, "rmse": 0.05, "latency_ms": 0.5, "size_bytes": 50, "pruned": True},
+    ]
+    assert [trial["trial"] for trial in pareto_front(trials)] == [0, 1]
+
+def test_samples_are_distinct():
+    samples = sample_trials(XGBOOST_SPACE, 10)
+    assert len({str(sorted(sample.items())) for sample in samples}) == 10
+
+def test_xgboost_study_records_accuracy_latency_and_size():
+    study = tune("xgboost", trials=4, parallel=2)
+    assert len(study["trials"]) == 4
+    for trial in study["trials"]:
+        assert "error" not in trial
+        assert trial["rmse"] > 0 and trial["latency_ms"] > 0 and trial["size_bytes"] > 0
+        assert 1 <= trial["steps"] <= trial["params"]["num_boost_round"]
+    assert study["pareto"]
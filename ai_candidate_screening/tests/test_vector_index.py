@@ -0,0 +1,60 @@
+import numpy as np
+from app.services.spacy_similarity import normalize_rows
+from app.services.vector_index import FlatIndex, IVFIndex, build_index, load_index
+
+def random_vectors(n, dimensions=16, seed=0):
+    return normalize_rows(np.random.default_rng(seed).normal(size=(n, dimensions)).astype(np.float32))
+
+def exact(vectors, query, k):
+    return np.argsort(-(vectors @ query), kind="stable")[:k]
+
+def test_flat_index_is_exact():
+    vectors = random_vectors(500)
+    ids = np.arange(500, dtype=np.uint64) * 7
+    index = FlatIndex.build(ids, vectors)
+    query = random_vectors(1, seed=1)[0]
+
+    found, scores = index.search(query, 10)[0]
+    assert np.array_equal(found, ids[exact(vectors, query, 10)])
+    assert np.allclose(scores, np.sort(vectors @ query)[::-1][:10])
+
+def test_ivf_probing_every_list_is_exact_and_few_lists_recall_most():
+    vectors = random_vectors(2000)
+    ids = np.arange(2000, dtype=np.uint64)
+    queries = random_vectors(20, seed=2)
+
+    index = IVFIndex.build(ids, vectors, nlist=20, nprobe=20)
+    assert all(np.array_equal(found, exact(vectors, query, 10)) for (found, _), query in zip(index.search(queries, 10), queries))
+
+    index.nprobe = 5
+    recall = np.mean([len(np.intersect1d(found, exact(vectors, query, 10))) / 10 for (found, _), query in zip(index.search(queries, 10), queries)])
+    assert recall > 0.5
+
+def test_insert_delete_and_sync():
+    vectors = random_vectors(100)
+    ids = np.arange(100, dtype=np.uint64)
+    index = build_index("ivf", ids, vectors, nlist=4, nprobe=4)
+
+    index.remove(ids[:5])
+    index.add(np.array([1000], dtype=np.uint64), vectors[:1])
+    found, _ = index.search(vectors[0], 1)[0]
+    assert found.tolist() == [1000]
+    assert len(index) == 96
+
+    # Drop 30 candidates: over the rebuild threshold, so the index is rebuilt without tombstones
+    synced, changed = index.sync(ids[30:], vectors[30:])
+    assert changed and synced.changes == 0
+    assert sorted(synced.live()[0].tolist()) == list(range(30, 100))
+
+def test_save_and_load_memory_mapped(tmp_path):
+    vectors = random_vectors(300)
+    ids = np.arange(300, dtype=np.uint64)
+    index = build_index("ivf", ids, vectors, nlist=8, nprobe=3)
+    index.remove(ids[:2])
+    index.save(str(tmp_path / "index"), pipeline="test")
+
+    loaded = load_index(str(tmp_path / "index"))
+    assert isinstance(loaded, IVFIndex) and isinstance(loaded.vectors, np.memmap)
+    assert loaded.nprobe == 3 and len(loaded) == 298
+    query = random_vectors(1, seed=3)[0]
+    assert np.array_equal(loaded.search(query, 5)[0][0], index.search(query, 5)[0][0])
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+import xgboost as xgb
+from app.services.XGboost.predictors import MODEL_PATH, load_predictor
+
+X = np.random.default_rng(0).normal(size=(2000, 3))
+
+def test_inplace_predict_matches_dmatrix_predict():
+    predictor = load_predictor(predictor="booster", nthread=1)
+    expected = xgb.Booster(model_file=MODEL_PATH).predict(xgb.DMatrix(X))
+    np.testing.assert_array_equal(predictor.predict(X), expected)
+    # Non-contiguous float64 slices are converted, not misread
+    np.testing.assert_array_equal(predictor.predict(X[::2]), expected[::2])
+
+def test_compiled_predictor_matches_booster(tmp_path):
+    pytest.importorskip("treelite")
+    pytest.importorskip("tl2cgen")
+    compiled = load_predictor(predictor="compiled", nthread=1, compiled_dir=str(tmp_path))
+    booster = load_predictor(predictor="booster", nthread=1)
+    np.testing.assert_allclose(compiled.predict(X), booster.predict(X), atol=1e-5)
+    assert compiled.libpath.startswith(str(tmp_path))
+
+def test_unknown_predictor_is_rejected():
+    with pytest.raises(ValueError):
+        load_predictor(predictor="gpu")